@@ -1,24 +1,99 @@
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+"""
+Clients Supabase de l'application.
 
-# Configuration Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+Les clients sont construits au premier usage (et non à l'import) : l'import de
+supabase-py et la création des clients représentent l'essentiel du temps de
+démarrage de l'API. `supabase` et `supabase_admin` sont des proxys paresseux
+enregistrés dans un registre ; le lifespan de l'application ferme les clients
+construits à l'arrêt.
+"""
+from typing import Callable, Dict
+import os
+import threading
 
 # Client Supabase - création conditionnelle pour les tests
 TESTING = os.getenv("TESTING", "false").lower() == "true"
 
+
+class LazyClient:
+    """
+    Proxy d'un client construit au premier accès à l'un de ses attributs
+    (construction protégée par un verrou : un seul client par proxy).
+    """
+
+    def __init__(self, name: str, factory: Callable):
+        self._name = name
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._client is not None
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def close(self) -> None:
+        """Ferme les sessions HTTP du client s'il a été construit."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is None:
+            return
+        # Sous-clients déjà créés uniquement (postgrest est construit à la demande)
+        for attr in ("_postgrest", "_storage"):
+            session = getattr(getattr(client, attr, None), "session", None)
+            if session is not None and hasattr(session, "close"):
+                session.close()
+
+    def __getattr__(self, name):
+        # Attributs privés / spéciaux (copy, pickle...) : jamais délégués
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+    def __repr__(self) -> str:
+        state = "initialisé" if self.initialized else "non initialisé"
+        return f"<LazyClient {self._name} ({state})>"
+
+
+_registry: Dict[str, LazyClient] = {}
+
+
+def register_client(name: str, factory: Callable) -> LazyClient:
+    client = LazyClient(name, factory)
+    _registry[name] = client
+    return client
+
+
+def close_clients() -> None:
+    """Ferme tous les clients construits (appelé à l'arrêt de l'application)."""
+    for client in _registry.values():
+        client.close()
+
+
+def _create_supabase_client(service_role: bool):
+    # Import différé : supabase-py (postgrest, storage3, httpx...) est lourd
+    from supabase import create_client
+    from app.metrics import InstrumentedClient
+
+    key = os.getenv("SUPABASE_KEY")
+    if service_role:
+        key = os.getenv("SUPABASE_SERVICE_KEY") or key
+    # Les clients sont enveloppés pour mesurer les appels PostgREST / Storage (/metrics)
+    return InstrumentedClient(create_client(os.getenv("SUPABASE_URL"), key))
+
+
 if TESTING:
     # Mock client pour les tests
     supabase = None
     supabase_admin = None
 else:
-    from supabase import create_client, Client
     # Client standard (anon key) — soumis au RLS
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    supabase = register_client("supabase", lambda: _create_supabase_client(service_role=False))
     # Client admin (service role key) — bypasse le RLS pour les opérations backend (ex: storage uploads)
-    _service_key = SUPABASE_SERVICE_KEY or SUPABASE_KEY
-    supabase_admin: Client = create_client(SUPABASE_URL, _service_key)
+    supabase_admin = register_client("supabase_admin", lambda: _create_supabase_client(service_role=True))
@@ -1,6 +1,7 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.database import supabase
+from app.database import supabase, supabase_admin
+from app.services.cache import register_cache
 import os
 import logging
 import jwt
@@ -9,6 +10,98 @@ from jwt import InvalidTokenError
 security = HTTPBearer()
 logger = logging.getLogger(__name__)
 
+# Un admin rétrogradé garde ses droits au plus jusqu'au rafraîchissement suivant
+ADMIN_IDS_REFRESH_INTERVAL = 60
+JWKS_REFRESH_INTERVAL = 3600
+
+# Claims exigés de tout JWT validé localement (HS256 comme JWKS) : jetons de
+# session Supabase uniquement, jamais les clés anon / service role
+JWT_AUDIENCE = "authenticated"
+JWT_REQUIRED_CLAIMS = ["exp", "sub", "aud"]
+
+
+def _load_jwks() -> dict:
+    """
+    Clés publiques de signature des JWT (projets Supabase en clés asymétriques),
+    indexées par `kid`. Vide pour un projet signé uniquement en HS256.
+    """
+    supabase_url = os.getenv("SUPABASE_URL")
+    if not supabase_url:
+        return {}
+    import httpx
+
+    response = httpx.get(f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json", timeout=5.0)
+    response.raise_for_status()
+    keys = {}
+    for jwk in response.json().get("keys", []):
+        try:
+            keys[jwk["kid"]] = jwt.PyJWK(jwk)
+        except (KeyError, jwt.PyJWKError) as e:
+            logger.warning(f"Clé JWKS ignorée: {e}")
+    return keys
+
+
+def _load_admin_ids() -> frozenset:
+    rows = supabase_admin.table("Users").select("id").eq("role", "admin").execute().data or []
+    return frozenset(row["id"] for row in rows)
+
+
+jwks_cache = register_cache("jwks", _load_jwks, JWKS_REFRESH_INTERVAL)
+admin_ids_cache = register_cache("admin_ids", _load_admin_ids, ADMIN_IDS_REFRESH_INTERVAL)
+
+
+def is_cached_admin(user_id: str) -> bool:
+    """
+    Raccourci : l'utilisateur figure dans l'ensemble des admins en cache.
+    False ne veut pas dire « non admin » (cache froid, promotion récente) :
+    l'appelant garde sa vérification en base dans ce cas.
+    """
+    return user_id in (admin_ids_cache.peek() or ())
+
+
+class User:
+    """Utilisateur minimal reconstruit depuis les claims d'un JWT vérifié localement."""
+
+    def __init__(self, id, email, user_metadata):
+        self.id = id
+        self.email = email
+        self.user_metadata = user_metadata
+
+
+def _user_from_claims(payload: dict) -> User:
+    return User(
+        id=payload.get("sub"),
+        email=payload.get("email"),
+        user_metadata=payload.get("user_metadata", {}),
+    )
+
+
+def _decode_claims(token: str, key, algorithms: list) -> dict:
+    """Signature, expiration, audience et sujet : mêmes contrôles pour toutes les clés."""
+    return jwt.decode(
+        token,
+        key,
+        algorithms=algorithms,
+        audience=JWT_AUDIENCE,
+        options={"require": JWT_REQUIRED_CLAIMS},
+    )
+
+
+def _decode_with_jwks(token: str):
+    """Validation locale d'un JWT signé par une clé asymétrique du projet (JWKS en cache)."""
+    keys = jwks_cache.peek()
+    if not keys:
+        return None
+    try:
+        header = jwt.get_unverified_header(token)
+        jwk = keys.get(header.get("kid"))
+        if jwk is None:
+            return None
+        payload = _decode_claims(token, jwk.key, [jwk.algorithm_name])
+    except InvalidTokenError:
+        return None
+    return _user_from_claims(payload)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -24,31 +117,18 @@ async def get_current_user(
     if secret:
         try:
             # Supabase utilise HS256 par défaut
-            payload = jwt.decode(
-                token,
-                secret,
-                algorithms=["HS256"],
-                options={
-                    "verify_aud": False
-                },  # Parfois l'audience peut varier, mais 'authenticated' est standard
-            )
+            payload = _decode_claims(token, secret, ["HS256"])
 
-            # Reconstruction d'un objet utilisateur minimal
-            class User:
-                def __init__(self, id, email, user_metadata):
-                    self.id = id
-                    self.email = email
-                    self.user_metadata = user_metadata
-
-            return User(
-                id=payload.get("sub"),
-                email=payload.get("email"),
-                user_metadata=payload.get("user_metadata", {}),
-            )
+            return _user_from_claims(payload)
         except InvalidTokenError:
             # Si échec local, fallback sur l'API
             pass
 
+    # Clés asymétriques du projet (JWKS préchargé au démarrage)
+    user = _decode_with_jwks(token)
+    if user is not None:
+        return user
+
     try:
         # Vérification du token auprès de Supabase Auth
         user_response = supabase.auth.get_user(token)
@@ -0,0 +1 @@
+# Fichier vide pour faire de jobs un package Python
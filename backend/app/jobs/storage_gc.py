@@ -0,0 +1,296 @@
+"""
+Ramasse-miettes du storage : supprime les objets qui ne sont plus référencés
+en base (produit supprimé, fichiers remplacés lors d'une mise à jour, upload
+d'une création de produit échouée...).
+
+Les références sont lues dans Products (aperçu + fichiers téléchargeables),
+ProjectsImages et ProjectsMessages (fichier + variantes), puis comparées au
+listing des buckets. Avec le stockage adressé par contenu, un objet peut être
+partagé : on ne supprime donc jamais un objet au fil de l'eau, uniquement ici.
+
+Exécution (cron / tâche planifiée), depuis backend/ :
+
+    python -m app.jobs.storage_gc            # dry-run : rapport seul
+    python -m app.jobs.storage_gc --apply    # suppression effective
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+from urllib.parse import unquote, urlparse
+import argparse
+import json
+import logging
+import time
+
+from app.services.table_export import keyset_pages
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ("overview-model-file", "download-model-file", "project-images")
+
+PAGE_SIZE = 1000
+LIST_PAGE_SIZE = 100
+DELETE_BATCH_SIZE = 100
+# Pause entre deux lots de suppression (limite la charge sur le storage)
+DELETE_BATCH_DELAY = 0.5
+# Un objet plus récent peut appartenir à un upload en cours dont la ligne
+# n'est pas encore insérée : on ne le considère jamais orphelin
+DEFAULT_MIN_AGE = timedelta(hours=24)
+REPORT_SAMPLE_SIZE = 20
+
+
+def storage_ref(ref: Optional[str], default_bucket: str) -> Optional[tuple]:
+    """
+    (bucket, chemin) à partir d'une référence en base : chemin relatif
+    (bucket par défaut) ou URL Supabase Storage complète (publique ou signée).
+    """
+    if not ref:
+        return None
+    if not ref.startswith("http"):
+        return default_bucket, ref
+    marker = "/storage/v1/object/"
+    url_path = urlparse(ref).path
+    index = url_path.find(marker)
+    if index < 0:
+        return None
+    parts = url_path[index + len(marker):].split("/", 2)
+    if len(parts) < 3 or parts[0] not in ("public", "sign", "authenticated"):
+        return None
+    return parts[1], unquote(parts[2])
+
+
+def _paged_rows(client, table: str, columns: list) -> Iterator[dict]:
+    """
+    Parcourt une table par pages de PAGE_SIZE lignes, par curseur sur l'id :
+    une insertion ou une suppression pendant le parcours ne décale pas les
+    pages suivantes (aucune ligne référencée n'est sautée).
+    """
+    for page in keyset_pages(client, table, columns, PAGE_SIZE):
+        yield from page
+
+
+def collect_references(client) -> dict:
+    """Ensemble des chemins référencés en base, par bucket."""
+    refs = {bucket: set() for bucket in BUCKETS}
+
+    def add(ref, default_bucket):
+        parsed = storage_ref(ref, default_bucket)
+        if parsed and parsed[0] in refs:
+            refs[parsed[0]].add(parsed[1])
+
+    for product in _paged_rows(client, "Products", ["id", "overview_model_file", "download_files"]):
+        add(product.get("overview_model_file"), "overview-model-file")
+        for download in product.get("download_files") or []:
+            add(download.get("url"), "download-model-file")
+
+    for table in ("ProjectsImages", "ProjectsMessages"):
+        for row in _paged_rows(client, table, ["id", "fileUrl", "variants"]):
+            add(row.get("fileUrl"), "project-images")
+            for variant in (row.get("variants") or {}).values():
+                add(variant, "project-images")
+
+    return refs
+
+
+def _blob_rows(client, bucket_name: str, used_since: Optional[datetime] = None) -> Iterator[dict]:
+    """Lignes StorageBlobs du bucket (réutilisées depuis `used_since` si fourni), par curseur sur le chemin."""
+    last_path = None
+    while True:
+        query = client.table("StorageBlobs").select("path, variants").eq("bucket", bucket_name)
+        if used_since is not None:
+            query = query.gte("last_used_at", used_since.isoformat())
+        query = query.order("path").limit(PAGE_SIZE)
+        if last_path is not None:
+            query = query.gt("path", last_path)
+        rows = query.execute().data or []
+        yield from rows
+        if len(rows) < PAGE_SIZE:
+            return
+        last_path = rows[-1]["path"]
+
+
+def _variant_paths(row: dict) -> set:
+    return set((row.get("variants") or {}).values())
+
+
+def recently_used_blobs(client, bucket_name: str, cutoff: datetime) -> set:
+    """
+    Chemins StorageBlobs (objet + variantes) réutilisés depuis `cutoff` : un
+    upload identique réutilise l'objet sans changer son created_at, l'âge de
+    l'objet ne dit donc rien de son usage.
+    """
+    paths = set()
+    for row in _blob_rows(client, bucket_name, used_since=cutoff):
+        paths.add(row["path"])
+        paths.update(_variant_paths(row))
+    return paths
+
+
+def _release_blobs(client, bucket_name: str, paths: list, cutoff: datetime) -> list:
+    """
+    Juste avant la suppression d'un lot : retire les lignes StorageBlobs du lot
+    inutilisées depuis `cutoff` (plus aucune déduplication possible vers ces
+    objets), puis relit les objets réutilisés depuis le début du passage et
+    les écarte. Les variantes d'une ligne retirée sont supprimées avec leur
+    objet, jamais séparément. Retourne les chemins supprimables.
+    """
+    released = (
+        client.table("StorageBlobs").delete().eq("bucket", bucket_name).in_("path", paths).lt(
+            "last_used_at", cutoff.isoformat()
+        ).execute().data
+        or []
+    )
+    candidates = list(paths)
+    for row in released:
+        candidates.extend(sorted(_variant_paths(row) - set(candidates)))
+    in_use = recently_used_blobs(client, bucket_name, cutoff)
+    return [path for path in candidates if path not in in_use]
+
+
+def list_bucket(bucket, prefix: str = "") -> Iterator[dict]:
+    """
+    Liste récursivement les objets d'un bucket (le listing storage est par
+    dossier ; les dossiers n'ont pas d'id).
+    """
+    offset = 0
+    while True:
+        items = bucket.list(prefix or None, {"limit": LIST_PAGE_SIZE, "offset": offset}) or []
+        for item in items:
+            path = f"{prefix}/{item['name']}" if prefix else item["name"]
+            if item.get("id") is None:
+                yield from list_bucket(bucket, path)
+            else:
+                yield {
+                    "path": path,
+                    "created_at": item.get("created_at"),
+                    "size": (item.get("metadata") or {}).get("size") or 0,
+                }
+        if len(items) < LIST_PAGE_SIZE:
+            break
+        offset += LIST_PAGE_SIZE
+
+
+def _is_old_enough(created_at: Optional[str], cutoff: datetime) -> bool:
+    if not created_at:
+        return False
+    try:
+        created = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return created < cutoff
+
+
+def run_gc(
+    client,
+    dry_run: bool = True,
+    min_age: timedelta = DEFAULT_MIN_AGE,
+    batch_size: int = DELETE_BATCH_SIZE,
+    batch_delay: float = DELETE_BATCH_DELAY,
+) -> dict:
+    """
+    Détecte (et supprime hors dry-run) les objets orphelins de chaque bucket :
+    non référencés, plus anciens que `min_age` et, pour les objets dédupliqués,
+    non réutilisés depuis `min_age` (StorageBlobs.last_used_at). Les lignes
+    StorageBlobs des objets supprimés sont retirées avant eux, pour que la
+    déduplication ne pointe jamais vers un objet disparu.
+    Retourne un rapport par bucket.
+    """
+    # Si la lecture des références échoue, on s'arrête : mieux vaut ne rien
+    # supprimer que tout supprimer
+    refs = collect_references(client)
+    cutoff = datetime.now(timezone.utc) - min_age
+    report = {"dry_run": dry_run, "min_age_hours": min_age.total_seconds() / 3600, "buckets": {}}
+
+    for bucket_name in BUCKETS:
+        bucket = client.storage.from_(bucket_name)
+        # Variantes des objets dédupliqués : elles suivent leur objet (même
+        # décision, même lot), jamais orphelines à elles seules
+        blob_variants = {row["path"]: _variant_paths(row) for row in _blob_rows(client, bucket_name)}
+        owned_variants = set().union(*blob_variants.values())
+        recent = recently_used_blobs(client, bucket_name, cutoff)
+        scanned = 0
+        orphans = []
+        orphan_bytes = 0
+        variant_sizes = {}
+        for obj in list_bucket(bucket):
+            scanned += 1
+            if obj["path"] in owned_variants:
+                variant_sizes[obj["path"]] = obj["size"]
+                continue
+            if (
+                obj["path"] in refs[bucket_name]
+                or obj["path"] in recent
+                or not _is_old_enough(obj["created_at"], cutoff)
+            ):
+                continue
+            orphans.append(obj["path"])
+            orphan_bytes += obj["size"]
+
+        orphan_variants = [
+            variant
+            for path in orphans
+            for variant in sorted(blob_variants.get(path, ()))
+            if variant in variant_sizes
+        ]
+        orphan_bytes += sum(variant_sizes[variant] for variant in orphan_variants)
+
+        deleted = 0
+        if not dry_run:
+            for start in range(0, len(orphans), batch_size):
+                batch = orphans[start:start + batch_size]
+                try:
+                    # Ligne StorageBlobs retirée avant l'objet : un upload
+                    # concurrent ne peut plus réutiliser un objet en cours de
+                    # suppression, et un objet réutilisé entre-temps est épargné
+                    removable = _release_blobs(client, bucket_name, batch, cutoff)
+                    if removable:
+                        bucket.remove(removable)
+                    deleted += len(removable)
+                except Exception as e:
+                    logger.error(f"GC storage : échec de suppression d'un lot ({bucket_name}): {e}")
+                if start + batch_size < len(orphans):
+                    time.sleep(batch_delay)
+
+        report["buckets"][bucket_name] = {
+            "scanned": scanned,
+            "referenced": len(refs[bucket_name]),
+            "orphans": len(orphans) + len(orphan_variants),
+            "orphan_bytes": orphan_bytes,
+            "deleted": deleted,
+            "sample": orphans[:REPORT_SAMPLE_SIZE],
+        }
+        logger.info(
+            f"GC storage {bucket_name}: {len(orphans) + len(orphan_variants)} orphelin(s) sur {scanned} objet(s), "
+            f"{orphan_bytes} octets, {deleted} supprimé(s)"
+        )
+
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Ramasse-miettes du storage Modelify")
+    parser.add_argument("--apply", action="store_true", help="supprimer réellement (dry-run sinon)")
+    parser.add_argument("--min-age-hours", type=float, default=DEFAULT_MIN_AGE.total_seconds() / 3600)
+    parser.add_argument("--batch-size", type=int, default=DELETE_BATCH_SIZE)
+    parser.add_argument("--batch-delay", type=float, default=DELETE_BATCH_DELAY)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from app.database import supabase_admin
+
+    report = run_gc(
+        supabase_admin,
+        dry_run=not args.apply,
+        min_age=timedelta(hours=args.min_age_hours),
+        batch_size=args.batch_size,
+        batch_delay=args.batch_delay,
+    )
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Réconciliation des paiements Stripe : rattrape les sessions Checkout payées
+dont le webhook a été manqué (endpoint indisponible, secret mal configuré...).
+
+Les sessions terminées sont lues par pages (Session.list) depuis le point de
+reprise enregistré dans JobWatermarks, puis appliquées par lots : un upsert
+des Orders manquantes (achats produit et panier) et une requête pour passer
+les projets payés à « payé » (fonction SQL reconcile_project_payments). Les
+endpoints de suivi (/cart/order-status, /projects/{id}/verify-payment)
+répondent ainsi depuis la base seule, sans appel Stripe par visite.
+
+Une session peut être payée jusqu'à SESSION_LIFETIME après sa création : la
+fenêtre relue commence donc SESSION_LIFETIME avant le point de reprise. Tout
+est idempotent (upsert ignore-duplicates, projets déjà payés inchangés), une
+relecture ne crée jamais de doublon. Le point de reprise n'avance que si
+toutes les pages ont été appliquées.
+
+Exécution (cron / tâche planifiée, toutes les minutes par exemple), depuis backend/ :
+
+    python -m app.jobs.stripe_reconcile                  # un passage, rapport JSON
+    python -m app.jobs.stripe_reconcile --interval 60    # en boucle
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import argparse
+import json
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "stripe_reconcile"
+PAGE_SIZE = 100
+# Durée de vie maximale d'une session Checkout (expires_at par défaut : 24 h)
+SESSION_LIFETIME = timedelta(hours=24)
+# Premier passage (aucun point de reprise) : fenêtre relue
+INITIAL_LOOKBACK = timedelta(days=7)
+
+_UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+
+def read_watermark(client) -> Optional[datetime]:
+    rows = client.table("JobWatermarks").select("value").eq("name", WATERMARK_NAME).execute().data
+    if not rows:
+        return None
+    value = datetime.fromisoformat(rows[0]["value"].replace("Z", "+00:00"))
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def save_watermark(client, value: datetime) -> None:
+    client.table("JobWatermarks").upsert(
+        {"name": WATERMARK_NAME, "value": value.isoformat(), "updated_at": datetime.now(timezone.utc).isoformat()},
+        on_conflict="name",
+    ).execute()
+
+
+def _session_product_ids(metadata: dict) -> list:
+    if metadata.get("type") == "product_purchase":
+        return [metadata["product_id"]] if metadata.get("product_id") else []
+    if metadata.get("type") == "cart_purchase":
+        return [p.strip() for p in metadata.get("product_ids", "").split(",") if p.strip()]
+    return []
+
+
+def apply_sessions(client, sessions: list) -> dict:
+    """
+    Applique une page de sessions payées : une lecture des prix (paniers),
+    un upsert des Orders et un appel RPC pour les projets, au plus.
+    """
+    orders = []
+    cart_product_ids = set()
+    payments = []
+    for session in sessions:
+        if session.get("payment_status") != "paid":
+            continue
+        metadata = session.get("metadata") or {}
+        kind = metadata.get("type")
+        if kind == "project_payment":
+            project_id = metadata.get("project_id") or ""
+            if _UUID_RE.match(project_id):
+                payments.append({"projectId": project_id, "payment_intent": session.get("payment_intent")})
+            continue
+        user_id = metadata.get("user_id")
+        product_ids = _session_product_ids(metadata)
+        if not user_id or not product_ids:
+            continue
+        if kind == "cart_purchase":
+            cart_product_ids.update(product_ids)
+        for product_id in product_ids:
+            orders.append({
+                "product_id": product_id,
+                "client_id": user_id,
+                "stripe_session_id": session.get("id"),
+                "stripe_payment_intent_id": session.get("payment_intent"),
+                # Achat unitaire : montant de la session ; panier : prix du produit (ci-dessous)
+                "amount_paid": (session.get("amount_total") or 0) / 100 if kind == "product_purchase" else None,
+                "status": "completed",
+            })
+
+    if cart_product_ids:
+        prices = (
+            client.table("Products").select("id,price").in_("id", sorted(cart_product_ids)).execute().data or []
+        )
+        price_map = {p["id"]: p["price"] for p in prices}
+        for order in orders:
+            if order["amount_paid"] is None:
+                order["amount_paid"] = price_map.get(order["product_id"], 0)
+
+    inserted = 0
+    if orders:
+        # Conflit (client_id, product_id) : commande déjà enregistrée (webhook), ignorée
+        result = client.table("Orders").upsert(
+            orders, on_conflict="client_id,product_id", ignore_duplicates=True
+        ).execute()
+        inserted = len(result.data or [])
+
+    paid = 0
+    if payments:
+        result = client.rpc(
+            "reconcile_project_payments",
+            {"payments": payments, "updated_on": datetime.now(timezone.utc).date().isoformat()},
+        ).execute()
+        paid = len(result.data or [])
+
+    return {"orders_inserted": inserted, "projects_paid": paid}
+
+
+def run_reconcile(client, page_size: int = PAGE_SIZE, now: Optional[datetime] = None) -> dict:
+    """Un passage complet depuis le point de reprise. Retourne un rapport."""
+    # Import tardif : la clé Stripe est lue à l'import (après load_dotenv en CLI)
+    from app.services.stripe_service import list_completed_checkout_sessions
+
+    started = now or datetime.now(timezone.utc)
+    watermark = read_watermark(client)
+    since = (watermark - SESSION_LIFETIME) if watermark else (started - INITIAL_LOOKBACK)
+    report = {
+        "since": since.isoformat(),
+        "pages": 0,
+        "sessions": 0,
+        "orders_inserted": 0,
+        "projects_paid": 0,
+    }
+
+    starting_after = None
+    while True:
+        page = list_completed_checkout_sessions(int(since.timestamp()), starting_after, page_size)
+        sessions = [session.to_dict() for session in page.data]
+        report["pages"] += 1
+        report["sessions"] += len(sessions)
+        applied = apply_sessions(client, sessions)
+        report["orders_inserted"] += applied["orders_inserted"]
+        report["projects_paid"] += applied["projects_paid"]
+        if not page.has_more or not sessions:
+            break
+        starting_after = sessions[-1]["id"]
+
+    save_watermark(client, started)
+    report["watermark"] = started.isoformat()
+    if report["orders_inserted"] or report["projects_paid"]:
+        logger.warning(
+            f"Réconciliation Stripe : {report['orders_inserted']} commande(s) et "
+            f"{report['projects_paid']} projet(s) rattrapés (webhook manqué ?)"
+        )
+    logger.info(f"Réconciliation Stripe : {report['sessions']} session(s) relue(s) en {report['pages']} page(s)")
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Réconciliation des paiements Stripe Modelify")
+    parser.add_argument("--interval", type=float, help="relancer toutes les N secondes (un seul passage sinon)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from app.database import supabase_admin
+
+    while True:
+        try:
+            report = run_reconcile(supabase_admin, page_size=args.page_size)
+            print(json.dumps(report, indent=2, ensure_ascii=False))
+        except Exception as e:
+            if not args.interval:
+                raise
+            logger.error(f"Réconciliation Stripe interrompue: {e}")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
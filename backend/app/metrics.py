@@ -0,0 +1,330 @@
+"""
+Métriques de l'API au format texte Prometheus (exposées sur /metrics).
+
+- latence par route (middleware ASGI, gabarit de route comme label pour
+  garder une cardinalité bornée) ;
+- nombre d'appels et latence par service amont : PostgREST, Storage, Stripe,
+  python-magic (clients Supabase instrumentés, fonctions de stripe_service) ;
+- octets uploadés par bucket ;
+- lectures coalescées (app.services.single_flight).
+
+Implémentation volontairement minimale (pas de dépendance) : compteurs et
+histogrammes en mémoire, protégés par un verrou. Chaque processus worker a
+ses propres valeurs : Prometheus doit scraper chaque instance.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Optional, Sequence
+import threading
+import time
+
+from app.request_trace import end_trace, log_if_slow, record_call, start_trace
+
+# Bornes (secondes) adaptées à des appels réseau de quelques ms à quelques s
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Compteur monotone avec labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Histogramme cumulatif avec labels (buckets fixes)."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [compteurs par bucket (+Inf en dernier), somme, total]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[labels] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(s[0]), s[1], s[2]) for labels, s in self._series.items()]
+        for labels, counts, total_sum, total_count in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {total_count}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {total_sum!r}")
+            lines.append(f"{self.name}_count{label_str} {total_count}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "modelify_http_request_duration_seconds",
+    "Durée de traitement des requêtes HTTP par route",
+    ("method", "route", "status"),
+)
+UPSTREAM_CALLS = Counter(
+    "modelify_upstream_calls_total",
+    "Appels aux services amont (PostgREST, Storage, Stripe, python-magic)",
+    ("upstream", "operation", "outcome"),
+)
+UPSTREAM_LATENCY = Histogram(
+    "modelify_upstream_call_duration_seconds",
+    "Durée des appels aux services amont",
+    ("upstream", "operation"),
+)
+UPLOAD_BYTES = Counter(
+    "modelify_upload_bytes_total",
+    "Octets envoyés au storage, par bucket",
+    ("bucket",),
+)
+
+SINGLE_FLIGHT_CALLS = Counter(
+    "modelify_single_flight_calls_total",
+    "Lectures coalescées : appels exécutés (leader) ou rattachés à un appel en cours (collapsed)",
+    ("group", "outcome"),
+)
+
+REGISTRY = [REQUEST_LATENCY, UPSTREAM_CALLS, UPSTREAM_LATENCY, UPLOAD_BYTES, SINGLE_FLIGHT_CALLS]
+
+
+def render_metrics() -> str:
+    """Toutes les métriques au format d'exposition texte Prometheus."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def record_upstream(upstream: str, operation: str, duration: float, ok: bool) -> None:
+    UPSTREAM_CALLS.inc(upstream, operation, "ok" if ok else "error")
+    UPSTREAM_LATENCY.observe(duration, upstream, operation)
+    record_call(upstream, operation, duration)
+
+
+@contextmanager
+def track_upstream(upstream: str, operation: str):
+    """Mesure un appel amont : compteur (ok / error) + histogramme de durée."""
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        record_upstream(upstream, operation, time.perf_counter() - start, ok)
+
+
+def instrumented(upstream: str, operation: Optional[str] = None):
+    """Décorateur : mesure chaque appel de la fonction comme un appel amont."""
+
+    def decorator(func):
+        name = operation or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_upstream(upstream, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# --- Clients Supabase instrumentés ---------------------------------------
+
+_QUERY_VERBS = {"select", "insert", "update", "upsert", "delete"}
+
+
+class _TracedQuery:
+    """
+    Proxy d'un query builder PostgREST : suit la chaîne d'appels et mesure
+    `execute()` avec l'opération « Table.verbe » comme label.
+    """
+
+    __slots__ = ("_target", "_operation")
+
+    def __init__(self, target, operation: str):
+        self._target = target
+        self._operation = operation
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name == "execute":
+            def execute(*args, **kwargs):
+                with track_upstream("postgrest", self._operation):
+                    return attr(*args, **kwargs)
+            return execute
+
+        operation = self._operation
+        if name in _QUERY_VERBS and "." not in operation:
+            operation = f"{operation}.{name}"
+
+        if callable(attr):
+            def chain(*args, **kwargs):
+                return _TracedQuery(attr(*args, **kwargs), operation)
+            return chain
+        # Propriétés de la chaîne (ex: .not_)
+        return _TracedQuery(attr, operation)
+
+
+class _TracedBucket:
+    """Proxy d'un bucket Storage : chaque méthode est mesurée, les uploads comptés."""
+
+    __slots__ = ("_target", "_bucket")
+
+    def __init__(self, target, bucket: str):
+        self._target = target
+        self._bucket = bucket
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        # get_public_url est calculée localement : pas d'appel réseau à mesurer
+        if not callable(attr) or name == "get_public_url":
+            return attr
+
+        def call(*args, **kwargs):
+            with track_upstream("storage", f"{self._bucket}.{name}"):
+                result = attr(*args, **kwargs)
+            if name in ("upload", "update") and len(args) > 1 and isinstance(args[1], (bytes, bytearray)):
+                UPLOAD_BYTES.inc(self._bucket, amount=len(args[1]))
+            return result
+
+        return call
+
+
+class _TracedStorage:
+    __slots__ = ("_target",)
+
+    def __init__(self, target):
+        self._target = target
+
+    def from_(self, bucket: str):
+        return _TracedBucket(self._target.from_(bucket), bucket)
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+class InstrumentedClient:
+    """
+    Enveloppe un client Supabase : table(), rpc() et storage sont mesurés,
+    le reste (auth...) est délégué tel quel.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self.storage = _TracedStorage(client.storage)
+
+    def table(self, name: str):
+        return _TracedQuery(self._client.table(name), name)
+
+    def rpc(self, fn: str, *args, **kwargs):
+        return _TracedQuery(self._client.rpc(fn, *args, **kwargs), f"rpc.{fn}")
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI (plus léger qu'un BaseHTTPMiddleware) : latence par route.
+    Le label est le gabarit de route (/api/projects/{projectId}), jamais le
+    chemin brut, pour éviter une explosion du nombre de séries.
+    Ouvre aussi la trace des appels amont de la requête (log des requêtes lentes).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        trace, token = start_trace()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_trace(token)
+            route = route_template(scope)
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope["method"], route, str(status_code))
+            log_if_slow(trace, scope["method"], route, status_code)
+
+
+def route_template(scope) -> str:
+    """
+    Gabarit de la route résolue pour cette requête. Pour une route incluse via
+    include_router, FastAPI expose le gabarit complet (préfixe /api compris)
+    dans le contexte effectif ; `scope["route"]` ne porte que le chemin local.
+    """
+    effective = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(effective, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
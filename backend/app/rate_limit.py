@@ -0,0 +1,248 @@
+"""
+Limitation de débit des endpoints coûteux (uploads, création de paiements
+Stripe, envoi de messages) et admission des uploads.
+
+- Seau à jetons par utilisateur et par IP : chaque route consomme un nombre
+  de jetons (ROUTE_COSTS) dans les deux seaux à la fois, les seaux se
+  remplissent en continu. Un seau insuffisant → 429 avec Retry-After, et
+  aucun jeton consommé dans l'autre. Utilisation en dépendance de route :
+
+      @router.post("/cart/checkout", dependencies=[Depends(rate_limit("checkout"))])
+
+- Plafond d'octets d'upload en cours de traitement (UploadAdmissionMiddleware) :
+  une requête multipart dont le Content-Length ferait dépasser
+  MAX_INFLIGHT_UPLOAD_BYTES est refusée (429) avant la lecture du corps ;
+  une requête multipart sans Content-Length (chunked) est refusée (411).
+  Le plafond est propre à chaque worker, comme la mémoire qu'il protège.
+
+L'état des seaux est enfichable (`set_backend`) : en mémoire par défaut
+(un état par worker), ou partagé par tous les workers via une fonction SQL
+(RATE_LIMIT_BACKEND=database, migrations 004 et 014).
+"""
+from typing import Dict, Optional, Tuple
+import logging
+import math
+import os
+import threading
+import time
+
+from fastapi import Depends, HTTPException, Request, status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app.dependencies import get_current_user
+
+logger = logging.getLogger(__name__)
+
+# Seau par utilisateur : rafale maximale et remplissage (jetons par minute)
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "60"))
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+# Seau par IP plus large : plusieurs comptes derrière un même NAT
+IP_BUCKET_FACTOR = 4
+
+# Jetons consommés par appel
+ROUTE_COSTS = {
+    "upload": 10,     # POST /projects, /projects/{id}/files, /products
+    "checkout": 5,    # /cart/checkout, /products/{id}/buy, /projects/{id}/pay
+    "message": 2,     # POST /projects/{id}/messages
+}
+
+MAX_INFLIGHT_UPLOAD_BYTES = int(os.getenv("MAX_INFLIGHT_UPLOAD_BYTES", str(256 * 1024 * 1024)))
+# Délai suggéré au client quand le plafond d'upload est atteint
+UPLOAD_RETRY_AFTER = 5
+
+
+class MemoryBackend:
+    """Seaux en mémoire du processus : état par worker, perdu au redémarrage."""
+
+    # Au-delà, les seaux pleins (inactifs) sont purgés
+    MAX_BUCKETS = 100_000
+
+    def __init__(self):
+        # clé → (jetons, mis à jour le, plein à partir de)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, buckets: Dict[str, float], cost: float, refill_per_second: float) -> float:
+        """
+        Consomme `cost` jetons dans chacun des seaux {clé: capacité}, seulement
+        si tous en ont assez. Retourne 0 si accepté, sinon l'attente (s) du
+        seau le plus en retard.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = {}
+            for key, capacity in buckets.items():
+                tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+                levels[key] = min(capacity, tokens + (now - updated) * refill_per_second)
+            wait = max((cost - tokens) / refill_per_second for tokens in levels.values())
+            spent = cost if wait <= 0 else 0.0
+            for key, capacity in buckets.items():
+                tokens = levels[key] - spent
+                self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_per_second)
+            if len(self._buckets) > self.MAX_BUCKETS:
+                self._prune(now)
+            return max(wait, 0.0)
+
+    def _prune(self, now: float) -> None:
+        # Un seau redevenu plein équivaut à un seau absent (recréé plein) :
+        # chacun est jugé sur sa propre capacité
+        self._buckets = {key: value for key, value in self._buckets.items() if now < value[2]}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseBackend:
+    """
+    Seaux partagés par tous les workers : fonction SQL `rate_limit_take_all`
+    (migration 014, mise à jour atomique des lignes des seaux). Un aller-retour
+    par requête limitée.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    def take(self, buckets: Dict[str, float], cost: float, refill_per_second: float) -> float:
+        client = self._client
+        if client is None:
+            from app.database import supabase_admin as client
+        result = client.rpc(
+            "rate_limit_take_all",
+            {
+                "bucket_keys": list(buckets),
+                "capacities": list(buckets.values()),
+                "cost": cost,
+                "refill_per_second": refill_per_second,
+            },
+        ).execute()
+        return float(result.data or 0)
+
+    def reset(self) -> None:
+        pass
+
+
+def _default_backend():
+    if os.getenv("RATE_LIMIT_BACKEND", "memory").lower() == "database":
+        return DatabaseBackend()
+    return MemoryBackend()
+
+
+_state = {"backend": _default_backend()}
+
+
+def get_backend():
+    return _state["backend"]
+
+
+def set_backend(backend) -> None:
+    """Remplace le stockage des seaux (objet exposant take() et reset())."""
+    _state["backend"] = backend
+
+
+def _take(buckets: Dict[str, float], cost: float) -> float:
+    refill = RATE_LIMIT_PER_MINUTE / 60
+    try:
+        return _state["backend"].take(buckets, min(cost, *buckets.values()), refill)
+    except Exception as e:
+        # Stockage indisponible : on laisse passer plutôt que bloquer paiements et uploads
+        logger.error(f"Limitation de débit indisponible ({', '.join(buckets)}): {e}")
+        return 0.0
+
+
+def client_ip(request: Request) -> str:
+    # Derrière un proxy, uvicorn (proxy_headers) a déjà résolu X-Forwarded-For
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limit(route: str):
+    """
+    Dépendance : consomme ROUTE_COSTS[route] jetons dans le seau de
+    l'utilisateur et dans celui de son IP. 429 + Retry-After si l'un est vide
+    (rien n'est alors consommé dans l'autre).
+    """
+    cost = ROUTE_COSTS[route]
+
+    def dependency(request: Request, current_user=Depends(get_current_user)) -> None:
+        wait = _take(
+            {
+                f"user:{current_user.id}": RATE_LIMIT_BURST,
+                f"ip:{client_ip(request)}": RATE_LIMIT_BURST * IP_BUCKET_FACTOR,
+            },
+            cost,
+        )
+        if wait:
+            retry_after = max(1, math.ceil(wait))
+            logger.warning(
+                f"Limite de débit atteinte ({route}) pour {current_user.id} / {client_ip(request)}, "
+                f"réessai dans {retry_after}s"
+            )
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Trop de requêtes, veuillez réessayer plus tard",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+    return dependency
+
+
+class UploadAdmissionMiddleware:
+    """
+    Middleware ASGI : plafonne les octets d'upload multipart en cours de
+    traitement dans le worker. La réservation (Content-Length) est libérée
+    à la fin de la réponse. Sans Content-Length (transfert chunked), la taille
+    ne peut pas être réservée d'avance : la requête est refusée (411).
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_INFLIGHT_UPLOAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.inflight = 0
+
+    def _reserved_size(self, scope) -> Optional[int]:
+        """Octets à réserver ; None hors upload multipart, -1 si la taille est inconnue."""
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            return None
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            return None
+        try:
+            size = int(headers.get("content-length", ""))
+        except ValueError:
+            return -1
+        return size if size >= 0 else -1
+
+    async def __call__(self, scope, receive, send):
+        size = self._reserved_size(scope)
+        if size is None:
+            await self.app(scope, receive, send)
+            return
+
+        if size < 0:
+            logger.warning("Upload refusé : multipart sans Content-Length")
+            response = JSONResponse(
+                {"detail": "Content-Length requis pour les envois de fichiers"},
+                status_code=status.HTTP_411_LENGTH_REQUIRED,
+            )
+            await response(scope, receive, send)
+            return
+
+        # Une requête seule plus grosse que le plafond passe si rien n'est en cours
+        if self.inflight and self.inflight + size > self.max_bytes:
+            logger.warning(
+                f"Upload refusé ({size} octets) : {self.inflight} octets déjà en cours de traitement"
+            )
+            response = JSONResponse(
+                {"detail": "Serveur occupé, veuillez réessayer dans quelques secondes"},
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(UPLOAD_RETRY_AFTER)},
+            )
+            await response(scope, receive, send)
+            return
+
+        self.inflight += size
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.inflight -= size
@@ -0,0 +1,166 @@
+"""
+Suivi des allers-retours amont (Supabase, Stripe) d'une requête.
+
+Chaque appel mesuré par app.metrics (requête PostgREST, appel Storage,
+fonction de stripe_service) est aussi ajouté à la trace de la requête en
+cours. En fin de requête :
+
+- si la requête dépasse SLOW_REQUEST_SECONDS, un log détaille ses appels
+  (service, opération, durée) ;
+- si l'endpoint déclare un budget (`@round_trip_budget(n)`) et le dépasse,
+  un warning est émis et les observateurs enregistrés sont notifiés (le
+  plugin pytest de tests/ fait alors échouer le test).
+"""
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, List, Optional
+import inspect
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+
+# Appels mesurés mais locaux (pas d'aller-retour réseau) : hors budget
+LOCAL_UPSTREAMS = {"magic"}
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+
+# Observateurs des dépassements de budget : f(endpoint, budget, trace_calls)
+_budget_listeners: List[Callable] = []
+
+
+class RequestTrace:
+    """Appels amont d'une requête, dans l'ordre : (service, opération, durée)."""
+
+    __slots__ = ("calls", "started")
+
+    def __init__(self):
+        self.calls = []
+        self.started = time.perf_counter()
+
+    def record(self, upstream: str, operation: str, duration: float) -> None:
+        self.calls.append((upstream, operation, duration))
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def upstream_time(self) -> float:
+        return sum(call[2] for call in self.calls)
+
+    def breakdown(self, calls: Optional[list] = None) -> str:
+        """Détail lisible des appels, ex: « postgrest Projects.select 12.3ms »."""
+        return ", ".join(
+            f"{upstream} {operation} {duration * 1000:.1f}ms"
+            for upstream, operation, duration in (self.calls if calls is None else calls)
+        )
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def start_trace() -> tuple:
+    """Démarre une trace pour le contexte courant. Retourne (trace, jeton de reset)."""
+    trace = RequestTrace()
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token) -> None:
+    _current_trace.reset(token)
+
+
+def record_call(upstream: str, operation: str, duration: float) -> None:
+    """Ajoute un appel amont à la trace en cours (sans effet hors requête)."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(upstream, operation, duration)
+
+
+def log_if_slow(trace: RequestTrace, method: str, route: str, status_code: int) -> None:
+    elapsed = trace.elapsed
+    if elapsed < SLOW_REQUEST_SECONDS:
+        return
+    logger.warning(
+        f"Requête lente {method} {route} ({status_code}): {elapsed * 1000:.0f}ms, "
+        f"{len(trace.calls)} appel(s) amont ({trace.upstream_time * 1000:.0f}ms) "
+        f"[{trace.breakdown()}]"
+    )
+
+
+def add_budget_listener(listener: Callable) -> None:
+    _budget_listeners.append(listener)
+
+
+def remove_budget_listener(listener: Callable) -> None:
+    if listener in _budget_listeners:
+        _budget_listeners.remove(listener)
+
+
+def _check_budget(func, budget: int, trace: RequestTrace, start: int) -> None:
+    calls = [call for call in trace.calls[start:] if call[0] not in LOCAL_UPSTREAMS]
+    if len(calls) <= budget:
+        return
+    logger.warning(
+        f"Budget d'allers-retours dépassé pour {func.__name__}: "
+        f"{len(calls)} appel(s) pour un budget de {budget} [{trace.breakdown(calls)}]"
+    )
+    for listener in list(_budget_listeners):
+        listener(func.__name__, budget, calls)
+
+
+def round_trip_budget(budget: int):
+    """
+    Déclare le nombre maximal d'appels amont (Supabase + Stripe) d'un endpoint,
+    dans le pire cas. À placer sous le décorateur de route :
+
+        @router.post("/projects/{projectId}/quote")
+        @round_trip_budget(7)
+        async def create_project_quote(...):
+
+    Le décompte porte sur l'exécution du handler (les dépendances comme
+    get_current_user n'en font pas partie).
+    """
+
+    def decorator(func):
+        def enter():
+            trace = _current_trace.get()
+            token = None
+            if trace is None:
+                trace, token = start_trace()
+            return trace, token, len(trace.calls)
+
+        def leave(trace, token, start):
+            try:
+                _check_budget(func, budget, trace, start)
+            finally:
+                if token is not None:
+                    end_trace(token)
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                trace, token, start = enter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    leave(trace, token, start)
+            wrapper = async_wrapper
+        else:
+            @wraps(func)
+            def sync_wrapper(*args, **kwargs):
+                trace, token, start = enter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    leave(trace, token, start)
+            wrapper = sync_wrapper
+
+        wrapper.round_trip_budget = budget
+        return wrapper
+
+    return decorator
@@ -0,0 +1,157 @@
+"""
+Sérialisation JSON rapide et compression des réponses.
+
+- `FastJSONResponse` : réponse JSON sérialisée avec orjson (repli sur le module
+  json si orjson n'est pas installé). C'est la classe de réponse par défaut de
+  l'application. Pour les grosses listes (GET /users, /projects, /orders/mine,
+  /legal), l'endpoint la retourne directement : FastAPI saute alors
+  `jsonable_encoder`, qui coûte à lui seul plusieurs fois la sérialisation.
+- `CompressionMiddleware` : middleware ASGI qui compresse en brotli (si le
+  paquet est installé) ou gzip selon l'en-tête Accept-Encoding, au-delà de
+  COMPRESSION_MIN_SIZE octets. Les réponses en streaming (archives ZIP) et les
+  types déjà compressés ne sont jamais recompressés.
+"""
+from typing import Any, Optional
+import gzip
+import json
+import os
+
+from fastapi.encoders import jsonable_encoder
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance listée dans requirements.txt
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# En dessous, l'en-tête et le CPU de compression coûtent plus qu'ils ne rapportent
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Niveaux rapides : les réponses sont compressées à chaque requête
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def _default(value: Any) -> Any:
+    # Types hors JSON natif (Decimal, modèles pydantic, ensembles...)
+    return jsonable_encoder(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Sérialise `content` en JSON compact (UTF-8)."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Réponse JSON sérialisée par orjson (datetime, UUID, dataclasses natifs)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _accepted(header: str) -> set:
+    """Encodages acceptés (q > 0) d'un en-tête Accept-Encoding."""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            accepted.add(name)
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Encodage retenu pour la réponse : "br", "gzip" ou None."""
+    accepted = _accepted(accept_encoding)
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compression (brotli / gzip). Seules les réponses envoyées
+    en un seul message (cas des réponses JSON) sont compressées ; une réponse en
+    plusieurs morceaux (StreamingResponse) est transmise telle quelle.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Retenu jusqu'au premier morceau du corps (les en-têtes en dépendent)
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if (
+                not message.get("more_body", False)
+                and len(body) >= self.minimum_size
+                and _is_compressible(headers)
+            ):
+                body = compress(body, encoding)
+                headers["content-encoding"] = encoding
+                headers["content-length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                # Le corps envoyé diffère octet par octet : un ETag fort devient faible
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["etag"] = f"W/{etag}"
+                message = {**message, "body": body}
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -2,10 +2,15 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from pydantic import BaseModel
 from app.database import supabase_admin
 from app.dependencies import get_current_user
-from app.services.stripe_service import get_or_create_customer, create_cart_checkout_session
+from app.rate_limit import rate_limit
+from app.responses import FastJSONResponse
+from app.services.single_flight import single_flight
+from app.services.stripe_service import (
+    get_or_create_customer,
+    create_cart_checkout_session,
+)
 import logging
 import os
-import traceback
 import stripe
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
@@ -18,7 +23,7 @@ class CartCheckoutRequest(BaseModel):
     product_ids: list[str]
 
 
-@router.post("/cart/checkout", status_code=status.HTTP_200_OK)
+@router.post("/cart/checkout", status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("checkout"))])
 async def checkout_cart(payload: CartCheckoutRequest, current_user=Depends(get_current_user)):
     """
     Initier le paiement Stripe pour l'achat de plusieurs produits (panier) en une
@@ -92,18 +97,26 @@ async def checkout_cart(payload: CartCheckoutRequest, current_user=Depends(get_c
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@single_flight("purchased_ids")
+def _load_purchased_ids(user_id: str) -> list:
+    result = (
+        supabase_admin.table("Orders")
+        .select("product_id")
+        .eq("client_id", user_id)
+        .eq("status", "completed")
+        .execute()
+    )
+    return [o["product_id"] for o in (result.data or [])]
+
+
 @router.get("/cart/purchased-ids", status_code=status.HTTP_200_OK)
 async def get_purchased_ids(current_user=Depends(get_current_user)):
-    """Retourne les ids des produits déjà achetés par l'utilisateur courant."""
+    """
+    Retourne les ids des produits déjà achetés par l'utilisateur courant
+    (requêtes simultanées du même client coalescées).
+    """
     try:
-        result = (
-            supabase_admin.table("Orders")
-            .select("product_id")
-            .eq("client_id", current_user.id)
-            .eq("status", "completed")
-            .execute()
-        )
-        return {"product_ids": [o["product_id"] for o in (result.data or [])]}
+        return {"product_ids": await _load_purchased_ids(current_user.id)}
     except Exception as e:
         logger.error(f"Erreur récupération des achats: {e}")
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
@@ -123,7 +136,7 @@ async def get_my_product_orders(current_user=Depends(get_current_user)):
         orders = result.data or []
 
         if not orders:
-            return []
+            return FastJSONResponse([])
 
         product_ids = list({o["product_id"] for o in orders if o.get("product_id")})
         products_result = (
@@ -134,7 +147,7 @@ async def get_my_product_orders(current_user=Depends(get_current_user)):
         )
         products_by_id = {p["id"]: p for p in (products_result.data or [])}
 
-        return [
+        return FastJSONResponse([
             {
                 "id": o["id"],
                 "product_id": o["product_id"],
@@ -144,7 +157,7 @@ async def get_my_product_orders(current_user=Depends(get_current_user)):
                 "product": products_by_id.get(o["product_id"]),
             }
             for o in orders
-        ]
+        ])
     except Exception as e:
         logger.error(f"Erreur récupération commandes produits: {e}")
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
@@ -153,12 +166,12 @@ async def get_my_product_orders(current_user=Depends(get_current_user)):
 @router.get("/cart/order-status", status_code=status.HTTP_200_OK)
 async def get_order_status(session_id: str, current_user=Depends(get_current_user)):
     """
-    Vérifie si une session de paiement a été enregistrée dans Orders.
-    Si non, interroge Stripe directement et crée les commandes si le paiement est confirmé.
-    Fonctionne pour les achats produit et panier.
+    Vérifie si une session de paiement a été enregistrée dans Orders (achats
+    produit et panier). Appelé en boucle par la page de retour de Stripe :
+    répond depuis la base seule. Les commandes y sont écrites par le webhook,
+    ou par la réconciliation (app.jobs.stripe_reconcile) si le webhook a été manqué.
     """
     try:
-        # 1. Déjà en base ?
         existing = (
             supabase_admin.table("Orders")
             .select("id")
@@ -167,79 +180,8 @@ async def get_order_status(session_id: str, current_user=Depends(get_current_use
             .eq("status", "completed")
             .execute()
         )
-        if existing.data:
-            return {"completed": True, "count": len(existing.data)}
-
-        # 2. Interroger Stripe directement
-        try:
-            stripe_session = stripe.checkout.Session.retrieve(session_id)
-        except Exception as e:
-            logger.error(f"Erreur récupération session Stripe: {e}\n{traceback.format_exc()}")
-            return {"completed": False, "count": 0}
-
-        if stripe_session.payment_status != "paid":
-            return {"completed": False, "count": 0}
-
-        # 3. Vérifier que la session appartient bien à cet utilisateur
-        # stripe_session.metadata est un StripeObject : ._data n'existe plus dans
-        # les versions récentes de stripe-python (Attribute('_data') -> 500).
-        # On passe par .to_dict(), comme le endpoint verify-payment des projets.
-        metadata = stripe_session.metadata.to_dict() if stripe_session.metadata else {}
-        user_id = metadata.get("user_id")
-        if not user_id or user_id != current_user.id:
-            return {"completed": False, "count": 0}
-
-        event_type = metadata.get("type")
-        payment_intent = stripe_session.payment_intent
-        amount_total = (stripe_session.amount_total or 0) / 100
-        inserted = 0
-
-        if event_type == "product_purchase":
-            product_id = metadata.get("product_id")
-            if product_id:
-                # upsert idempotent : évite un doublon si le webhook Stripe a déjà
-                # enregistré la commande (contrainte UNIQUE (client_id, product_id)).
-                supabase_admin.table("Orders").upsert(
-                    {
-                        "product_id": product_id,
-                        "client_id": user_id,
-                        "stripe_session_id": session_id,
-                        "stripe_payment_intent_id": payment_intent,
-                        "amount_paid": amount_total,
-                        "status": "completed",
-                    },
-                    on_conflict="client_id,product_id",
-                    ignore_duplicates=True,
-                ).execute()
-                inserted = 1
-                logger.info(f"Commande produit créée via vérification directe: user={user_id}, product={product_id}")
-
-        elif event_type == "cart_purchase":
-            product_ids = [p.strip() for p in metadata.get("product_ids", "").split(",") if p.strip()]
-            if product_ids:
-                prices_res = supabase_admin.table("Products").select("id,price").in_("id", product_ids).execute()
-                price_map = {p["id"]: p["price"] for p in (prices_res.data or [])}
-                rows = [
-                    {
-                        "product_id": pid,
-                        "client_id": user_id,
-                        "stripe_session_id": session_id,
-                        "stripe_payment_intent_id": payment_intent,
-                        "amount_paid": price_map.get(pid, 0),
-                        "status": "completed",
-                    }
-                    for pid in product_ids
-                ]
-                supabase_admin.table("Orders").upsert(
-                    rows,
-                    on_conflict="client_id,product_id",
-                    ignore_duplicates=True,
-                ).execute()
-                inserted = len(rows)
-                logger.info(f"Commandes panier créées via vérification directe: user={user_id}, {inserted} produit(s)")
-
-        return {"completed": inserted > 0, "count": inserted}
-
+        count = len(existing.data or [])
+        return {"completed": count > 0, "count": count}
     except Exception as e:
-        logger.error(f"Erreur vérification statut commande: {e}\n{traceback.format_exc()}")
+        logger.error(f"Erreur vérification statut commande: {e}")
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from app.database import supabase_admin
+from app.dependencies import get_current_user
+from app.request_trace import round_trip_budget
+from app.routers.products import check_admin
+from app.services.table_export import EXPORTS, FORMATS, encode_export, keyset_pages
+from datetime import datetime, timezone
+import itertools
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/admin/exports/{dataset}")
+@round_trip_budget(2)
+async def export_dataset(dataset: str, format: str = "csv", current_user=Depends(get_current_user)):
+    """
+    Export complet d'une table pour le reporting (Admin uniquement), en streaming.
+
+    - `dataset` : orders, projects ou users
+    - `format` : csv (défaut) ou ndjson (un objet JSON par ligne)
+
+    La table est lue par pages (curseur keyset sur l'id) pendant l'envoi :
+    la mémoire utilisée ne dépend pas de la taille de la table.
+    """
+    if dataset not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Export inconnu")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail="Format invalide (csv ou ndjson)")
+    check_admin(current_user)
+
+    table, columns = EXPORTS[dataset]
+    pages = keyset_pages(supabase_admin, table, columns)
+    # Première page lue avant de répondre : une base indisponible donne une
+    # 500 plutôt qu'un fichier vide
+    try:
+        first_page = next(pages, [])
+    except Exception as e:
+        logger.error(f"Erreur export {dataset}: {e}")
+        raise HTTPException(status_code=500, detail="Erreur lors de l'export")
+
+    filename = f"modelify-{dataset}-{datetime.now(timezone.utc):%Y%m%d}.{format}"
+    logger.info(f"Export {dataset} ({format}) demandé par {current_user.id}")
+    return StreamingResponse(
+        encode_export(itertools.chain([first_page], pages), columns, format),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
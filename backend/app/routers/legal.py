@@ -1,13 +1,83 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status
 from pydantic import BaseModel
 from app.database import supabase, supabase_admin
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, is_cached_admin
+from app.responses import dumps
+from app.services.cache import register_cache
 from datetime import datetime, timezone
+from typing import Optional
+import hashlib
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Réponses revalidées à chaque affichage (ETag → 304) : une mise à jour est
+# visible immédiatement. Une URL versionnée (?v=<version courante>) ne change
+# jamais de contenu : elle est cacheable un an.
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _load_legal_documents() -> list:
+    return supabase.table("LegalDocuments").select("*").order("slug").execute().data or []
+
+
+# Documents légaux en mémoire (préchauffés au démarrage, invalidés à la mise à jour)
+legal_cache = register_cache("legal_documents", _load_legal_documents)
+
+# Corps JSON et ETags calculés une fois par valeur du cache (recalculés
+# quand le cache est rechargé ou invalidé)
+_rendered = {"source": None, "list": None, "versions": None, "slugs": {}}
+
+
+class _Rendered:
+    __slots__ = ("document", "body", "etag")
+
+    def __init__(self, document, body: bytes, etag: str):
+        self.document = document
+        self.body = body
+        self.etag = etag
+
+
+def _document_etag(document: dict) -> str:
+    return f'"legal-{document["slug"]}-v{document.get("version")}"'
+
+
+def _render(documents: list) -> dict:
+    if _rendered["source"] is not documents:
+        # ETag de la liste : versions de tous les documents
+        versions = ",".join(f"{d['slug']}:{d.get('version')}" for d in documents)
+        digest = hashlib.sha1(versions.encode()).hexdigest()[:16]
+        manifest = {d["slug"]: d.get("version") for d in documents}
+        _rendered.update(
+            source=documents,
+            list=_Rendered(documents, dumps(documents), f'"legal-{digest}"'),
+            versions=_Rendered(manifest, dumps(manifest), f'"legal-versions-{digest}"'),
+            slugs={
+                d["slug"]: _Rendered(d, dumps(d), _document_etag(d))
+                for d in documents
+            },
+        )
+    return _rendered
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match correspond à l'ETag (comparaison faible : la compression affaiblit l'ETag)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _conditional_response(request: Request, rendered: _Rendered, cache_control: str) -> Response:
+    headers = {"ETag": rendered.etag, "Cache-Control": cache_control}
+    if _not_modified(request, rendered.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(rendered.body, media_type="application/json", headers=headers)
+
 
 class LegalDocumentUpdate(BaseModel):
     title: str
@@ -15,18 +85,52 @@ class LegalDocumentUpdate(BaseModel):
 
 
 @router.get("/legal", status_code=status.HTTP_200_OK)
-async def get_all_legal_documents():
+async def get_all_legal_documents(request: Request):
+    """Tous les documents légaux (ETag sur leurs versions, 304 si inchangés)."""
     try:
-        response = (
-            supabase.table("LegalDocuments")
-            .select("*")
-            .order("slug")
-            .execute()
-        )
-        return response.data or []
+        rendered = _render(await legal_cache.aget())
     except Exception as e:
         logger.error(f"Erreur récupération documents légaux: {e}")
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
+    return _conditional_response(request, rendered["list"], REVALIDATE_CACHE_CONTROL)
+
+
+@router.get("/legal/versions", status_code=status.HTTP_200_OK)
+async def get_legal_versions(request: Request):
+    """
+    Version courante de chaque document ({slug: version}), revalidée par ETag.
+    Le front s'en sert pour construire les URLs versionnées /legal/{slug}?v=,
+    servies ensuite depuis le cache HTTP du navigateur.
+    """
+    try:
+        rendered = _render(await legal_cache.aget())
+    except Exception as e:
+        logger.error(f"Erreur récupération versions des documents légaux: {e}")
+        raise HTTPException(status_code=500, detail="Erreur interne du serveur")
+    return _conditional_response(request, rendered["versions"], REVALIDATE_CACHE_CONTROL)
+
+
+@router.get("/legal/{slug}", status_code=status.HTTP_200_OK)
+async def get_legal_document(slug: str, request: Request, v: Optional[int] = None):
+    """
+    Un document légal. Avec `v` égal à la version courante, la réponse est
+    immuable (Cache-Control d'un an) ; sinon elle est revalidée par ETag.
+    Un `v` plus récent que le cache du worker (mise à jour faite par un autre
+    worker) reçoit la version en cache, non immuable : le rafraîchissement
+    périodique la met à jour, `v` ne déclenche jamais de lecture en base.
+    """
+    try:
+        rendered = _render(await legal_cache.aget())["slugs"].get(slug)
+    except Exception as e:
+        logger.error(f"Erreur récupération document légal '{slug}': {e}")
+        raise HTTPException(status_code=500, detail="Erreur interne du serveur")
+
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="Document introuvable")
+    immutable = v is not None and v == rendered.document.get("version")
+    return _conditional_response(
+        request, rendered, IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    )
 
 
 @router.put("/legal/{slug}", status_code=status.HTTP_200_OK)
@@ -35,21 +139,22 @@ async def update_legal_document(
     body: LegalDocumentUpdate,
     current_user=Depends(get_current_user),
 ):
-    try:
-        admin_check = (
-            supabase_admin.table("Users")
-            .select("role")
-            .eq("id", current_user.id)
-            .single()
-            .execute()
-        )
-        if not admin_check.data or admin_check.data.get("role") != "admin":
-            raise HTTPException(status_code=403, detail="Accès administrateur requis")
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Erreur vérification rôle admin: {e}")
-        raise HTTPException(status_code=500, detail="Erreur interne du serveur")
+    if not is_cached_admin(current_user.id):
+        try:
+            admin_check = (
+                supabase_admin.table("Users")
+                .select("role")
+                .eq("id", current_user.id)
+                .single()
+                .execute()
+            )
+            if not admin_check.data or admin_check.data.get("role") != "admin":
+                raise HTTPException(status_code=403, detail="Accès administrateur requis")
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Erreur vérification rôle admin: {e}")
+            raise HTTPException(status_code=500, detail="Erreur interne du serveur")
 
     try:
         existing = (
@@ -75,6 +180,7 @@ async def update_legal_document(
         )
         if not response.data:
             raise HTTPException(status_code=500, detail="Erreur lors de la mise à jour")
+        legal_cache.invalidate()
         return response.data[0]
     except HTTPException:
         raise
@@ -1,11 +1,19 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
 from app.database import supabase_admin
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, is_cached_admin
+from app.rate_limit import rate_limit
+from app.request_trace import round_trip_budget
 from app.routers.projects import (
     sanitize_filename,
     validate_mime_type,
+    _apply_image_urls,
+    _chat_summary,
+    _storage_path,
+    CHAT_SUMMARY_EMBED,
     MAX_FILE_SIZE,
 )
+from app.services.image_variants import sign_batch, sign_with_variants
+from app.services.storage_service import read_upload, store_content_addressed
 from typing import Optional
 from datetime import datetime, timezone
 import logging
@@ -23,72 +31,122 @@ ALLOWED_MESSAGE_IMAGE_TYPES = [
 
 MAX_MESSAGE_LENGTH = 2000
 
+# Vue d'ensemble d'un projet : nombre de messages récents inclus
+OVERVIEW_MESSAGE_LIMIT = 50
 
-def _check_project_access(projectId: str, current_user) -> tuple:
-    """
-    Vérifie que le projet existe et que l'utilisateur courant y a accès
-    (propriétaire ou admin). Retourne (project, is_admin).
-    """
-    result = supabase_admin.table("Projects").select("*").eq("id", projectId).execute()
-    if not result.data:
-        raise HTTPException(status_code=404, detail="Projet non trouvé")
-
-    project = result.data[0]
 
-    is_admin = False
+def _is_admin_in_db(user_id: str) -> bool:
+    """Rôle admin lu en base (False si la lecture échoue)."""
     try:
         user_role_data = (
             supabase_admin.table("Users")
             .select("role")
-            .eq("id", current_user.id)
+            .eq("id", user_id)
             .single()
             .execute()
         )
-        is_admin = bool(user_role_data.data) and user_role_data.data.get("role") == "admin"
+        return bool(user_role_data.data) and user_role_data.data.get("role") == "admin"
     except Exception as e:
-        logger.warning(f"Vérification du rôle impossible pour {current_user.id}: {e}")
+        logger.warning(f"Vérification du rôle impossible pour {user_id}: {e}")
+        return False
 
+
+def _check_project_access(projectId: str, current_user) -> tuple:
+    """
+    Vérifie que le projet existe et que l'utilisateur courant y a accès
+    (propriétaire ou admin). Retourne (project, is_admin) ; le projet porte
+    l'embed ProjectChatSummaries (voir _mark_chat_read).
+    """
+    result = supabase_admin.table("Projects").select(f"*, {CHAT_SUMMARY_EMBED}").eq("id", projectId).execute()
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Projet non trouvé")
+
+    project = result.data[0]
+
+    is_admin = _is_admin_in_db(current_user.id)
     if project["userId"] != current_user.id and not is_admin:
         raise HTTPException(status_code=403, detail="Accès non autorisé à ce projet")
 
     return project, is_admin
 
 
-def _sign_file_url(file_path: Optional[str]) -> Optional[str]:
-    """Génère une URL signée (1h) pour un chemin relatif du bucket project-images."""
+def _check_can_post(projectId: str, current_user) -> None:
+    """
+    Contrôle d'accès avant l'upload d'une pièce jointe (send_project_message le
+    refait à l'insertion) : admin en cache, sinon propriétaire, sinon rôle en base.
+    """
+    if is_cached_admin(current_user.id):
+        return
+    result = supabase_admin.table("Projects").select("userId").eq("id", projectId).execute()
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Projet non trouvé")
+    if result.data[0]["userId"] != current_user.id and not _is_admin_in_db(current_user.id):
+        raise HTTPException(status_code=403, detail="Accès non autorisé à ce projet")
+
+
+def _mark_chat_read(projectId: str, project: dict, viewer_role: str) -> dict:
+    """
+    Résumé de la discussion pour le lecteur (embed retiré de `project`) et
+    remise à zéro de ses non-lus, seulement s'il en a : le polling d'une
+    discussion déjà lue ne coûte pas d'écriture.
+    """
+    chat = _chat_summary(project, viewer_role)
+    if chat["unread"]:
+        try:
+            supabase_admin.rpc(
+                "mark_project_chat_read", {"project_id": projectId, "reader_role": viewer_role}
+            ).execute()
+        except Exception as e:
+            logger.warning(f"Marquage de la discussion {projectId} comme lue impossible: {e}")
+    return chat
+
+
+def _sign_file_url(file_path: Optional[str], variants: Optional[dict] = None) -> tuple:
+    """
+    Génère des URLs signées (1h) pour un chemin relatif du bucket project-images
+    et ses variantes. Retourne (url, {nom: url}).
+    """
     if not file_path:
-        return None
-    try:
-        signed = supabase_admin.storage.from_("project-images").create_signed_url(
-            file_path, 3600
-        )
-        return signed.get("signedURL", file_path)
-    except Exception as e:
-        logger.warning(f"URL signée impossible pour {file_path}: {e}")
-        return file_path
+        return None, {}
+    return sign_with_variants(
+        supabase_admin.storage.from_("project-images"), file_path, variants
+    )
 
 
-def _serialize_message(msg: dict) -> dict:
+def _serialize_message(msg: dict, signed: Optional[tuple] = None) -> dict:
     """
     Prépare un message pour le frontend : nom de l'expéditeur aplati
-    (depuis l'embed Users) et URL signée pour la pièce jointe.
+    (depuis l'embed Users) et URLs signées pour la pièce jointe et ses variantes.
+    `signed` : (url, {nom: url}) déjà obtenus par sign_batch, sinon signés ici.
     """
     msg = dict(msg)
     sender = msg.pop("Users", None) or {}
     first = sender.get("firstName") or ""
     last = sender.get("lastName") or ""
     msg["senderName"] = f"{first} {last}".strip() or "Utilisateur"
-    msg["fileUrl"] = _sign_file_url(msg.get("fileUrl"))
+    if signed is None:
+        signed = _sign_file_url(msg.get("fileUrl"), msg.get("variants"))
+    msg["fileUrl"], msg["variants"] = signed
     return msg
 
 
+def _serialize_messages(messages: list) -> list:
+    """Sérialise une liste de messages, pièces jointes signées en un seul appel storage."""
+    signed = sign_batch(
+        supabase_admin.storage.from_("project-images"),
+        [(m.get("fileUrl"), m.get("variants")) for m in messages],
+    )
+    return [_serialize_message(m, s) for m, s in zip(messages, signed)]
+
+
 @router.get("/projects/{projectId}/messages")
 async def get_project_messages(projectId: str, current_user=Depends(get_current_user)):
     """
     Récupérer les messages de la discussion d'un projet (propriétaire ou admin),
-    triés du plus ancien au plus récent.
+    triés du plus ancien au plus récent. Marque la discussion comme lue.
     """
-    _check_project_access(projectId, current_user)
+    project, is_admin = _check_project_access(projectId, current_user)
+    _mark_chat_read(projectId, project, "admin" if is_admin else "client")
 
     result = (
         supabase_admin.table("ProjectsMessages")
@@ -98,11 +156,66 @@ async def get_project_messages(projectId: str, current_user=Depends(get_current_
         .execute()
     )
 
-    messages = [_serialize_message(m) for m in (result.data or [])]
-    return {"messages": messages}
+    return {"messages": _serialize_messages(result.data or [])}
 
 
-@router.post("/projects/{projectId}/messages")
+@router.get("/projects/{projectId}/overview")
+@round_trip_budget(4)
+async def get_project_overview(projectId: str, current_user=Depends(get_current_user)):
+    """
+    Page projet en un appel : le projet, ses fichiers, les derniers messages
+    de la discussion (du plus ancien au plus récent) et le rôle du lecteur.
+
+    Une seule requête en base (ressources embarquées) et un seul appel storage
+    pour signer toutes les images et pièces jointes. Le rôle est lu dans le
+    cache des admins ; la base n'est interrogée que pour un non-propriétaire
+    absent du cache. `hasMoreMessages` : la discussion compte plus de
+    OVERVIEW_MESSAGE_LIMIT messages (historique complet via /messages).
+    Marque la discussion comme lue (un appel de plus s'il y avait des non-lus).
+    """
+    result = (
+        supabase_admin.table("Projects")
+        .select(f"*, ProjectsImages(*), ProjectsMessages(*, Users(firstName, lastName)), {CHAT_SUMMARY_EMBED}")
+        .eq("id", projectId)
+        .order("created_at", desc=True, foreign_table="ProjectsMessages")
+        .limit(OVERVIEW_MESSAGE_LIMIT + 1, foreign_table="ProjectsMessages")
+        .execute()
+    )
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Projet non trouvé")
+
+    project = result.data[0]
+    is_admin = is_cached_admin(current_user.id)
+    if project["userId"] != current_user.id and not is_admin:
+        # Même vérification que _check_project_access, sans relire le projet
+        is_admin = _is_admin_in_db(current_user.id)
+        if not is_admin:
+            raise HTTPException(status_code=403, detail="Accès non autorisé à ce projet")
+
+    project["chat"] = _mark_chat_read(projectId, project, "admin" if is_admin else "client")
+    images = project.pop("ProjectsImages", None) or []
+    recent = project.pop("ProjectsMessages", None) or []
+    has_more = len(recent) > OVERVIEW_MESSAGE_LIMIT
+    messages = list(reversed(recent[:OVERVIEW_MESSAGE_LIMIT]))
+
+    # Images du projet et pièces jointes : un seul appel storage
+    signed = sign_batch(
+        supabase_admin.storage.from_("project-images"),
+        [(m.get("fileUrl"), m.get("variants")) for m in messages]
+        + [(_storage_path(img.get("fileUrl", "")), img.get("variants")) for img in images],
+    )
+    project["images"] = _apply_image_urls(images, signed[len(messages):])
+
+    return {
+        "project": project,
+        "messages": [_serialize_message(m, s) for m, s in zip(messages, signed)],
+        "hasMoreMessages": has_more,
+        "viewerRole": "admin" if is_admin else "client",
+    }
+
+
+@router.post("/projects/{projectId}/messages", dependencies=[Depends(rate_limit("message"))])
+@round_trip_budget(8)
 async def send_project_message(
     projectId: str,
     content: Optional[str] = Form(None),
@@ -112,9 +225,9 @@ async def send_project_message(
     """
     Envoyer un message dans la discussion d'un projet (propriétaire ou admin),
     avec éventuellement une image jointe (avancement du projet).
+    Contrôle d'accès, insertion et nom de l'expéditeur : un seul appel
+    (fonction SQL send_project_message).
     """
-    _, is_admin = _check_project_access(projectId, current_user)
-
     content = (content or "").strip()
     if not content and not file:
         raise HTTPException(
@@ -127,8 +240,9 @@ async def send_project_message(
         )
 
     file_path = None
+    variants = None
     if file:
-        file_content = await file.read()
+        file_content, digest = await read_upload(file, MAX_FILE_SIZE)
 
         if len(file_content) > MAX_FILE_SIZE:
             raise HTTPException(
@@ -142,45 +256,53 @@ async def send_project_message(
                 detail="Seules les images (JPEG, PNG, WebP, GIF) sont autorisées",
             )
 
+        # Pas d'upload pour un projet inaccessible
+        _check_can_post(projectId, current_user)
+
         clean_filename = sanitize_filename(file.filename or "image")
-        file_path = f"messages/{projectId}/{datetime.now(timezone.utc).timestamp()}_{clean_filename}"
 
+        # Stockage adressé par contenu : une image déjà envoyée n'est pas
+        # ré-uploadée (ses variantes existantes sont réutilisées)
         try:
-            supabase_admin.storage.from_("project-images").upload(
-                file_path, file_content, {"content-type": mime_type}
+            stored = await store_content_addressed(
+                supabase_admin,
+                "project-images",
+                file_content,
+                digest,
+                clean_filename,
+                mime_type,
+                with_variants=True,
             )
         except Exception as e:
             logger.error(f"Erreur upload image message: {e}")
             raise HTTPException(
                 status_code=500, detail="Erreur lors de l'upload de l'image"
             )
+        file_path = stored["path"]
+        variants = stored["variants"]
 
-    message_data = {
-        "projectId": projectId,
-        "senderId": current_user.id,
-        "sender_role": "admin" if is_admin else "client",
-        "content": content or None,
-        "fileUrl": file_path,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-    }
-
-    result = supabase_admin.table("ProjectsMessages").insert(message_data).execute()
-    if not result.data:
+    try:
+        result = supabase_admin.rpc(
+            "send_project_message",
+            {
+                "project_id": projectId,
+                "sender_id": current_user.id,
+                "body": content or None,
+                "file_path": file_path,
+                "file_variants": variants,
+                "sent_at": datetime.now(timezone.utc).isoformat(),
+            },
+        ).execute()
+    except Exception as e:
+        logger.error(f"Erreur envoi message projet {projectId}: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors de l'envoi du message")
 
-    created = result.data[0]
-
-    # Nom de l'expéditeur pour l'affichage immédiat côté frontend
-    try:
-        sender_data = (
-            supabase_admin.table("Users")
-            .select("firstName, lastName")
-            .eq("id", current_user.id)
-            .single()
-            .execute()
-        )
-        created["Users"] = sender_data.data
-    except Exception:
-        created["Users"] = None
+    outcome = result.data or {}
+    if outcome.get("status") == "not_found":
+        raise HTTPException(status_code=404, detail="Projet non trouvé")
+    if outcome.get("status") == "forbidden":
+        raise HTTPException(status_code=403, detail="Accès non autorisé à ce projet")
+    if outcome.get("status") != "sent":
+        raise HTTPException(status_code=500, detail="Erreur lors de l'envoi du message")
 
-    return {"message": "Message envoyé", "data": _serialize_message(created)}
+    return {"message": "Message envoyé", "data": _serialize_message(outcome["message"])}
@@ -1,12 +1,18 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, status
+from fastapi.responses import StreamingResponse
 from app.database import supabase, supabase_admin
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, is_cached_admin
+from app.rate_limit import rate_limit
+from app.services.cache import register_cache
+from app.services.single_flight import single_flight
 from app.services.stripe_service import (
     get_or_create_customer,
     create_stripe_product_and_price,
     update_stripe_product_and_price,
     create_product_checkout_session,
 )
+from app.services.zip_stream import stream_zip, archive_name
+from app.services.storage_service import read_upload, store_content_addressed
 from datetime import datetime, timezone
 from typing import Optional, List
 import logging
@@ -32,27 +38,51 @@ PUBLIC_PRODUCT_COLUMNS = (
 )
 
 
+def _load_catalog() -> list:
+    return (
+        supabase.table("Products")
+        .select(PUBLIC_PRODUCT_COLUMNS)
+        .order("created_at", desc=True)
+        .execute()
+        .data
+        or []
+    )
+
+
+# Catalogue public en mémoire (préchauffé au démarrage, invalidé à chaque écriture)
+catalog_cache = register_cache("catalog", _load_catalog)
+
+
 def sanitize_filename(filename: str) -> str:
     return re.sub(r"[^a-zA-Z0-9._-]", "", filename)
 
 
-def upload_to_bucket(bucket: str, file: UploadFile, content: bytes) -> str:
-    """Upload un fichier vers un bucket Supabase et retourne l'URL publique."""
-    clean_filename = sanitize_filename(file.filename or "file")
-    timestamp = datetime.now(timezone.utc).timestamp()
-    file_path = f"{timestamp}_{clean_filename}"
+def _download_name(file: UploadFile) -> str:
+    """Nom affiché et nom dans l'archive d'un fichier téléchargeable (jamais un chemin)."""
+    name = sanitize_filename(os.path.basename((file.filename or "").replace("\\", "/")))
+    return name if name.strip(".") else "fichier"
 
-    supabase_admin.storage.from_(bucket).upload(
-        file_path,
+
+async def upload_to_bucket(bucket: str, file: UploadFile, content: bytes, digest: str) -> str:
+    """
+    Upload un fichier vers un bucket Supabase et retourne l'URL publique.
+    Stockage adressé par contenu : un fichier identique déjà présent n'est pas ré-uploadé.
+    """
+    stored = await store_content_addressed(
+        supabase_admin,
+        bucket,
         content,
-        {"content-type": file.content_type or "application/octet-stream"},
+        digest,
+        sanitize_filename(file.filename or "file"),
+        file.content_type or "application/octet-stream",
     )
-
-    return supabase_admin.storage.from_(bucket).get_public_url(file_path)
+    return supabase_admin.storage.from_(bucket).get_public_url(stored["path"])
 
 
 def check_admin(current_user) -> None:
     """Vérifie que l'utilisateur courant est admin. Lève une 403 sinon."""
+    if is_cached_admin(current_user.id):
+        return
     try:
         admin_check = (
             supabase_admin.table("Users")
@@ -74,19 +104,13 @@ def check_admin(current_user) -> None:
 async def get_products():
     """Récupérer la liste de tous les produits (public, sans les fichiers payants)."""
     try:
-        response = (
-            supabase.table("Products")
-            .select(PUBLIC_PRODUCT_COLUMNS)
-            .order("created_at", desc=True)
-            .execute()
-        )
-        return response.data or []
+        return await catalog_cache.aget()
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des produits: {e}")
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
 
 
-@router.post("/products", status_code=status.HTTP_201_CREATED)
+@router.post("/products", status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit("upload"))])
 async def create_product(
     title: str = Form(...),
     description: Optional[str] = Form(""),
@@ -119,28 +143,32 @@ async def create_product(
                 status_code=400,
                 detail=f"Fichier {dl_file.filename} : extension non autorisée",
             )
-        content = await dl_file.read()
+        content, digest = await read_upload(dl_file, MAX_MODEL_SIZE)
         if len(content) > MAX_MODEL_SIZE:
             raise HTTPException(status_code=400, detail=f"Fichier {dl_file.filename} trop volumineux (max 50 Mo)")
-        download_contents.append((dl_file, content, ext.lstrip(".")))
+        download_contents.append((dl_file, content, digest, ext.lstrip(".")))
 
-    overview_content = await overview_model_file.read()
+    overview_content, overview_digest = await read_upload(overview_model_file, MAX_MODEL_SIZE)
     if len(overview_content) > MAX_MODEL_SIZE:
         raise HTTPException(status_code=400, detail="Fichier aperçu trop volumineux (max 50 Mo)")
 
     # Upload fichier aperçu
     try:
-        overview_url = upload_to_bucket("overview-model-file", overview_model_file, overview_content)
+        overview_url = await upload_to_bucket(
+            "overview-model-file", overview_model_file, overview_content, overview_digest
+        )
     except Exception as e:
         logger.error(f"Erreur upload fichier aperçu: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors de l'upload du fichier aperçu")
 
     # Upload fichiers de téléchargement
     uploaded_download_files = []
-    for dl_file, content, extension in download_contents:
+    for dl_file, content, digest, extension in download_contents:
         try:
-            url = upload_to_bucket("download-model-file", dl_file, content)
-            uploaded_download_files.append({"url": url, "extension": extension})
+            url = await upload_to_bucket("download-model-file", dl_file, content, digest)
+            uploaded_download_files.append(
+                {"url": url, "extension": extension, "name": _download_name(dl_file)}
+            )
         except Exception as e:
             logger.error(f"Erreur upload fichier {dl_file.filename}: {e}")
             raise HTTPException(status_code=500, detail=f"Erreur lors de l'upload de {dl_file.filename}")
@@ -173,6 +201,7 @@ async def create_product(
         response = supabase_admin.table("Products").insert(product_data).execute()
         if not response.data:
             raise HTTPException(status_code=500, detail="Erreur lors de la création du produit")
+        catalog_cache.invalidate()
         return response.data[0]
     except HTTPException:
         raise
@@ -189,6 +218,7 @@ async def delete_product(product_id: str, current_user=Depends(get_current_user)
         result = supabase_admin.table("Products").delete().eq("id", product_id).execute()
         if not result.data:
             raise HTTPException(status_code=404, detail="Produit introuvable")
+        catalog_cache.invalidate()
     except HTTPException:
         raise
     except Exception as e:
@@ -265,11 +295,13 @@ async def update_product(
         ext = "." + overview_model_file.filename.rsplit(".", 1)[-1].lower()
         if ext not in OVERVIEW_EXTENSIONS:
             raise HTTPException(status_code=400, detail="Fichier aperçu : extension non autorisée")
-        content = await overview_model_file.read()
+        content, digest = await read_upload(overview_model_file, MAX_MODEL_SIZE)
         if len(content) > MAX_MODEL_SIZE:
             raise HTTPException(status_code=400, detail="Fichier aperçu trop volumineux (max 50 Mo)")
         try:
-            update_data["overview_model_file"] = upload_to_bucket("overview-model-file", overview_model_file, content)
+            update_data["overview_model_file"] = await upload_to_bucket(
+                "overview-model-file", overview_model_file, content, digest
+            )
         except Exception as e:
             logger.error(f"Erreur upload aperçu: {e}")
             raise HTTPException(status_code=500, detail="Erreur lors de l'upload du fichier aperçu")
@@ -282,12 +314,14 @@ async def update_product(
             ext = "." + dl_file.filename.rsplit(".", 1)[-1].lower()
             if ext not in DOWNLOAD_EXTENSIONS:
                 raise HTTPException(status_code=400, detail=f"Fichier {dl_file.filename} : extension non autorisée")
-            content = await dl_file.read()
+            content, digest = await read_upload(dl_file, MAX_MODEL_SIZE)
             if len(content) > MAX_MODEL_SIZE:
                 raise HTTPException(status_code=400, detail=f"Fichier {dl_file.filename} trop volumineux (max 50 Mo)")
             try:
-                url = upload_to_bucket("download-model-file", dl_file, content)
-                uploaded_download_files.append({"url": url, "extension": ext.lstrip(".")})
+                url = await upload_to_bucket("download-model-file", dl_file, content, digest)
+                uploaded_download_files.append(
+                    {"url": url, "extension": ext.lstrip("."), "name": _download_name(dl_file)}
+                )
             except Exception as e:
                 logger.error(f"Erreur upload {dl_file.filename}: {e}")
                 raise HTTPException(status_code=500, detail=f"Erreur lors de l'upload de {dl_file.filename}")
@@ -297,6 +331,7 @@ async def update_product(
         response = supabase_admin.table("Products").update(update_data).eq("id", product_id).execute()
         if not response.data:
             raise HTTPException(status_code=500, detail="Erreur lors de la mise à jour du produit")
+        catalog_cache.invalidate()
         return response.data[0]
     except HTTPException:
         raise
@@ -305,15 +340,53 @@ async def update_product(
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
 
 
+@single_flight("purchased")
+def _load_purchase(user_id: str, product_id: str) -> dict:
+    result = (
+        supabase_admin.table("Orders")
+        .select("id")
+        .eq("client_id", user_id)
+        .eq("product_id", product_id)
+        .eq("status", "completed")
+        .execute()
+    )
+    if not result.data:
+        return {"purchased": False, "download_files": []}
+
+    product = (
+        supabase_admin.table("Products")
+        .select("download_files")
+        .eq("id", product_id)
+        .single()
+        .execute()
+    )
+    files = (product.data or {}).get("download_files") or []
+    return {"purchased": True, "download_files": files}
+
+
 @router.get("/products/{product_id}/purchased", status_code=status.HTTP_200_OK)
 async def check_purchased(product_id: str, current_user=Depends(get_current_user)):
     """
     Vérifie si l'utilisateur courant a acheté ce produit (via la table Orders).
     Renvoie les fichiers téléchargeables uniquement si l'achat est confirmé :
-    ils ne figurent pas dans le catalogue public.
+    ils ne figurent pas dans le catalogue public. Les vérifications simultanées
+    du même produit par le même client partagent une seule lecture.
     """
     try:
-        result = (
+        return await _load_purchase(current_user.id, product_id)
+    except Exception as e:
+        logger.error(f"Erreur vérification achat produit: {e}")
+        raise HTTPException(status_code=500, detail="Erreur interne du serveur")
+
+
+@router.get("/products/{product_id}/bundle")
+async def download_product_bundle(product_id: str, current_user=Depends(get_current_user)):
+    """
+    Télécharger en une seule archive ZIP tous les fichiers d'un produit acheté.
+    L'archive est construite à la volée (streaming, sans fichier temporaire).
+    """
+    try:
+        purchased = (
             supabase_admin.table("Orders")
             .select("id")
             .eq("client_id", current_user.id)
@@ -321,24 +394,36 @@ async def check_purchased(product_id: str, current_user=Depends(get_current_user
             .eq("status", "completed")
             .execute()
         )
-        purchased = bool(result.data)
-
-        if not purchased:
-            return {"purchased": False, "download_files": []}
+        if not purchased.data:
+            raise HTTPException(status_code=403, detail="Produit non acheté")
 
         product = (
             supabase_admin.table("Products")
-            .select("download_files")
+            .select("title, download_files")
             .eq("id", product_id)
             .single()
             .execute()
         )
-        files = (product.data or {}).get("download_files") or []
-        return {"purchased": True, "download_files": files}
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Erreur vérification achat produit: {e}")
+        logger.error(f"Erreur préparation archive produit: {e}")
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
 
+    files = (product.data or {}).get("download_files") or []
+    entries = [
+        (f.get("name") or archive_name(f["url"]), f["url"]) for f in files if f.get("url")
+    ]
+    if not entries:
+        raise HTTPException(status_code=404, detail="Aucun fichier à télécharger")
+
+    bundle_name = sanitize_filename((product.data or {}).get("title") or "") or "modelify"
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{bundle_name}.zip"'},
+    )
+
 
 @router.get("/products/{product_id}/admin", status_code=status.HTTP_200_OK)
 async def get_product_admin(product_id: str, current_user=Depends(get_current_user)):
@@ -367,7 +452,7 @@ async def get_product_admin(product_id: str, current_user=Depends(get_current_us
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
 
 
-@router.post("/products/{product_id}/buy", status_code=status.HTTP_200_OK)
+@router.post("/products/{product_id}/buy", status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("checkout"))])
 async def buy_product(product_id: str, current_user=Depends(get_current_user)):
     """
     Initier le paiement Stripe pour l'achat d'un produit.
@@ -1,27 +1,31 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
+from fastapi.responses import StreamingResponse
 from app.database import supabase_admin
-from app.dependencies import get_current_user
-from app.schemas.projects import ProjectQuote
+from app.dependencies import get_current_user, is_cached_admin
+from app.schemas.projects import BulkProjectStatusUpdate, ProjectQuote
 from app.services.stripe_service import (
     get_or_create_customer,
     create_quote,
     cancel_quote,
     create_checkout_session,
 )
-import stripe
+from app.metrics import track_upstream
+from app.rate_limit import rate_limit
+from app.request_trace import round_trip_budget
+from app.responses import FastJSONResponse
+from app.services.image_variants import sign_batch
+from app.services.storage_service import read_upload, store_content_addressed
+from app.services.zip_stream import stream_zip, archive_name
 from typing import Optional, List
 from datetime import datetime, timezone
 import os
 import re
 import logging
 
-# Tentative d'import de python-magic pour la validation des fichiers
-# (ImportError si absent, OSError si la libmagic native est inutilisable,
-# ex. DLL incompatible sous Windows — dans les deux cas on passe en mode dégradé)
-try:
-    import magic
-except Exception:
-    magic = None
+# python-magic (validation des fichiers) est importé au premier upload, pas au
+# démarrage : voir _get_magic. Vaut None s'il est indisponible.
+_MAGIC_NOT_LOADED = object()
+magic = _MAGIC_NOT_LOADED
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -47,8 +51,45 @@ ALLOWED_DELIVERABLE_EXTENSIONS = [
     ".obj", ".fbx", ".stl", ".glb", ".gltf", ".blend", ".3ds", ".dae", ".mtl",
 ]
 
+PROJECT_STATUSES = [
+    "en attente",
+    "devis_envoyé",
+    "devis_refusé",
+    "paiement_attente",
+    "payé",
+    "en cours",
+    "terminé",
+]
+
 # Statuts "clos" : ne comptent pas dans la limite de projets actifs
+# (même liste que project_status_is_active, migration 007)
 CLOSED_STATUSES = ["terminé", "devis_refusé"]
+MAX_ACTIVE_PROJECTS = 2
+
+# Résumé de discussion embarqué dans les listes de projets (migration 009)
+CHAT_SUMMARY_EMBED = (
+    "ProjectChatSummaries(message_count, last_message_at, last_sender_role, unread_by_client, unread_by_admin)"
+)
+
+_UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+
+def _chat_summary(row: dict, viewer_role: str) -> dict:
+    """
+    Retire l'embed ProjectChatSummaries d'une ligne projet et le résume pour
+    le lecteur ('client' ou 'admin') : non-lus de son côté uniquement.
+    """
+    summary = row.pop("ProjectChatSummaries", None)
+    # Relation 1-1 : objet, ou liste d'un élément selon la version de PostgREST
+    if isinstance(summary, list):
+        summary = summary[0] if summary else None
+    summary = summary or {}
+    return {
+        "messageCount": summary.get("message_count", 0),
+        "lastMessageAt": summary.get("last_message_at"),
+        "lastSenderRole": summary.get("last_sender_role"),
+        "unread": summary.get(f"unread_by_{viewer_role}", 0),
+    }
 
 
 def sanitize_filename(filename: str) -> str:
@@ -59,37 +100,56 @@ def sanitize_filename(filename: str) -> str:
     return re.sub(r"[^a-zA-Z0-9._-]", "", filename)
 
 
+def _get_magic():
+    """
+    Tentative d'import de python-magic au premier appel
+    (ImportError si absent, OSError si la libmagic native est inutilisable,
+    ex. DLL incompatible sous Windows — dans les deux cas on passe en mode dégradé)
+    """
+    global magic
+    if magic is _MAGIC_NOT_LOADED:
+        try:
+            import magic as magic_module
+        except Exception:
+            magic_module = None
+        magic = magic_module
+    return magic
+
+
 def validate_mime_type(content: bytes, declared_type: str) -> str:
     """
     Valide le type MIME du fichier en utilisant python-magic si disponible,
     sinon se fie au type déclaré.
     """
     mime_type = declared_type
-    if magic:
+    magic_module = _get_magic()
+    if magic_module:
         try:
-            mime_type = magic.from_buffer(content, mime=True)
+            with track_upstream("magic", "from_buffer"):
+                mime_type = magic_module.from_buffer(content, mime=True)
         except Exception as e:
             logger.warning(f"Erreur lors de la détection magic du type MIME: {e}")
     return mime_type
 
 
 @router.get("/projects/count")
+@round_trip_budget(1)
 async def get_project_count(current_user=Depends(get_current_user)):
     """
-    Récupérer le nombre de projets actifs (non 'terminé') pour l'utilisateur courant
+    Récupérer le nombre de projets actifs (hors statuts clos) de l'utilisateur
+    courant : compteur maintenu par trigger (UserProjectCounters), lu par clé.
     """
     result = (
-        supabase_admin.table("Projects")
-        .select("id", count="exact")
-        .eq("userId", current_user.id)
-        .not_.in_("status", CLOSED_STATUSES)
+        supabase_admin.table("UserProjectCounters")
+        .select("active_projects")
+        .eq("user_id", current_user.id)
         .execute()
     )
-
-    return {"active_projects": result.count or 0, "limit": 2}
+    active = result.data[0]["active_projects"] if result.data else 0
+    return {"active_projects": active, "limit": MAX_ACTIVE_PROJECTS}
 
 
-@router.post("/projects", response_model=dict)
+@router.post("/projects", response_model=dict, dependencies=[Depends(rate_limit("upload"))])
 async def create_project_request(
     title: str = Form(...),
     descriptionClient: str = Form(...),
@@ -104,21 +164,6 @@ async def create_project_request(
     Créer une nouvelle demande de projet de modélisation 3D
     """
     try:
-        # Vérification de la limite de projets actifs (hors statuts clos)
-        active_projects = (
-            supabase_admin.table("Projects")
-            .select("id", count="exact")
-            .eq("userId", current_user.id)
-            .not_.in_("status", CLOSED_STATUSES)
-            .execute()
-        )
-
-        if active_projects.count and active_projects.count >= 2:
-            raise HTTPException(
-                status_code=400,
-                detail="Limite de projets atteinte. Vous ne pouvez pas avoir plus de 2 projets en cours simultanément (hors projets terminés ou refusés).",
-            )
-
         project_data = {
             "title": title,
             "descriptionClient": descriptionClient,
@@ -131,81 +176,100 @@ async def create_project_request(
             "created_at": datetime.now(timezone.utc).date().isoformat(),
         }
 
-        result = supabase_admin.table("Projects").insert(project_data).execute()
-
-        if result.data:
-            projectId = result.data[0]["id"]
-            rejected_files = []
+        # Vérification de la limite de projets actifs (hors statuts clos) et
+        # insertion en une transaction : aucune soumission simultanée ne la dépasse
+        result = supabase_admin.rpc(
+            "create_project_within_limit",
+            {"project": project_data, "max_active": MAX_ACTIVE_PROJECTS},
+        ).execute()
 
-            if files:
-                logger.info(f"Fichiers reçus : {[f.filename for f in files]}")
-                # Vérification du nombre maximum de fichiers
-                if len(files) > MAX_FILES_PER_PROJECT:
-                    logger.warning(f"Trop de fichiers ({len(files)}), limite: {MAX_FILES_PER_PROJECT}")
-                    files = files[:MAX_FILES_PER_PROJECT]
-
-                for file in files:
-                    try:
-                        file_content = await file.read()
-
-                        # Vérification de la taille du fichier
-                        if len(file_content) > MAX_FILE_SIZE:
-                            logger.warning(
-                                f"Fichier rejeté (trop volumineux): {file.filename} ({len(file_content)} bytes)"
-                            )
-                            rejected_files.append({"filename": file.filename, "reason": "Fichier trop volumineux (max 10MB)"})
-                            continue
+        if not result.data:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Limite de projets atteinte. Vous ne pouvez pas avoir plus de {MAX_ACTIVE_PROJECTS} projets en cours simultanément (hors projets terminés ou refusés).",
+            )
 
-                        mime_type = validate_mime_type(file_content, file.content_type)
+        projectId = result.data[0]["id"]
+        rejected_files = []
 
-                        if mime_type not in ALLOWED_MIME_TYPES:
-                            logger.warning(
-                                f"Fichier rejeté (type non autorisé): {file.filename} ({mime_type})"
-                            )
-                            rejected_files.append({"filename": file.filename, "reason": "Type de fichier non autorisé"})
-                            continue
+        if files:
+            logger.info(f"Fichiers reçus : {[f.filename for f in files]}")
+            # Vérification du nombre maximum de fichiers
+            if len(files) > MAX_FILES_PER_PROJECT:
+                logger.warning(f"Trop de fichiers ({len(files)}), limite: {MAX_FILES_PER_PROJECT}")
+                files = files[:MAX_FILES_PER_PROJECT]
 
-                        clean_filename = sanitize_filename(file.filename)
+            for file in files:
+                try:
+                    file_content, digest = await read_upload(file, MAX_FILE_SIZE)
 
-                        file_path = f"{projectId}/{datetime.now(timezone.utc).timestamp()}_{clean_filename}"
+                    # Vérification de la taille du fichier
+                    if len(file_content) > MAX_FILE_SIZE:
+                        logger.warning(
+                            f"Fichier rejeté (trop volumineux): {file.filename} ({len(file_content)} bytes)"
+                        )
+                        rejected_files.append({"filename": file.filename, "reason": "Fichier trop volumineux (max 10MB)"})
+                        continue
 
-                        # supabase_admin : le RLS storage bloque l'upload avec la
-                        # clé anon (le backend n'a pas de session utilisateur)
-                        supabase_admin.storage.from_(
-                            "project-images"
-                        ).upload(file_path, file_content, {"content-type": mime_type})
+                    mime_type = validate_mime_type(file_content, file.content_type)
 
-                        file_type = (
-                            "image" if mime_type.startswith("image/") else "document"
+                    if mime_type not in ALLOWED_MIME_TYPES:
+                        logger.warning(
+                            f"Fichier rejeté (type non autorisé): {file.filename} ({mime_type})"
                         )
-
-                        # On stocke le chemin relatif (pas l'URL publique) pour
-                        # générer des URLs signées fiables à la lecture
-                        supabase_admin.table("ProjectsImages").insert(
-                            {
-                                "projectId": projectId,
-                                "fileUrl": file_path,
-                                "file_type": file_type,
-                            }
-                        ).execute()
-
-                    except Exception as upload_error:
-                        error_detail = str(upload_error)
-                        logger.error(f"ERROR processing file {file.filename}: {error_detail}")
-                        rejected_files.append({"filename": file.filename, "reason": error_detail})
-
-            response_data = {
-                "message": "Demande de projet créée avec succès",
-                "projectId": projectId,
-                "status": "success",
-            }
-            
-            # Informer l'utilisateur des fichiers rejetés
-            if rejected_files:
-                response_data["rejected_files"] = rejected_files
-                response_data["warning"] = f"{len(rejected_files)} fichier(s) n'ont pas pu être uploadés"
-            
-            return response_data
+                        rejected_files.append({"filename": file.filename, "reason": "Type de fichier non autorisé"})
+                        continue
+
+                    clean_filename = sanitize_filename(file.filename)
+
+                    file_type = (
+                        "image" if mime_type.startswith("image/") else "document"
+                    )
+
+                    # supabase_admin : le RLS storage bloque l'upload avec la
+                    # clé anon (le backend n'a pas de session utilisateur).
+                    # Stockage adressé par contenu : un fichier déjà connu
+                    # n'est pas ré-uploadé. Les images reçoivent en plus une
+                    # miniature et une taille moyenne (WebP, sans EXIF).
+                    stored = await store_content_addressed(
+                        supabase_admin,
+                        "project-images",
+                        file_content,
+                        digest,
+                        clean_filename,
+                        mime_type,
+                        with_variants=file_type == "image",
+                    )
+
+                    # On stocke le chemin relatif (pas l'URL publique) pour
+                    # générer des URLs signées fiables à la lecture
+                    supabase_admin.table("ProjectsImages").insert(
+                        {
+                            "projectId": projectId,
+                            "fileUrl": stored["path"],
+                            "file_type": file_type,
+                            "file_name": clean_filename,
+                            "variants": stored["variants"],
+                        }
+                    ).execute()
+
+                except Exception as upload_error:
+                    error_detail = str(upload_error)
+                    logger.error(f"ERROR processing file {file.filename}: {error_detail}")
+                    rejected_files.append({"filename": file.filename, "reason": error_detail})
+
+        response_data = {
+            "message": "Demande de projet créée avec succès",
+            "projectId": projectId,
+            "status": "success",
+        }
+        
+        # Informer l'utilisateur des fichiers rejetés
+        if rejected_files:
+            response_data["rejected_files"] = rejected_files
+            response_data["warning"] = f"{len(rejected_files)} fichier(s) n'ont pas pu être uploadés"
+        
+        return response_data
 
     except HTTPException:
         raise
@@ -258,57 +322,75 @@ async def get_all_projects(
     count_result = count_query.execute()
     total_count = count_result.count or 0
 
-    # Requête pour les données paginées
+    # Requête pour les données paginées (avec le résumé de la discussion :
+    # activité et non-lus sans relire l'historique de chaque projet)
     if is_admin:
         query = supabase_admin.table("Projects").select(
-            "*, Users(firstName, lastName, role)"
+            f"*, Users(firstName, lastName, role), {CHAT_SUMMARY_EMBED}"
         )
         if userId:
             query = query.eq("userId", userId)
     else:
-        query = supabase_admin.table("Projects").select("*").eq("userId", current_user.id)
+        query = supabase_admin.table("Projects").select(f"*, {CHAT_SUMMARY_EMBED}").eq("userId", current_user.id)
 
     # Appliquer pagination et tri
     result = query.order("created_at", desc=True).range(offset, offset + limit - 1).execute()
-    
-    return {
-        "projects": result.data or [],
+    projects = result.data or []
+    viewer_role = "admin" if is_admin else "client"
+    for project in projects:
+        project["chat"] = _chat_summary(project, viewer_role)
+
+    return FastJSONResponse({
+        "projects": projects,
         "total": total_count,
         "page": page,
         "limit": limit,
         "total_pages": (total_count + limit - 1) // limit
-    }
+    })
+
+
+def _storage_path(raw: str) -> Optional[str]:
+    """
+    Chemin relatif dans le bucket project-images à partir de 'fileUrl'.
+    Les anciens enregistrements peuvent contenir une URL publique complète :
+    on en extrait le chemin (None si l'URL pointe ailleurs).
+    """
+    # Compat anciens enregistrements : URL complète avec éventuel "?" final
+    if raw.startswith("http"):
+        supabase_url = os.getenv("SUPABASE_URL", "").rstrip("/")
+        old_prefix = f"{supabase_url}/storage/v1/object/public/project-images/"
+        return raw[len(old_prefix):].split("?")[0] if raw.startswith(old_prefix) else None
+    return raw or None  # nouveau format : chemin relatif direct
 
 
 def _make_signed_urls(images: list) -> list:
     """
-    Génère des URLs signées (1h) pour chaque image.
+    Génère des URLs signées (1h) pour chaque image et ses variantes
+    (miniature, taille moyenne) dans `variants`, en un seul appel storage.
     'fileUrl' contient le chemin relatif dans le bucket (ex: projectId/ts_file.jpg).
-    Les anciens enregistrements peuvent contenir une URL complète : on extrait
-    le chemin dans ce cas.
     """
-    supabase_url = os.getenv("SUPABASE_URL", "").rstrip("/")
-    old_prefix = f"{supabase_url}/storage/v1/object/public/project-images/"
+    # supabase_admin (service role) pour bypasser le RLS storage :
+    # les livrables sont uploadés par l'admin, le client anon ne peut
+    # pas forcément générer une URL signée dessus sinon
+    bucket = supabase_admin.storage.from_("project-images")
+    signed = sign_batch(bucket, [(_storage_path(img.get("fileUrl", "")), img.get("variants")) for img in images])
+    return _apply_image_urls(images, signed)
+
+
+def _apply_image_urls(images: list, signed: list) -> list:
+    """
+    Reporte sur les images les résultats de sign_batch (même ordre, chemins
+    obtenus par _storage_path). En cas d'échec, 'fileUrl' garde la valeur
+    enregistrée.
+    """
     result = []
-    for img in images:
+    for img, (url, variants) in zip(images, signed):
         img = dict(img)
         raw = img.get("fileUrl", "")
-        # Compat anciens enregistrements : URL complète avec éventuel "?" final
-        if raw.startswith("http"):
-            file_path = raw[len(old_prefix):].split("?")[0] if raw.startswith(old_prefix) else None
-        else:
-            file_path = raw  # nouveau format : chemin relatif direct
+        file_path = _storage_path(raw)
         if file_path:
-            try:
-                # supabase_admin (service role) pour bypasser le RLS storage :
-                # les livrables sont uploadés par l'admin, le client anon ne peut
-                # pas forcément générer une URL signée dessus sinon
-                signed = supabase_admin.storage.from_("project-images").create_signed_url(
-                    file_path, 3600
-                )
-                img["fileUrl"] = signed.get("signedURL", raw)
-            except Exception as e:
-                logger.warning(f"URL signée impossible pour {file_path}: {e}")
+            img["fileUrl"] = url if url != file_path else raw
+        img["variants"] = variants
         result.append(img)
     return result
 
@@ -355,16 +437,82 @@ async def get_project(projectId: str, current_user=Depends(get_current_user)):
     return project
 
 
+@router.get("/projects/{projectId}/deliverables/bundle")
+async def download_project_deliverables(projectId: str, current_user=Depends(get_current_user)):
+    """
+    Télécharger tous les livrables d'un projet en une seule archive ZIP
+    (propriétaire ou admin). L'archive est construite à la volée.
+    """
+    try:
+        result = supabase_admin.table("Projects").select("id, title, userId").eq("id", projectId).execute()
+        if not result.data:
+            raise HTTPException(status_code=404, detail="Projet non trouvé")
+        project = result.data[0]
+
+        if project["userId"] != current_user.id:
+            user_role_data = (
+                supabase_admin.table("Users")
+                .select("role")
+                .eq("id", current_user.id)
+                .single()
+                .execute()
+            )
+            if not user_role_data.data or user_role_data.data.get("role") != "admin":
+                raise HTTPException(status_code=403, detail="Accès non autorisé à ce projet")
+
+        deliverables = (
+            supabase_admin.table("ProjectsImages")
+            .select("fileUrl, file_name")
+            .eq("projectId", projectId)
+            .in_("file_type", ["livrable_image", "livrable_doc"])
+            .execute()
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur préparation archive des livrables de {projectId}: {e}")
+        raise HTTPException(status_code=500, detail="Erreur interne du serveur")
+    # Chemin storage -> nom d'origine (les clés de contenu n'ont pas de nom lisible)
+    names = {}
+    for d in deliverables.data or []:
+        path = _storage_path(d.get("fileUrl", ""))
+        if path:
+            names[path] = d.get("file_name") or archive_name(path)
+    paths = list(names)
+    if not paths:
+        raise HTTPException(status_code=404, detail="Aucun livrable à télécharger")
+
+    # Toutes les URLs signées en un seul appel storage
+    try:
+        signed = supabase_admin.storage.from_("project-images").create_signed_urls(paths, 3600)
+    except Exception as e:
+        logger.error(f"URLs signées impossibles pour les livrables de {projectId}: {e}")
+        raise HTTPException(status_code=500, detail="Erreur interne du serveur")
+
+    entries = [
+        (names.get(item["path"]) or archive_name(item["path"]), item["signedURL"])
+        for item in signed
+        if item.get("signedURL") and not item.get("error")
+    ]
+    if not entries:
+        logger.error(f"Aucune URL signée obtenue pour les livrables de {projectId}")
+        raise HTTPException(status_code=500, detail="Erreur interne du serveur")
+    bundle_name = sanitize_filename(project.get("title") or "") or "livrables"
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{bundle_name}.zip"'},
+    )
+
+
 @router.get("/projects/{projectId}/verify-payment")
-async def verify_project_payment(
-    projectId: str,
-    session_id: str,
-    current_user=Depends(get_current_user),
-):
+async def verify_project_payment(projectId: str, current_user=Depends(get_current_user)):
     """
-    Vérifie auprès de Stripe si le paiement d'un projet est bien effectué
-    et met à jour le statut en 'payé' si c'est le cas.
-    Appelé par le frontend après redirection depuis Stripe (success_url).
+    Indique si le paiement d'un projet est enregistré (statut 'payé' ou plus
+    avancé), depuis la base seule. Appelé en boucle par le frontend après
+    redirection depuis Stripe (success_url) : le statut est mis à jour par le
+    webhook, ou par la réconciliation (app.jobs.stripe_reconcile) si le webhook
+    a été manqué.
     """
     result = supabase_admin.table("Projects").select("*").eq("id", projectId).single().execute()
     if not result.data:
@@ -372,37 +520,89 @@ async def verify_project_payment(
 
     project = result.data
 
-    # Seul le propriétaire peut déclencher la vérification
+    # Seul le propriétaire peut suivre le paiement
     if project["userId"] != current_user.id:
         raise HTTPException(status_code=403, detail="Non autorisé")
 
-    # Si déjà payé ou plus avancé, on retourne simplement le projet
-    if project["status"] not in ["paiement_attente", "devis_envoyé"]:
-        return {"project": project}
-
-    try:
-        stripe_session = stripe.checkout.Session.retrieve(session_id)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Session Stripe invalide : {str(e)}")
-
-    # stripe_session.metadata est un StripeObject : dict() dessus plante si vide
-    # (protocole de séquence via __getitem__(0)), il faut passer par .to_dict()
-    metadata = stripe_session.metadata.to_dict() if stripe_session.metadata else {}
-    if metadata.get("project_id") != projectId or metadata.get("type") != "project_payment":
-        raise HTTPException(status_code=400, detail="La session Stripe ne correspond pas à ce projet")
-
-    if stripe_session.payment_status != "paid":
+    if project["status"] in ["paiement_attente", "devis_envoyé"]:
         return {"project": project, "payment_pending": True}
+    return {"project": project}
 
-    payment_intent = stripe_session.payment_intent
 
-    updated = supabase_admin.table("Projects").update({
-        "status": "payé",
-        "stripe_invoice_id": payment_intent,
-        "updatedAt": datetime.now(timezone.utc).date().isoformat(),
-    }).eq("id", projectId).execute()
+@router.put("/projects/status")
+@round_trip_budget(2)
+async def update_project_statuses(payload: BulkProjectStatusUpdate, current_user=Depends(get_current_user)):
+    """
+    Changer le statut de plusieurs projets en une fois (Admin uniquement).
+
+    Chaque changement est validé séparément, puis tous les changements valides
+    sont appliqués par une seule requête (fonction SQL admin_set_project_statuses).
+    `results` suit l'ordre du lot : `result` vaut "updated", "unchanged" (le
+    projet avait déjà ce statut), "not_found", "invalid_status" ou "duplicate"
+    (projet déjà présent plus haut dans le lot), avec les statuts précédent et
+    courant des projets trouvés.
+    """
+    # 1. Vérification Admin (ensemble en cache, sinon en base)
+    if not is_cached_admin(current_user.id):
+        try:
+            user_role_data = (
+                supabase_admin.table("Users")
+                .select("role")
+                .eq("id", current_user.id)
+                .single()
+                .execute()
+            )
+        except Exception:
+            raise HTTPException(status_code=403, detail="Erreur de vérification des droits")
+        if not user_role_data.data or user_role_data.data.get("role") != "admin":
+            raise HTTPException(status_code=403, detail="Accès réservé aux administrateurs")
 
-    return {"project": updated.data[0] if updated.data else project}
+    # 2. Validation élément par élément
+    results = []
+    valid = {}
+    for change in payload.changes:
+        item = {"projectId": change.projectId, "status": change.status}
+        if change.projectId in valid:
+            item["result"] = "duplicate"
+        elif change.status not in PROJECT_STATUSES:
+            item["result"] = "invalid_status"
+        elif not _UUID_RE.match(change.projectId):
+            item["result"] = "not_found"
+        else:
+            valid[change.projectId] = change.status
+        results.append(item)
+
+    # 3. Une seule mise à jour pour tout le lot
+    applied = {}
+    if valid:
+        try:
+            response = supabase_admin.rpc(
+                "admin_set_project_statuses",
+                {
+                    "changes": [{"projectId": pid, "status": st} for pid, st in valid.items()],
+                    "updated_on": datetime.now(timezone.utc).date().isoformat(),
+                },
+            ).execute()
+        except Exception as e:
+            logger.error(f"Erreur lors du changement de statut en masse: {e}")
+            raise HTTPException(status_code=500, detail="Erreur interne du serveur")
+        applied = {row["id"].lower(): row for row in response.data or []}
+
+    updated = 0
+    for item in results:
+        if "result" in item:
+            continue
+        row = applied.get(item["projectId"].lower())
+        if row is None:
+            item["result"] = "not_found"
+            continue
+        item["previousStatus"] = row["previous_status"]
+        item["result"] = "updated" if row["changed"] else "unchanged"
+        updated += row["changed"]
+
+    if updated:
+        logger.info(f"Statut modifié pour {updated} projet(s) par {current_user.id}")
+    return {"updated": updated, "results": results}
 
 
 @router.put("/projects/{projectId}/status")
@@ -428,16 +628,7 @@ async def update_project_status(
     except Exception:
         raise HTTPException(status_code=403, detail="Erreur de vérification des droits")
 
-    valid_statuses = [
-        "en attente",
-        "devis_envoyé",
-        "devis_refusé",
-        "paiement_attente",
-        "payé",
-        "en cours",
-        "terminé",
-    ]
-    if status not in valid_statuses:
+    if status not in PROJECT_STATUSES:
         raise HTTPException(status_code=400, detail="Statut invalide")
 
     update_data = {
@@ -454,7 +645,7 @@ async def update_project_status(
     return {"message": "Statut mis à jour", "project": result.data[0]}
 
 
-@router.post("/projects/{projectId}/files")
+@router.post("/projects/{projectId}/files", dependencies=[Depends(rate_limit("upload"))])
 async def upload_project_deliverables(
     projectId: str,
     files: List[UploadFile] = File(...),
@@ -487,7 +678,7 @@ async def upload_project_deliverables(
 
     for file in files:
         try:
-            content = await file.read()
+            content, digest = await read_upload(file, MAX_FILE_SIZE)
 
             if len(content) > MAX_FILE_SIZE:
                 rejected.append({"filename": file.filename, "reason": "Fichier trop volumineux (max 10MB)"})
@@ -501,19 +692,25 @@ async def upload_project_deliverables(
                 continue
 
             clean_name = sanitize_filename(file.filename)
-            file_path = f"deliverables/{projectId}/{datetime.now(timezone.utc).timestamp()}_{clean_name}"
+            file_type = "livrable_image" if mime_type.startswith("image/") else "livrable_doc"
 
             upload_content_type = "application/octet-stream" if is_3d_model else mime_type
-            supabase_admin.storage.from_("project-images").upload(
-                file_path, content, {"content-type": upload_content_type}
+            stored = await store_content_addressed(
+                supabase_admin,
+                "project-images",
+                content,
+                digest,
+                clean_name,
+                upload_content_type,
+                with_variants=file_type == "livrable_image",
             )
 
-            file_type = "livrable_image" if mime_type.startswith("image/") else "livrable_doc"
-
             supabase_admin.table("ProjectsImages").insert({
                 "projectId": projectId,
-                "fileUrl": file_path,
+                "fileUrl": stored["path"],
                 "file_type": file_type,
+                "file_name": clean_name,
+                "variants": stored["variants"],
             }).execute()
 
             uploaded.append(file.filename)
@@ -530,6 +727,7 @@ async def upload_project_deliverables(
 
 
 @router.post("/projects/{projectId}/quote")
+@round_trip_budget(7)
 async def create_project_quote(
     projectId: str, quote: ProjectQuote, current_user=Depends(get_current_user)
 ):
@@ -623,6 +821,7 @@ async def create_project_quote(
 
 
 @router.post("/projects/{projectId}/quote/refuse")
+@round_trip_budget(3)
 async def refuse_project_quote(projectId: str, current_user=Depends(get_current_user)):
     """
     Permet au client de refuser le devis reçu (Client propriétaire uniquement).
@@ -676,7 +875,7 @@ async def refuse_project_quote(projectId: str, current_user=Depends(get_current_
     }
 
 
-@router.post("/projects/{projectId}/pay")
+@router.post("/projects/{projectId}/pay", dependencies=[Depends(rate_limit("checkout"))])
 async def pay_project(projectId: str, current_user=Depends(get_current_user)):
     """
     Initier le paiement Stripe pour le projet (Client uniquement)
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, HTTPException, Depends
+from app.database import supabase_admin
+from app.dependencies import get_current_user
+from app.request_trace import round_trip_budget
+from app.responses import FastJSONResponse
+from app.routers.products import check_admin
+from app.routers.projects import PROJECT_STATUSES
+from datetime import datetime, timedelta, timezone
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Période du tableau de bord (jours)
+DEFAULT_STATS_DAYS = 30
+MAX_STATS_DAYS = 366
+TOP_PRODUCTS = 5
+
+_TOTAL_FIELDS = ("order_count", "order_revenue", "projects_paid", "project_revenue")
+
+
+@router.get("/admin/stats")
+@round_trip_budget(2)
+async def get_sales_stats(days: int = DEFAULT_STATS_DAYS, current_user=Depends(get_current_user)):
+    """
+    Tableau de bord des ventes (Admin uniquement) sur les `days` derniers jours
+    (1 à 366, défaut 30) : chiffre d'affaires et commandes par jour, totaux,
+    meilleurs produits de la période et entonnoir actuel des projets par statut.
+
+    Lu depuis les agrégats tenus à jour à l'écriture (migration 010) : le coût
+    dépend de la période, pas de la taille de l'historique.
+    """
+    if days < 1 or days > MAX_STATS_DAYS:
+        raise HTTPException(status_code=400, detail=f"Période invalide (1 à {MAX_STATS_DAYS} jours)")
+    check_admin(current_user)
+
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    try:
+        result = supabase_admin.rpc(
+            "admin_sales_stats", {"since": since.isoformat(), "top_n": TOP_PRODUCTS}
+        ).execute()
+    except Exception as e:
+        logger.error(f"Erreur lecture des statistiques de ventes: {e}")
+        raise HTTPException(status_code=500, detail="Erreur interne du serveur")
+
+    stats = result.data or {}
+    daily = stats.get("daily") or []
+    totals = {field: sum(day.get(field) or 0 for day in daily) for field in _TOTAL_FIELDS}
+    totals["revenue"] = totals["order_revenue"] + totals["project_revenue"]
+    funnel = stats.get("funnel") or {}
+
+    return FastJSONResponse({
+        "since": since.isoformat(),
+        "days": days,
+        "totals": totals,
+        "daily": daily,
+        "topProducts": stats.get("top_products") or [],
+        # Tous les statuts, dans l'ordre du cycle de vie d'un projet
+        "funnel": {status: funnel.get(status, 0) for status in PROJECT_STATUSES},
+    })
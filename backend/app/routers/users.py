@@ -1,13 +1,44 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from app.schemas.users import UserCreate, UserUpdate
 from app.database import supabase_admin
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, is_cached_admin
+from app.request_trace import round_trip_budget
+from app.responses import FastJSONResponse
+from app.routers.projects import CLOSED_STATUSES
 from datetime import datetime, timezone
+from typing import Optional
+import base64
 import logging
+import re
+import uuid
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Annuaire admin (GET /users)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+_TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2}[T ][\d:.]+(Z|[+-]\d{2}(:?\d{2})?)?$")
+
+
+def _encode_cursor(user: dict) -> str:
+    """Curseur opaque : position (createdAt, id) du dernier utilisateur de la page."""
+    raw = f"{user['createdAt']}|{user['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    """(createdAt ISO, id) d'un curseur. Lève une 400 si le curseur est invalide."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, user_id = raw.rsplit("|", 1)
+        uuid.UUID(user_id)
+        if not _TIMESTAMP_RE.match(created_at):
+            raise ValueError(created_at)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Curseur invalide")
+    return created_at, user_id
+
 
 @router.get("/users/me", status_code=status.HTTP_200_OK)
 async def get_current_user_profile(current_user=Depends(get_current_user)):
@@ -117,32 +148,65 @@ async def update_current_user_profile(
 
 
 @router.get("/users", status_code=status.HTTP_200_OK)
-async def get_users(current_user=Depends(get_current_user)):
+@round_trip_budget(2)
+async def get_users(
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    current_user=Depends(get_current_user),
+):
     """
-    Récupérer la liste de tous les utilisateurs (Admin uniquement).
+    Annuaire des utilisateurs (Admin uniquement), du plus récent au plus ancien.
+
+    - `search` : filtre sur prénom, nom et email (sous-chaîne, insensible à la casse)
+    - `cursor` : valeur `next_cursor` de la page précédente
+    - `limit` : taille de page (1 à 200, défaut 50)
+
+    Chaque utilisateur porte son nombre de projets actifs. `next_cursor` vaut
+    null sur la dernière page.
     """
-    # 1. Vérification du rôle Admin en base de données (Guidelines de sécurité)
-    try:
-        admin_check = (
-            supabase_admin.table("Users")
-            .select("role")
-            .eq("id", current_user.id)
-            .single()
-            .execute()
-        )
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        limit = DEFAULT_PAGE_SIZE
+    search = (search or "").strip() or None
+    cursor_created_at, cursor_id = _decode_cursor(cursor) if cursor else (None, None)
 
-        if not admin_check.data or admin_check.data["role"] != "admin":
-            logger.warning(
-                f"Accès refusé à /users pour l'utilisateur {current_user.id}"
-            )
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Accès réservé aux administrateurs",
+    try:
+        # 1. Vérification du rôle Admin (ensemble en cache, sinon en base)
+        if not is_cached_admin(current_user.id):
+            admin_check = (
+                supabase_admin.table("Users")
+                .select("role")
+                .eq("id", current_user.id)
+                .single()
+                .execute()
             )
 
-        # 2. Récupération de tous les utilisateurs
-        response = supabase_admin.table("Users").select("*").execute()
-        return response.data
+            if not admin_check.data or admin_check.data["role"] != "admin":
+                logger.warning(
+                    f"Accès refusé à /users pour l'utilisateur {current_user.id}"
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Accès réservé aux administrateurs",
+                )
+
+        # 2. Une page + 1 ligne (détecte s'il reste une page suivante)
+        response = supabase_admin.rpc(
+            "admin_list_users",
+            {
+                "search": search,
+                "cursor_created_at": cursor_created_at,
+                "cursor_id": cursor_id,
+                "page_size": limit + 1,
+                "closed_statuses": CLOSED_STATUSES,
+            },
+        ).execute()
+        users = response.data or []
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = _encode_cursor(users[-1])
+        return FastJSONResponse({"users": users, "next_cursor": next_cursor})
 
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des utilisateurs: {e}")
@@ -1,4 +1,8 @@
 from pydantic import BaseModel, Field, field_validator
+from typing import List
+
+# Taille maximale d'un lot de changements de statut
+MAX_BULK_STATUS_CHANGES = 200
 
 
 class ProjectQuote(BaseModel):
@@ -13,3 +17,14 @@ class ProjectQuote(BaseModel):
         if v > 100000:
             raise ValueError('Le prix ne peut pas dépasser 100 000€')
         return round(v, 2)
+
+
+class ProjectStatusChange(BaseModel):
+    """Un changement de statut du lot (statut validé projet par projet)"""
+    projectId: str
+    status: str
+
+
+class BulkProjectStatusUpdate(BaseModel):
+    """Schéma pour le changement de statut en masse (Admin)"""
+    changes: List[ProjectStatusChange] = Field(..., min_length=1, max_length=MAX_BULK_STATUS_CHANGES)
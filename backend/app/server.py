@@ -0,0 +1,122 @@
+"""
+Lanceur de production de l'API (image Docker, déploiement).
+
+    python -m app.server
+
+Par rapport à `uvicorn main:app --reload` (développement) :
+- nombre de workers déduit du quota CPU du conteneur (cgroup v2 / v1, sinon
+  CPUs disponibles), surchargeable par WEB_CONCURRENCY ;
+- boucle d'événements et parseur HTTP les plus rapides installés (uvloop,
+  httptools, fournis par uvicorn[standard]), repli sur asyncio / h11 ;
+- keep-alive, backlog et nombre maximal de connexions configurables ;
+- arrêt gracieux sur SIGTERM : le port est fermé immédiatement, les requêtes
+  en cours (uploads, webhooks Stripe, archives ZIP) ont GRACEFUL_TIMEOUT
+  secondes pour se terminer avant l'arrêt des workers.
+"""
+from importlib.util import find_spec
+from typing import Optional
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+# Au-delà, plus de workers = plus de mémoire et de connexions Supabase sans
+# gain (l'API attend surtout le réseau)
+MAX_AUTO_WORKERS = 8
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_quota() -> Optional[float]:
+    """Quota CPU du conteneur (en nombre de CPUs), None si non limité."""
+    cpu_max = _read(CGROUP_V2_CPU_MAX)
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+    quota, period = _read(CGROUP_V1_QUOTA), _read(CGROUP_V1_PERIOD)
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        return os.cpu_count() or 1
+
+
+def worker_count() -> int:
+    """
+    WEB_CONCURRENCY si défini, sinon un worker par CPU alloué (quota arrondi au
+    supérieur, borné par les CPUs visibles et MAX_AUTO_WORKERS).
+    """
+    configured = os.getenv("WEB_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    cpus = available_cpus()
+    quota = cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, min(cpus, MAX_AUTO_WORKERS))
+
+
+def event_loop() -> str:
+    return "uvloop" if find_spec("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if find_spec("httptools") else "h11"
+
+
+def server_options() -> dict:
+    """Options passées à uvicorn.run (surchargeables par variables d'environnement)."""
+    limit_concurrency = os.getenv("LIMIT_CONCURRENCY")
+    return {
+        "host": os.getenv("HOST", "0.0.0.0"),
+        "port": int(os.getenv("PORT", "8000")),
+        "workers": worker_count(),
+        "loop": event_loop(),
+        "http": http_protocol(),
+        # Supérieur au keep-alive des load-balancers courants (souvent 5-10 s)
+        # pour éviter les 502 sur connexion réutilisée au moment où on la ferme
+        "timeout_keep_alive": int(os.getenv("KEEP_ALIVE_TIMEOUT", "15")),
+        "backlog": int(os.getenv("BACKLOG", "2048")),
+        "limit_concurrency": int(limit_concurrency) if limit_concurrency else None,
+        "timeout_graceful_shutdown": int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+        "proxy_headers": True,
+        "server_header": False,
+        "access_log": os.getenv("ACCESS_LOG", "false").lower() == "true",
+    }
+
+
+def main() -> None:
+    import uvicorn
+    from dotenv import load_dotenv
+
+    # .env chargé avant la lecture de WEB_CONCURRENCY, KEEP_ALIVE_TIMEOUT, etc.
+    load_dotenv()
+    options = server_options()
+    logging.basicConfig(level=logging.INFO)
+    logger.info(
+        f"Démarrage : {options['workers']} worker(s), boucle {options['loop']}, "
+        f"HTTP {options['http']}, arrêt gracieux {options['timeout_graceful_shutdown']}s"
+    )
+    uvicorn.run("main:app", **options)
+
+
+if __name__ == "__main__":
+    main()
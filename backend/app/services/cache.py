@@ -0,0 +1,165 @@
+"""
+Caches en mémoire des données lues à chaque visite et rarement modifiées
+(catalogue public, documents légaux, clés de vérification des JWT, ensemble
+des administrateurs).
+
+Chaque cache a un chargeur synchrone (client supabase-py, httpx) et un
+intervalle de rafraîchissement. Au démarrage, le lifespan les préchauffe en
+arrière-plan (la readiness reste fausse tant que ce n'est pas fait) puis les
+rafraîchit périodiquement. Une écriture côté API invalide le cache concerné
+dans le worker courant ; les autres workers se mettent à jour au rafraîchissement
+suivant.
+
+Tant que le rafraîchissement n'est pas démarré (tests, jobs en ligne de
+commande), `get()` appelle directement le chargeur : aucune donnée mise en
+cache ne peut fuiter d'un test à l'autre.
+
+Les endpoints async utilisent `aget()` : quand un chargement est nécessaire
+(cache invalidé, froid ou inactif), il est fait dans un thread et partagé par
+les requêtes simultanées (voir app.services.single_flight).
+"""
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from app.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = float(os.getenv("CACHE_REFRESH_INTERVAL", "300"))
+# Fréquence à laquelle la tâche de fond regarde quels caches rafraîchir
+REFRESH_TICK = 5.0
+WARM_UP_TIMEOUT = 30.0
+
+_registry: Dict[str, "WarmCache"] = {}
+_state = {"active": False, "warm": False, "task": None}
+
+
+class WarmCache:
+    """Valeur chargée par `loader`, rechargée au-delà de `refresh_interval`."""
+
+    def __init__(self, name: str, loader: Callable[[], Any], refresh_interval: float):
+        self.name = name
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self._value = None
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flight = SingleFlight(name)
+
+    @property
+    def age(self) -> Optional[float]:
+        return None if self._loaded_at is None else time.monotonic() - self._loaded_at
+
+    def is_due(self) -> bool:
+        return self._loaded_at is None or self.age >= self.refresh_interval
+
+    def refresh(self) -> Any:
+        """Recharge la valeur (les erreurs du chargeur remontent à l'appelant)."""
+        with self._lock:
+            value = self.loader()
+            self._value = value
+            self._loaded_at = time.monotonic()
+        return value
+
+    def get(self) -> Any:
+        if not _state["active"]:
+            return self.loader()
+        # Filet de sécurité si la tâche de fond est bloquée : au-delà de deux
+        # intervalles, la valeur est rechargée à la demande
+        if self._loaded_at is None or self.age >= 2 * self.refresh_interval:
+            return self.refresh()
+        return self._value
+
+    async def aget(self) -> Any:
+        """get() pour les endpoints async : un chargement nécessaire est coalescé."""
+        if _state["active"] and self._loaded_at is not None and self.age < 2 * self.refresh_interval:
+            return self._value
+        return await self._flight.do(None, self.get)
+
+    def peek(self) -> Any:
+        """
+        Valeur en cache sans jamais appeler le chargeur (None si les caches ne
+        sont pas actifs ou si la valeur est absente / trop ancienne). Pour les
+        raccourcis dont l'appelant garde une vérification de repli.
+        """
+        if not _state["active"] or self._loaded_at is None or self.age >= 2 * self.refresh_interval:
+            return None
+        return self._value
+
+    def invalidate(self) -> None:
+        """Force le rechargement au prochain accès (après une écriture)."""
+        self._loaded_at = None
+
+
+def register_cache(name: str, loader: Callable[[], Any], refresh_interval: float = DEFAULT_REFRESH_INTERVAL) -> WarmCache:
+    cache = WarmCache(name, loader, refresh_interval)
+    _registry[name] = cache
+    return cache
+
+
+def is_warm() -> bool:
+    return _state["warm"]
+
+
+def check_warm() -> None:
+    """Vérification de la sonde de santé : échoue tant que les caches sont froids."""
+    if not _state["warm"]:
+        raise RuntimeError("caches en cours de préchauffage")
+
+
+async def _refresh(cache: WarmCache) -> bool:
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(cache.refresh)
+    except Exception as e:
+        logger.error(f"Rafraîchissement du cache {cache.name} impossible: {e}")
+        return False
+    logger.info(f"Cache {cache.name} chargé en {(time.perf_counter() - start) * 1000:.0f}ms")
+    return True
+
+
+async def warm_up(timeout: float = WARM_UP_TIMEOUT) -> bool:
+    """Charge tous les caches en parallèle. Retourne True si tous ont réussi."""
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*(_refresh(cache) for cache in _registry.values())), timeout
+        )
+    except asyncio.TimeoutError:
+        logger.error(f"Préchauffage des caches interrompu après {timeout}s")
+        return False
+    return all(results)
+
+
+async def _run() -> None:
+    # Préchauffage : réessayé jusqu'à réussite (base indisponible au démarrage)
+    while not await warm_up():
+        await asyncio.sleep(REFRESH_TICK)
+    _state["warm"] = True
+    while True:
+        await asyncio.sleep(REFRESH_TICK)
+        due = [cache for cache in _registry.values() if cache.is_due()]
+        if due:
+            await asyncio.gather(*(_refresh(cache) for cache in due))
+
+
+def start_refresher() -> None:
+    """Active les caches puis lance préchauffage et rafraîchissement en arrière-plan."""
+    if _state["task"] is None:
+        _state["active"] = True
+        _state["task"] = asyncio.create_task(_run())
+
+
+async def stop_refresher() -> None:
+    task = _state["task"]
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    _state.update(active=False, warm=False, task=None)
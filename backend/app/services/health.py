@@ -0,0 +1,138 @@
+"""
+Sonde de santé en arrière-plan.
+
+Les dépendances (base Supabase, Storage, Stripe) sont vérifiées toutes les
+HEALTH_PROBE_INTERVAL secondes par une tâche lancée au démarrage de l'API ;
+les endpoints /health, /health/ready ne font que lire le dernier résultat :
+un load-balancer qui interroge souvent n'ajoute aucune charge sur la base et
+ne reste jamais bloqué si elle est lente.
+
+Chaque vérification est une fonction synchrone (client supabase-py / stripe),
+exécutée dans un thread et bornée par HEALTH_PROBE_TIMEOUT.
+"""
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "15"))
+PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+
+
+def check_database(client) -> None:
+    client.table("Users").select("id").limit(1).execute()
+
+
+def check_storage(client) -> None:
+    client.storage.list_buckets()
+
+
+class HealthProber:
+    """
+    Vérifie périodiquement des dépendances et garde le dernier résultat de
+    chacune : status (up / down / unknown), latence, date de vérification.
+    `critical` liste les dépendances sans lesquelles l'API n'est pas prête.
+    """
+
+    def __init__(
+        self,
+        checks: Dict[str, Callable[[], None]],
+        critical: Iterable[str] = (),
+        interval: float = PROBE_INTERVAL,
+        timeout: float = PROBE_TIMEOUT,
+    ):
+        self.checks = checks
+        self.critical = set(critical)
+        self.interval = interval
+        self.timeout = timeout
+        self._results = {
+            name: {"status": "unknown", "latency_ms": None, "checked_at": None, "error": None}
+            for name in checks
+        }
+        self._checked_at_monotonic = {}
+        # Vérifications encore en cours dans leur thread (après un timeout)
+        self._pending = {}
+        self._task = None
+
+    async def _probe(self, name: str, check: Callable[[], None]) -> None:
+        pending = self._pending.get(name)
+        if pending is not None and not pending.done():
+            # La vérification précédente n'a pas rendu la main : on n'empile
+            # pas un thread de plus sur une dépendance bloquée
+            self._store(name, "down", None, "vérification précédente toujours en cours")
+            return
+
+        start = time.perf_counter()
+        future = asyncio.ensure_future(asyncio.to_thread(check))
+        self._pending[name] = future
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            status, error = "up", None
+        except asyncio.TimeoutError:
+            status, error = "down", f"timeout ({self.timeout}s)"
+        except Exception as e:
+            status, error = "down", str(e)
+        latency_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        if status == "down" and self._results[name]["status"] != "down":
+            logger.warning(f"Sonde de santé : {name} indisponible ({error})")
+        self._store(name, status, latency_ms, error)
+
+    def _store(self, name: str, status: str, latency_ms, error) -> None:
+        self._results[name] = {
+            "status": status,
+            "latency_ms": latency_ms,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "error": error,
+        }
+        self._checked_at_monotonic[name] = time.monotonic()
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self._probe(name, check) for name, check in self.checks.items()))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"Erreur de la sonde de santé: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def snapshot(self) -> dict:
+        """
+        Derniers résultats par dépendance. Un résultat plus vieux que trois
+        intervalles (sonde arrêtée ou bloquée) est marqué `stale`.
+        """
+        now = time.monotonic()
+        snapshot = {}
+        for name, result in self._results.items():
+            checked = self._checked_at_monotonic.get(name)
+            snapshot[name] = {
+                **result,
+                "stale": checked is not None and now - checked > 3 * self.interval,
+            }
+        return snapshot
+
+    def is_ready(self, snapshot: dict) -> bool:
+        return all(
+            snapshot[name]["status"] == "up" and not snapshot[name]["stale"]
+            for name in self.critical
+        )
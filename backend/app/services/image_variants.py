@@ -0,0 +1,197 @@
+"""
+Variantes d'images (miniature et taille moyenne) pour les pièces jointes de la
+messagerie et les images des projets.
+
+Les originaux (jusqu'à 10 Mo) restent stockés tels quels ; on génère en plus
+des versions WebP réduites, sans métadonnées EXIF, que le frontend affiche à la
+place de l'original. Le redimensionnement est fait dans un pool de processus
+borné pour ne pas bloquer la boucle d'événements ni saturer le CPU.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import asyncio
+import io
+import logging
+import os
+
+# Pillow est optionnel : sans lui, aucune variante n'est générée et le
+# frontend retombe sur l'original (même principe que python-magic)
+try:
+    from PIL import Image, ImageOps
+except Exception:
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# Nom de la variante -> plus grand côté en pixels
+VARIANT_SIZES = {"thumb": 320, "medium": 1280}
+VARIANT_CONTENT_TYPE = "image/webp"
+VARIANT_QUALITY = 80
+
+# Taille du pool et nombre maximal de rendus en attente (au-delà, les
+# uploads attendent leur tour plutôt que d'empiler les images en mémoire)
+MAX_WORKERS = max(1, int(os.getenv("IMAGE_VARIANT_WORKERS", "2")))
+MAX_PENDING = MAX_WORKERS * 2
+
+SIGNED_URL_TTL = 3600
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = asyncio.Semaphore(MAX_PENDING)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Crée le pool de processus au premier rendu (pas au démarrage de l'API)."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Arrête le pool de processus (arrêt de l'application)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def is_supported_image(content: bytes) -> bool:
+    """
+    Vérifie, sans décoder l'image, que Pillow sait la lire.
+    Évite d'envoyer au pool des fichiers qui échoueront de toute façon.
+    """
+    if Image is None:
+        return False
+    try:
+        with Image.open(io.BytesIO(content)) as img:
+            img.verify()
+        return True
+    except Exception:
+        return False
+
+
+def render_variants(content: bytes) -> dict:
+    """
+    Produit les variantes WebP d'une image. Retourne {nom: octets}.
+    Exécutée dans un processus du pool : ne doit dépendre que de ses arguments.
+    """
+    variants = {}
+    with Image.open(io.BytesIO(content)) as img:
+        # Applique l'orientation EXIF avant de la perdre
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+
+        for name, size in VARIANT_SIZES.items():
+            variant = img.copy()
+            variant.thumbnail((size, size))
+            buffer = io.BytesIO()
+            # Image neuve sans info EXIF/XMP : rien n'est recopié dans le WebP
+            variant.save(buffer, format="WEBP", quality=VARIANT_QUALITY, method=4)
+            variants[name] = buffer.getvalue()
+    return variants
+
+
+def variant_path(file_path: str, name: str) -> str:
+    """Chemin de stockage d'une variante, à côté de l'original."""
+    base, _ = os.path.splitext(file_path)
+    return f"{base}_{name}.webp"
+
+
+async def generate_variants(content: bytes) -> dict:
+    """Génère les variantes d'une image dans le pool de processus borné."""
+    if not is_supported_image(content):
+        return {}
+    async with _pending:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), render_variants, content)
+
+
+async def store_image_variants(bucket, file_path: str, content: bytes) -> Optional[dict]:
+    """
+    Génère et uploade les variantes d'une image à côté de son original.
+    `bucket` est le client storage du bucket (ex: supabase_admin.storage.from_(...)).
+    Retourne {nom: chemin} à enregistrer en base, ou None si aucune variante
+    n'a pu être produite (best effort : l'original reste utilisable).
+    """
+    try:
+        rendered = await generate_variants(content)
+    except Exception as e:
+        logger.warning(f"Génération des variantes impossible pour {file_path}: {e}")
+        return None
+
+    stored = {}
+    for name, data in rendered.items():
+        path = variant_path(file_path, name)
+        try:
+            bucket.upload(path, data, {"content-type": VARIANT_CONTENT_TYPE})
+            stored[name] = path
+        except Exception as e:
+            logger.warning(f"Upload de la variante {path} impossible: {e}")
+    return stored or None
+
+
+def sign_with_variants(bucket, file_path: str, variants: Optional[dict]) -> tuple:
+    """
+    Signe l'original et ses variantes en un seul appel storage.
+    Retourne (url_originale, {nom: url}) ; en cas d'échec, le chemin brut est
+    renvoyé pour l'original et les variantes sont omises.
+    """
+    variants = variants or {}
+    if not variants:
+        try:
+            signed = bucket.create_signed_url(file_path, SIGNED_URL_TTL)
+            return signed.get("signedURL", file_path), {}
+        except Exception as e:
+            logger.warning(f"URL signée impossible pour {file_path}: {e}")
+            return file_path, {}
+
+    paths = [file_path, *variants.values()]
+    try:
+        signed_items = bucket.create_signed_urls(paths, SIGNED_URL_TTL)
+    except Exception as e:
+        logger.warning(f"URLs signées impossibles pour {file_path}: {e}")
+        return file_path, {}
+
+    by_path = {item.get("path"): item.get("signedURL") for item in signed_items if not item.get("error")}
+    signed_variants = {
+        name: by_path[path] for name, path in variants.items() if by_path.get(path)
+    }
+    return by_path.get(file_path) or file_path, signed_variants
+
+
+def sign_batch(bucket, entries: list) -> list:
+    """
+    Signe en un seul appel storage les fichiers de plusieurs éléments (images
+    d'un projet, pièces jointes d'une discussion) et leurs variantes.
+    `entries` : liste de (chemin, {nom: chemin} ou None) ; un chemin vide est
+    laissé tel quel. Retourne dans le même ordre des (url, {nom: url}), avec
+    le même repli que sign_with_variants en cas d'échec.
+    """
+    paths = []
+    for file_path, variants in entries:
+        if file_path:
+            paths.append(file_path)
+            paths.extend((variants or {}).values())
+    # Stockage adressé par contenu : un même fichier peut revenir plusieurs fois
+    paths = list(dict.fromkeys(paths))
+
+    by_path = {}
+    if paths:
+        try:
+            signed_items = bucket.create_signed_urls(paths, SIGNED_URL_TTL)
+            by_path = {item.get("path"): item.get("signedURL") for item in signed_items if not item.get("error")}
+        except Exception as e:
+            logger.warning(f"URLs signées impossibles pour {len(paths)} fichier(s): {e}")
+
+    result = []
+    for file_path, variants in entries:
+        if not file_path or not by_path:
+            result.append((file_path, {}))
+            continue
+        signed_variants = {
+            name: by_path[path] for name, path in (variants or {}).items() if by_path.get(path)
+        }
+        result.append((by_path.get(file_path) or file_path, signed_variants))
+    return result
@@ -0,0 +1,82 @@
+"""
+Coalescence des lectures identiques simultanées (« single-flight »).
+
+Lors d'un pic de trafic, des dizaines de requêtes identiques (catalogue au
+moment où le cache est invalidé, vérification d'achat du même produit par le
+même client...) arrivent en même temps. Au lieu d'envoyer autant d'appels à
+PostgREST, le premier appelant lance la lecture et les suivants, tant qu'elle
+est en cours, attendent et partagent son résultat (ou son exception).
+
+La lecture (fonction synchrone : client supabase-py) tourne dans un thread
+pour ne pas bloquer la boucle : c'est ce qui permet aux requêtes concurrentes
+de se rejoindre. Elle s'exécute dans une tâche distincte, si bien que
+l'annulation du premier appelant (client déconnecté) n'interrompt pas les
+autres. Rien n'est conservé après la fin de l'appel : ce n'est pas un cache.
+
+La coalescence est locale à un worker ; le compteur
+modelify_single_flight_calls_total (exposé sur /metrics) distingue les appels
+exécutés (« leader ») de ceux qui ont été rattachés à un appel en cours
+(« collapsed »).
+"""
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable
+import asyncio
+
+from app.metrics import SINGLE_FLIGHT_CALLS
+
+
+class SingleFlight:
+    """Groupe d'appels coalescés, par clé."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[..., Any], *args) -> Any:
+        """Résultat de `fn(*args)`, partagé avec les appels de même clé en cours."""
+        task = self._inflight.get(key)
+        if task is None:
+            SINGLE_FLIGHT_CALLS.inc(self.name, "leader")
+            task = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            SINGLE_FLIGHT_CALLS.inc(self.name, "collapsed")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Exception lue ici : pas d'avertissement si tous les appelants ont été annulés
+        if not task.cancelled():
+            task.exception()
+
+
+def single_flight(name: str):
+    """
+    Décorateur d'une lecture synchrone : la fonction devient une coroutine dont
+    les appels simultanés avec les mêmes arguments (positionnels, hashables)
+    partagent une seule exécution.
+
+        @single_flight("purchased_ids")
+        def _load_purchased_ids(user_id: str) -> list:
+            ...
+
+        ids = await _load_purchased_ids(current_user.id)
+    """
+
+    def decorator(fn):
+        group = SingleFlight(name)
+
+        @wraps(fn)
+        async def wrapper(*args):
+            return await group.do(args, fn, *args)
+
+        wrapper.group = group
+        return wrapper
+
+    return decorator
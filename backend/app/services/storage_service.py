@@ -0,0 +1,121 @@
+"""
+Stockage adressé par contenu (déduplication des uploads).
+
+Chaque fichier est haché (SHA-256) pendant sa lecture puis rangé sous une clé
+dérivée de son empreinte et de son extension (cas/ab/abcd...ef.stl). La table
+`StorageBlobs` recense les clés déjà stockées : un contenu identique sous la
+même extension (ré-upload d'un modèle, image renvoyée) n'est pas ré-uploadé,
+on réutilise simplement l'objet existant. L'extension fait partie de la clé :
+le même contenu envoyé en .stl puis en .bin donne deux objets, chacun avec son
+propre type de contenu.
+
+Un même objet peut donc être référencé par plusieurs lignes (produits, images,
+messages) : il ne doit jamais être supprimé directement, seul le ramasse-miettes
+du storage (références en base) décide qu'il est orphelin.
+"""
+from fastapi import UploadFile
+from datetime import datetime, timezone
+from typing import Optional
+import hashlib
+import logging
+import os
+
+from app.services.image_variants import store_image_variants
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 1024 * 1024
+CAS_PREFIX = "cas"
+
+
+async def read_upload(file: UploadFile, max_size: Optional[int] = None) -> tuple:
+    """
+    Lit un fichier uploadé par blocs en calculant son SHA-256 au fil de l'eau.
+    Si `max_size` est fourni, la lecture s'arrête dès que la limite est
+    dépassée (le contenu renvoyé fait alors max_size + 1 octets au plus,
+    ce qui suffit à l'appelant pour rejeter le fichier).
+    Retourne (contenu, empreinte hexadécimale).
+    """
+    digest = hashlib.sha256()
+    chunks = []
+    total = 0
+    while True:
+        chunk = await file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        if max_size is not None and total + len(chunk) > max_size:
+            chunk = chunk[: max_size + 1 - total]
+        digest.update(chunk)
+        chunks.append(chunk)
+        total += len(chunk)
+        # Lecture courte = fin du fichier ; limite dépassée = inutile d'aller plus loin
+        if len(chunk) < READ_CHUNK_SIZE or (max_size is not None and total > max_size):
+            break
+    return b"".join(chunks), digest.hexdigest()
+
+
+def content_key(digest: str, filename: Optional[str]) -> str:
+    """Clé de stockage dérivée de l'empreinte (extension conservée pour le type)."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    return f"{CAS_PREFIX}/{digest[:2]}/{digest}{ext}"
+
+
+async def store_content_addressed(
+    client,
+    bucket_name: str,
+    content: bytes,
+    digest: str,
+    filename: Optional[str],
+    content_type: str,
+    with_variants: bool = False,
+) -> dict:
+    """
+    Stocke `content` sous sa clé de contenu, sauf s'il est déjà présent.
+    `client` est le client Supabase (service role) utilisé par le router.
+    Avec `with_variants`, génère aussi les variantes d'image au premier upload
+    (elles sont partagées par toutes les références au même contenu).
+    Retourne {"path", "variants", "reused"}.
+    """
+    path = content_key(digest, filename)
+    blobs = client.table("StorageBlobs")
+    # Recherche et marquage d'usage en un appel : le ramasse-miettes n'efface
+    # que les objets inutilisés depuis son délai de grâce (last_used_at), un
+    # objet réutilisé ici est donc protégé avant que la ligne qui le référence
+    # ne soit insérée
+    existing = (
+        blobs.update({"last_used_at": datetime.now(timezone.utc).isoformat()})
+        .eq("bucket", bucket_name)
+        .eq("path", path)
+        .execute()
+    )
+    if existing.data:
+        row = existing.data[0]
+        logger.info(f"Upload dédupliqué ({bucket_name}): {row['path']}")
+        return {"path": row["path"], "variants": row.get("variants"), "reused": True}
+
+    bucket = client.storage.from_(bucket_name)
+    # upsert : deux uploads simultanés du même contenu écrivent le même objet
+    bucket.upload(path, content, {"content-type": content_type, "upsert": "true"})
+
+    variants = None
+    if with_variants:
+        variants = await store_image_variants(bucket, path, content)
+
+    try:
+        blobs.upsert(
+            {
+                "bucket": bucket_name,
+                "sha256": digest,
+                "path": path,
+                "size": len(content),
+                "content_type": content_type,
+                "variants": variants,
+            },
+            on_conflict="bucket,path",
+            ignore_duplicates=True,
+        ).execute()
+    except Exception as e:
+        # Non bloquant : l'objet est stocké, seule la déduplication future est perdue
+        logger.warning(f"Enregistrement StorageBlobs impossible pour {path}: {e}")
+
+    return {"path": path, "variants": variants, "reused": False}
@@ -1,15 +1,39 @@
 import stripe
 import os
 import logging
-from dotenv import load_dotenv
-
-load_dotenv()
+from app.metrics import instrumented
 
 logger = logging.getLogger(__name__)
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+# Serveur Stripe alternatif (stripe-mock, doublures du test de charge)
+if os.getenv("STRIPE_API_BASE"):
+    stripe.api_base = os.getenv("STRIPE_API_BASE")
+
+
+@instrumented("stripe")
+def ping_stripe() -> None:
+    """
+    Vérifie que l'API Stripe est joignable avec la clé configurée
+    (utilisé par la sonde de santé, appel en lecture seule).
+    """
+    stripe.Balance.retrieve()
+
+
+@instrumented("stripe")
+def list_completed_checkout_sessions(created_after: int, starting_after: str = None, limit: int = 100):
+    """
+    Une page de sessions Checkout terminées créées après `created_after`
+    (timestamp Unix), des plus récentes aux plus anciennes (réconciliation
+    des paiements : app.jobs.stripe_reconcile).
+    """
+    params = {"status": "complete", "created": {"gt": created_after}, "limit": limit}
+    if starting_after:
+        params["starting_after"] = starting_after
+    return stripe.checkout.Session.list(**params)
 
 
+@instrumented("stripe")
 def get_or_create_customer(email: str, name: str, user_id: str) -> str:
     """
     Récupère un client Stripe existant par email ou en crée un nouveau.
@@ -29,6 +53,7 @@ def get_or_create_customer(email: str, name: str, user_id: str) -> str:
         raise e
 
 
+@instrumented("stripe")
 def create_stripe_product_and_price(title: str, description: str, price_eur: float) -> dict:
     """
     Crée un Product et un Price dans Stripe lors de la création d'un produit.
@@ -50,6 +75,7 @@ def create_stripe_product_and_price(title: str, description: str, price_eur: flo
         raise e
 
 
+@instrumented("stripe")
 def update_stripe_product_and_price(
     stripe_product_id: str,
     old_price_id: str,
@@ -85,6 +111,7 @@ def update_stripe_product_and_price(
         raise e
 
 
+@instrumented("stripe")
 def create_quote(customer_id: str, amount_eur: float, project_title: str) -> dict:
     """
     Crée un devis (Quote) dans Stripe pour un montant donné.
@@ -114,6 +141,7 @@ def create_quote(customer_id: str, amount_eur: float, project_title: str) -> dic
         raise e
 
 
+@instrumented("stripe")
 def cancel_quote(quote_id: str) -> dict:
     """
     Annule un devis (Quote) Stripe, par exemple lorsque le client le refuse.
@@ -126,6 +154,7 @@ def cancel_quote(quote_id: str) -> dict:
         raise e
 
 
+@instrumented("stripe")
 def create_product_checkout_session(
     customer_id: str,
     price_id: str,
@@ -159,6 +188,7 @@ def create_product_checkout_session(
         raise e
 
 
+@instrumented("stripe")
 def create_cart_checkout_session(
     customer_id: str,
     items: list,
@@ -194,6 +224,7 @@ def create_cart_checkout_session(
         raise e
 
 
+@instrumented("stripe")
 def create_checkout_session(
     customer_id: str,
     amount_eur: float,
@@ -0,0 +1,189 @@
+"""
+Archive ZIP construite à la volée pour le téléchargement groupé (fichiers d'un
+produit acheté, livrables d'un projet).
+
+Aucun fichier temporaire : chaque fichier est lu depuis le storage par blocs,
+compressé dans l'archive et renvoyé au client immédiatement. Une file bornée
+précharge les blocs suivants pendant l'écriture, la mémoire utilisée reste donc
+constante quelle que soit la taille des fichiers. La taille finale n'étant pas
+connue à l'avance, la réponse est envoyée en transfert chunked (pas de
+Content-Length).
+"""
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, Optional, Tuple
+from urllib.parse import unquote, urlparse
+import asyncio
+import logging
+import os
+import re
+import time
+import zipfile
+
+# httpx est importé à l'usage : il n'est pas nécessaire au démarrage de l'API
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Nombre de blocs préchargés depuis le storage (~1 Mo)
+PREFETCH_CHUNKS = 16
+# Secondes : lecture / connexion
+FETCH_TIMEOUT = 30.0
+CONNECT_TIMEOUT = 10.0
+
+# Formats déjà compressés : les recompresser coûte du CPU pour rien
+STORED_EXTENSIONS = {".zip", ".3mf", ".glb", ".jpg", ".jpeg", ".png", ".webp", ".gif", ".pdf"}
+
+
+class _ChunkSink:
+    """
+    Flux d'écriture non-seekable pour zipfile : accumule les octets écrits
+    jusqu'au prochain `drain()`. zipfile passe alors en mode « data descriptor »
+    (tailles et CRC écrits après chaque fichier).
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def archive_name(url_or_path: str) -> str:
+    """
+    Nom du fichier dans l'archive : dernier segment de l'URL ou du chemin,
+    sans le préfixe d'horodatage ajouté à l'upload ({timestamp}_nom.ext).
+    """
+    name = unquote(os.path.basename(urlparse(url_or_path).path)) or "fichier"
+    return re.sub(r"^\d+(\.\d+)?_", "", name) or name
+
+
+def _safe_entry_name(name: str) -> str:
+    """
+    Nom d'entrée sans chemin : dernier segment seulement (séparateurs Windows
+    compris), sans lecteur ni caractère de contrôle. Empêche qu'un nom venu de
+    l'upload (../../x, /etc/x, C:\\x) s'extraie hors du dossier de destination.
+    """
+    name = os.path.basename((name or "").replace("\\", "/"))
+    name = re.sub(r"[\x00-\x1f\x7f:]", "", name).strip()
+    return name if name not in ("", ".", "..") else "fichier"
+
+
+def _unique_name(name: str, seen: set) -> str:
+    """Évite deux entrées de même nom dans l'archive (nom_2.ext, nom_3.ext...)."""
+    candidate = name
+    base, ext = os.path.splitext(name)
+    index = 2
+    while candidate in seen:
+        candidate = f"{base}_{index}{ext}"
+        index += 1
+    seen.add(candidate)
+    return candidate
+
+
+async def _fetch_into(queue: asyncio.Queue, entries, client: "httpx.AsyncClient") -> None:
+    """
+    Producteur : télécharge les fichiers l'un après l'autre et pousse leurs
+    blocs dans la file bornée (bloque quand le client lit moins vite).
+    """
+    import httpx
+
+    try:
+        for name, url in entries:
+            try:
+                async with client.stream("GET", url) as response:
+                    if response.status_code != 200:
+                        logger.warning(f"Fichier ignoré dans l'archive ({response.status_code}): {name}")
+                        continue
+                    await queue.put(("file", name))
+                    async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                        await queue.put(("data", chunk))
+                    await queue.put(("end", None))
+            except httpx.HTTPError as e:
+                # Échec en cours de fichier : on interrompt l'archive plutôt que
+                # de livrer silencieusement un fichier tronqué
+                await queue.put(("error", e))
+                return
+        await queue.put(("done", None))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        await queue.put(("error", e))
+
+
+async def stream_zip(
+    entries: Iterable[Tuple[str, str]],
+    client: Optional["httpx.AsyncClient"] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Génère une archive ZIP à partir de couples (nom, url) à télécharger.
+    Les noms sont réduits à un nom de fichier simple et suffixés en cas de
+    doublon. Un fichier introuvable est ignoré ; une erreur réseau en cours de
+    transfert interrompt l'archive.
+    """
+    seen = set()
+    entries = [(_unique_name(_safe_entry_name(name), seen), url) for name, url in entries]
+
+    owns_client = client is None
+    if owns_client:
+        import httpx
+
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(FETCH_TIMEOUT, connect=CONNECT_TIMEOUT), follow_redirects=True
+        )
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=PREFETCH_CHUNKS)
+    producer = asyncio.create_task(_fetch_into(queue, entries, client))
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, mode="w")
+    entry = None
+
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == "file":
+                info = zipfile.ZipInfo(value, date_time=time.localtime()[:6])
+                ext = os.path.splitext(value)[1].lower()
+                info.compress_type = (
+                    zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                )
+                # Taille inconnue à l'avance : en-têtes ZIP64 toujours écrits,
+                # sinon un fichier de plus de 2 Go interrompt l'archive
+                entry = archive.open(info, mode="w", force_zip64=True)
+            elif kind == "data":
+                entry.write(value)
+            elif kind == "end":
+                entry.close()
+                entry = None
+            elif kind == "error":
+                raise value
+            elif kind == "done":
+                break
+
+            data = sink.drain()
+            if data:
+                yield data
+
+        # Répertoire central de l'archive
+        archive.close()
+        data = sink.drain()
+        if data:
+            yield data
+    finally:
+        producer.cancel()
+        if owns_client:
+            await client.aclose()
@@ -0,0 +1 @@
+# Benchmarks de performance du backend (hors suite de tests)
@@ -0,0 +1,333 @@
+"""
+Benchmark des index des filtres fréquents (migration 011).
+
+Sur un PostgreSQL local, dans un schéma jetable `index_bench` :
+- crée des tables Users / Products / Orders / Projects / ProjectsImages /
+  ProjectsMessages réduites aux colonnes lues, avec les index déjà en place
+  avant la migration 011 (clés primaires, unicité client_id / product_id des
+  commandes, migrations 003 et 006) ;
+- les remplit avec des volumes réalistes (generate_series, lignes rangées dans
+  l'ordre d'arrivée et non regroupées par client ou par projet) ;
+- exécute les requêtes chaudes de l'API telles que PostgREST les envoie, avec
+  EXPLAIN (ANALYZE, BUFFERS), avant puis après application de la migration 011 ;
+- affiche, par requête, le plan retenu (type de parcours et index), la médiane
+  du temps d'exécution et les pages lues.
+
+Passe par le client `psql` (aucun pilote Python requis). Depuis backend/ :
+
+    python -m benchmarks.index_bench --dsn postgresql://postgres@localhost/postgres
+    python -m benchmarks.index_bench --users 50000 --messages-per-project 40 --runs 20
+    python -m benchmarks.index_bench --json plans.json --keep   # conserve le schéma
+"""
+from statistics import median
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATION = os.path.join(BACKEND_DIR, "sql", "migrations", "011_hot_query_indexes.sql")
+SCHEMA = "index_bench"
+
+PROJECT_STATUSES = ["en attente", "devis_envoyé", "devis_refusé", "paiement_attente", "payé", "en cours", "terminé"]
+
+# Index présents avant la migration 011
+SCHEMA_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+
+CREATE TABLE "Users" (
+    id          uuid PRIMARY KEY,
+    email       text,
+    "createdAt" timestamptz NOT NULL
+);
+
+CREATE TABLE "Products" (
+    id         uuid PRIMARY KEY,
+    title      text,
+    price      numeric(10,2),
+    created_at timestamptz NOT NULL
+);
+
+CREATE TABLE "Orders" (
+    id                uuid PRIMARY KEY,
+    client_id         uuid NOT NULL,
+    product_id        text,
+    status            text,
+    stripe_session_id text,
+    amount_paid       numeric(10,2),
+    created_at        timestamptz NOT NULL,
+    UNIQUE (client_id, product_id)
+);
+
+CREATE TABLE "Projects" (
+    id          uuid PRIMARY KEY,
+    "userId"    uuid NOT NULL,
+    title       text,
+    description text,
+    status      text,
+    price       numeric(10,2),
+    created_at  timestamptz NOT NULL,
+    "updatedAt" timestamptz
+);
+
+CREATE TABLE "ProjectsImages" (
+    id          uuid PRIMARY KEY,
+    "projectId" uuid NOT NULL,
+    path        text,
+    created_at  timestamptz NOT NULL
+);
+
+CREATE TABLE "ProjectsMessages" (
+    id          uuid PRIMARY KEY,
+    "projectId" uuid NOT NULL,
+    sender_id   uuid,
+    content     text,
+    created_at  timestamptz NOT NULL
+);
+
+CREATE INDEX projects_user_id_status_idx ON "Projects" ("userId", status);
+CREATE INDEX orders_stripe_session_id_idx ON "Orders" (stripe_session_id);
+"""
+
+
+def seed_sql(users: int, products: int, orders_per_user: int, projects_per_user: int,
+             images_per_project: int, messages_per_project: int) -> str:
+    """Données de test : identifiants déterministes (md5) pour cibler un client connu."""
+    statuses = "ARRAY[" + ", ".join(f"'{s}'" for s in PROJECT_STATUSES) + "]"
+    return f"""
+INSERT INTO "Users" (id, email, "createdAt")
+SELECT md5('user' || u)::uuid, 'u' || u || '@bench.local', now() - u * interval '1 minute'
+FROM generate_series(1, {users}) u;
+
+INSERT INTO "Products" (id, title, price, created_at)
+SELECT md5('product' || p)::uuid, 'Produit ' || p, 10 + p % 90, now() - p * interval '1 hour'
+FROM generate_series(0, {products - 1}) p;
+
+-- Une commande sur cinq n'a pas abouti (paiement abandonné ou en attente)
+INSERT INTO "Orders" (id, client_id, product_id, status, stripe_session_id, amount_paid, created_at)
+SELECT md5('order' || u || '-' || k)::uuid,
+       md5('user' || u)::uuid,
+       md5('product' || ((u * 7 + k) % {products}))::uuid::text,
+       CASE WHEN (u + k) % 5 = 0 THEN 'pending' ELSE 'completed' END,
+       'cs_bench_' || u || '_' || k,
+       10 + (u + k) % 90,
+       now() - (k * {users} + u) * interval '1 minute'
+FROM generate_series(0, {orders_per_user - 1}) k, generate_series(1, {users}) u
+ORDER BY 7;
+
+INSERT INTO "Projects" (id, "userId", title, description, status, price, created_at, "updatedAt")
+SELECT md5('project' || u || '-' || k)::uuid,
+       md5('user' || u)::uuid,
+       'Projet ' || u || '-' || k,
+       repeat('Description du projet. ', 10),
+       ({statuses})[1 + (u + k) % {len(PROJECT_STATUSES)}],
+       100 + (u + k) % 400,
+       now() - (k * {users} + u) * interval '1 minute',
+       now() - (k * {users} + u) * interval '1 minute'
+FROM generate_series(0, {projects_per_user - 1}) k, generate_series(1, {users}) u
+ORDER BY 7;
+
+INSERT INTO "ProjectsImages" (id, "projectId", path, created_at)
+SELECT md5(p.id::text || '-image-' || i)::uuid,
+       p.id,
+       p."userId" || '/' || p.id || '/' || i || '.jpg',
+       p.created_at + i * interval '1 second'
+FROM "Projects" p, generate_series(1, {images_per_project}) i
+ORDER BY 4;
+
+-- Discussions entrelacées : un message par jour et par projet
+INSERT INTO "ProjectsMessages" (id, "projectId", sender_id, content, created_at)
+SELECT md5(p.id::text || '-message-' || i)::uuid,
+       p.id,
+       CASE WHEN i % 2 = 0 THEN p."userId" ELSE md5('admin')::uuid END,
+       'Message ' || i || ' : ' || repeat('texte ', 12),
+       p.created_at + i * interval '1 day'
+FROM "Projects" p, generate_series(1, {messages_per_project}) i
+ORDER BY 5;
+
+ANALYZE;
+"""
+
+
+def hot_queries(users: int, products: int, orders_per_user: int) -> dict:
+    """Requêtes de l'API, telles que PostgREST les génère, pour un client au milieu du jeu."""
+    u = users // 2
+    client = f"md5('user{u}')::uuid"
+    project = f"md5('project{u}-0')::uuid"
+    owned = [f"md5('product{(u * 7 + k) % products}')::uuid::text" for k in range(orders_per_user)]
+    cart = ", ".join(owned[:2] + [f"md5('product{(u * 7 + orders_per_user + k) % products}')::uuid::text" for k in range(2)])
+    return {
+        # POST /cart/checkout : produits du panier déjà achetés
+        "cart_already_bought": (
+            f"""SELECT product_id FROM "Orders" WHERE client_id = {client} """
+            f"""AND product_id IN ({cart}) AND status = 'completed'"""
+        ),
+        # GET /cart/purchased-ids
+        "purchased_ids": f"""SELECT product_id FROM "Orders" WHERE client_id = {client} AND status = 'completed'""",
+        # GET /products/{id}/purchased, téléchargement, /products/{id}/buy
+        "product_purchased": (
+            f"""SELECT id FROM "Orders" WHERE client_id = {client} """
+            f"""AND product_id = {owned[0]} AND status = 'completed'"""
+        ),
+        # GET /cart/order-status
+        "order_by_session": (
+            f"""SELECT id FROM "Orders" WHERE client_id = {client} """
+            f"""AND stripe_session_id = 'cs_bench_{u}_0' AND status = 'completed'"""
+        ),
+        # GET /orders/mine
+        "my_orders": (
+            f"""SELECT id, product_id, status, created_at, stripe_session_id FROM "Orders" """
+            f"""WHERE client_id = {client} ORDER BY created_at DESC"""
+        ),
+        # GET /projects (client), première page
+        "client_projects": (
+            f"""SELECT * FROM "Projects" WHERE "userId" = {client} """
+            f"""ORDER BY created_at DESC LIMIT 20 OFFSET 0"""
+        ),
+        # GET /projects (admin), première page
+        "admin_projects": """SELECT * FROM "Projects" ORDER BY created_at DESC LIMIT 20 OFFSET 0""",
+        # Détail, vue d'ensemble et livrables d'un projet
+        "project_images": f"""SELECT * FROM "ProjectsImages" WHERE "projectId" = {project}""",
+        # GET /projects/{id}/messages
+        "project_messages": (
+            f"""SELECT * FROM "ProjectsMessages" WHERE "projectId" = {project} ORDER BY created_at"""
+        ),
+        # GET /projects/{id}/overview : derniers messages
+        "overview_messages": (
+            f"""SELECT * FROM "ProjectsMessages" WHERE "projectId" = {project} """
+            f"""ORDER BY created_at DESC LIMIT 51"""
+        ),
+    }
+
+
+def _psql(dsn: str, sql: str) -> str:
+    env = dict(os.environ)
+    # Schéma de test en tête du search_path : les noms non qualifiés de la
+    # migration visent les tables de test ; pas de JIT pour des mesures stables
+    env["PGOPTIONS"] = f"-c search_path={SCHEMA} -c jit=off"
+    return subprocess.run(
+        ["psql", dsn, "-X", "-q", "-A", "-t", "-v", "ON_ERROR_STOP=1"],
+        input=sql,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+def _json_documents(text: str) -> list:
+    """Sorties EXPLAIN (FORMAT JSON) successives d'une même session psql."""
+    decoder = json.JSONDecoder()
+    documents, pos = [], 0
+    while True:
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+        if pos >= len(text):
+            return documents
+        document, pos = decoder.raw_decode(text, pos)
+        documents.append(document)
+
+
+def _scans(node: dict) -> list:
+    """Parcours de tables du plan, de haut en bas : « Index Scan (nom_idx) »."""
+    scans = []
+    if "Scan" in node["Node Type"]:
+        index = node.get("Index Name")
+        scans.append(f"{node['Node Type']} ({index})" if index else node["Node Type"])
+    for child in node.get("Plans", []):
+        scans.extend(_scans(child))
+    return scans
+
+
+def measure(dsn: str, sql: str, runs: int) -> dict:
+    """Plan et médiane du temps d'exécution (cache chaud : premier passage ignoré)."""
+    explain = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql};\n"
+    plans = [doc[0] for doc in _json_documents(_psql(dsn, explain * (runs + 1)))][1:]
+    root = plans[-1]["Plan"]
+    return {
+        "plan": " / ".join(_scans(root)) or root["Node Type"],
+        "median_ms": round(median(p["Execution Time"] for p in plans), 3),
+        "buffers": root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0),
+    }
+
+
+def run(dsn: str, runs: int, volumes: dict, keep: bool = False) -> dict:
+    queries = hot_queries(volumes["users"], volumes["products"], volumes["orders_per_user"])
+    _psql(dsn, SCHEMA_SQL)
+    try:
+        start = time.perf_counter()
+        _psql(dsn, seed_sql(**volumes))
+        seed_s = time.perf_counter() - start
+        before = {name: measure(dsn, sql, runs) for name, sql in queries.items()}
+
+        with open(MIGRATION, encoding="utf-8") as f:
+            _psql(dsn, f.read() + "\nANALYZE;\n")
+        after = {name: measure(dsn, sql, runs) for name, sql in queries.items()}
+    finally:
+        if not keep:
+            _psql(dsn, f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+
+    return {
+        "runs": runs,
+        "volumes": volumes,
+        "seed_s": round(seed_s, 1),
+        "queries": {name: {"before": before[name], "after": after[name]} for name in queries},
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"Jeu de données : {report['volumes']} (chargé en {report['seed_s']}s), {report['runs']} mesures par requête\n")
+    for name, result in report["queries"].items():
+        before, after = result["before"], result["after"]
+        speedup = before["median_ms"] / after["median_ms"] if after["median_ms"] else float("inf")
+        print(f"{name}  ×{speedup:.1f}")
+        print(f"  avant  {before['median_ms']:>9.3f} ms  {before['buffers']:>7} pages  {before['plan']}")
+        print(f"  après  {after['median_ms']:>9.3f} ms  {after['buffers']:>7} pages  {after['plan']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Plans et latences des requêtes chaudes, avant / après la migration 011")
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL", "postgresql://postgres@localhost/postgres"))
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--orders-per-user", type=int, default=5)
+    parser.add_argument("--projects-per-user", type=int, default=3)
+    parser.add_argument("--images-per-project", type=int, default=4)
+    parser.add_argument("--messages-per-project", type=int, default=20)
+    parser.add_argument("--json", metavar="FICHIER", help="écrit aussi le rapport complet en JSON")
+    parser.add_argument("--keep", action="store_true", help=f"conserve le schéma {SCHEMA} pour inspection")
+    args = parser.parse_args(argv)
+
+    if args.orders_per_user > args.products:
+        parser.error("--orders-per-user ne peut dépasser --products (une commande par produit et par client)")
+
+    volumes = {
+        "users": args.users,
+        "products": args.products,
+        "orders_per_user": args.orders_per_user,
+        "projects_per_user": args.projects_per_user,
+        "images_per_project": args.images_per_project,
+        "messages_per_project": args.messages_per_project,
+    }
+    try:
+        report = run(args.dsn, args.runs, volumes, keep=args.keep)
+    except FileNotFoundError:
+        print("Client psql introuvable (paquet postgresql-client)", file=sys.stderr)
+        return 1
+    except subprocess.CalledProcessError as e:
+        print(f"Erreur PostgreSQL : {e.stderr.strip()}", file=sys.stderr)
+        return 1
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Benchmark de la sérialisation JSON et de la compression des grosses listes.
+
+Pour des charges représentatives des endpoints de liste (GET /users,
+GET /projects admin avec la jointure Users, GET /orders/mine avec le produit
+embarqué, GET /legal) et plusieurs tailles, compare :
+- le chemin par défaut de FastAPI : jsonable_encoder puis json.dumps
+  (JSONResponse) ;
+- FastJSONResponse retournée directement (orjson, sans jsonable_encoder) ;
+et rapporte les octets transmis sans compression, en gzip et en brotli
+(si le paquet est installé). Aucun service externe n'est nécessaire. Depuis
+backend/ :
+
+    python -m benchmarks.json_bench
+    python -m benchmarks.json_bench --sizes 100 1000 --runs 20
+"""
+from statistics import median
+import argparse
+import time
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.responses import FastJSONResponse, brotli, compress
+
+DEFAULT_SIZES = (50, 500, 5000)
+LEGAL_SIZES = (3,)
+LOREM = (
+    "Modélisation 3D d'une pièce mécanique à partir de plans et de photos, "
+    "avec contraintes de dimensions et rendu réaliste. "
+)
+
+
+def _user(i: int) -> dict:
+    return {
+        "id": f"6f1c2a4e-0000-4000-8000-{i:012d}",
+        "email": f"client{i}@example.com",
+        "firstName": "Camille",
+        "lastName": f"Durand {i}",
+        "role": "admin" if i % 50 == 0 else "user",
+        "phone": "+33 6 12 34 56 78",
+        "created_at": "2026-03-14T09:26:53.589793+00:00",
+    }
+
+
+def _project(i: int) -> dict:
+    return {
+        "id": f"a3b9e0d2-0000-4000-8000-{i:012d}",
+        "userId": f"6f1c2a4e-0000-4000-8000-{i % 300:012d}",
+        "title": f"Projet {i} : support d'étagère",
+        "description": LOREM * 3,
+        "status": ("pending", "quoted", "in_progress", "completed")[i % 4],
+        "fileUrl": [f"user/{i}/ref-{n}.jpg" for n in range(3)],
+        "price": 149.9 if i % 4 else None,
+        "deadline": "2026-06-30",
+        "created_at": "2026-03-14T09:26:53.589793+00:00",
+        "Users": {"firstName": "Camille", "lastName": f"Durand {i % 300}", "role": "user"},
+    }
+
+
+def _order(i: int) -> dict:
+    return {
+        "id": f"c7d1f3a8-0000-4000-8000-{i:012d}",
+        "product_id": f"p-{i % 40}",
+        "status": "paid",
+        "created_at": "2026-03-14T09:26:53.589793+00:00",
+        "stripe_session_id": f"cs_test_{i:032d}",
+        "product": {
+            "id": f"p-{i % 40}",
+            "name": f"Modèle {i % 40}",
+            "description": LOREM,
+            "price": 29.0,
+            "image_url": f"https://cdn.example.com/products/{i % 40}.webp",
+        },
+    }
+
+
+def _legal(i: int) -> dict:
+    return {
+        "slug": ("cgv", "mentions-legales", "confidentialite")[i % 3],
+        "title": "Conditions générales de vente",
+        "content": LOREM * 120,
+        "updated_at": "2026-03-14T09:26:53.589793+00:00",
+    }
+
+
+def payloads(sizes) -> list:
+    """(nom, taille, contenu) pour chaque endpoint de liste."""
+    cases = []
+    for size in sizes:
+        cases.append(("GET /users", size, [_user(i) for i in range(size)]))
+        projects = [_project(i) for i in range(size)]
+        cases.append(("GET /projects", size, {"projects": projects, "total": size, "page": 1}))
+        cases.append(("GET /orders/mine", size, [_order(i) for i in range(size)]))
+    for size in LEGAL_SIZES:
+        cases.append(("GET /legal", size, [_legal(i) for i in range(size)]))
+    return cases
+
+
+def _time(func, runs: int) -> float:
+    """Durée médiane (secondes) d'un appel."""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return median(durations)
+
+
+def measure(content, runs: int) -> dict:
+    default = _time(lambda: JSONResponse(jsonable_encoder(content)), runs)
+    fast = _time(lambda: FastJSONResponse(content), runs)
+    body = FastJSONResponse(content).body
+    result = {
+        "default_ms": default * 1000,
+        "fast_ms": fast * 1000,
+        "identity_bytes": len(body),
+        "gzip_bytes": len(compress(body, "gzip")),
+        "gzip_ms": _time(lambda: compress(body, "gzip"), runs) * 1000,
+    }
+    if brotli is not None:
+        result["br_bytes"] = len(compress(body, "br"))
+        result["br_ms"] = _time(lambda: compress(body, "br"), runs) * 1000
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    header = (
+        f"{'endpoint':<18}{'lignes':>7}{'défaut ms':>11}{'orjson ms':>11}{'gain':>7}"
+        f"{'brut Ko':>10}{'gzip Ko':>9}{'gzip ms':>9}"
+    )
+    if brotli is not None:
+        header += f"{'br Ko':>8}{'br ms':>8}"
+    print(header)
+    for name, size, content in payloads(args.sizes):
+        r = measure(content, args.runs)
+        line = (
+            f"{name:<18}{size:>7}{r['default_ms']:>11.2f}{r['fast_ms']:>11.2f}"
+            f"{r['default_ms'] / max(r['fast_ms'], 1e-9):>6.1f}x"
+            f"{r['identity_bytes'] / 1024:>10.1f}{r['gzip_bytes'] / 1024:>9.1f}{r['gzip_ms']:>9.2f}"
+        )
+        if brotli is not None:
+            line += f"{r['br_bytes'] / 1024:>8.1f}{r['br_ms']:>8.2f}"
+        print(line)
+    if brotli is None:
+        print("(brotli non installé : pip install Brotli pour mesurer br)")
+
+
+if __name__ == "__main__":
+    main()
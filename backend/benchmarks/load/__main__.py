@@ -0,0 +1,235 @@
+"""
+Test de charge de bout en bout : l'API réelle (python -m app.server, donc
+main:app avec le lanceur de production) face à des doublures en mémoire de
+PostgREST, Storage et Stripe servies par ce processus, avec latence injectée.
+
+Des utilisateurs virtuels enchaînent en boucle des parcours tirés au sort
+(catalogue, panier → checkout, création de projet avec fichiers, messagerie)
+pendant une durée fixe ; le rapport donne par parcours et par étape le débit
+et les latences p50 / p95 / p99, ainsi que les appels amont reçus par les
+doublures. Depuis backend/ :
+
+    python -m benchmarks.load --duration 30 --users 20
+    python -m benchmarks.load --journeys browse,chat --postgrest-ms 10 --workers 2
+    python -m benchmarks.load --json rapport.json --max-p95-ms 800   # code 1 au-delà (CI)
+"""
+from collections import defaultdict
+from statistics import quantiles
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+import uvicorn
+
+from benchmarks.load.journeys import JOURNEYS, JourneyError, Recorder, VirtualUser, seed
+from benchmarks.load.stand_ins import StandIns
+from benchmarks.startup_bench import BACKEND_DIR, _free_port
+
+JWT_SECRET = "load-test-secret"
+READY_TIMEOUT = 60.0
+
+
+def _app_env(stand_in_url: str, port: int, args) -> dict:
+    env = dict(os.environ)
+    env.pop("TESTING", None)
+    env.update({
+        "SUPABASE_URL": stand_in_url,
+        "SUPABASE_KEY": "load-anon-key",
+        "SUPABASE_SERVICE_KEY": "load-service-key",
+        "SUPABASE_JWT_SECRET": JWT_SECRET,
+        "STRIPE_SECRET_KEY": "sk_test_load",
+        "STRIPE_API_BASE": stand_in_url,
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(args.workers),
+    })
+    if not args.keep_rate_limits:
+        # La limitation par utilisateur fausserait la mesure de capacité
+        env["RATE_LIMIT_BURST"] = "1000000000"
+    return env
+
+
+async def _wait_ready(client: httpx.AsyncClient, app: subprocess.Popen) -> None:
+    deadline = time.perf_counter() + READY_TIMEOUT
+    while time.perf_counter() < deadline:
+        if app.poll() is not None:
+            raise RuntimeError("l'API s'est arrêtée au démarrage")
+        try:
+            if (await client.get("/health/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"API non prête après {READY_TIMEOUT}s")
+
+
+async def _virtual_user(user: VirtualUser, journeys: list, weights: list, stop_at: float, think: float) -> None:
+    recorder = user.recorder
+    while time.perf_counter() < stop_at:
+        name = random.choices(journeys, weights)[0]
+        journey = JOURNEYS[name][0]
+        start = time.perf_counter()
+        try:
+            await journey(user)
+        except JourneyError:
+            if recorder.active:
+                recorder.journey_errors[name] += 1
+        else:
+            if recorder.active:
+                recorder.journeys[name].append(time.perf_counter() - start)
+        if think:
+            await asyncio.sleep(random.expovariate(1 / think))
+
+
+def _summary(durations: list, errors: int, seconds: float) -> dict:
+    result = {"count": len(durations), "errors": errors, "per_second": round(len(durations) / seconds, 2)}
+    if len(durations) >= 2:
+        cuts = quantiles(durations, n=100, method="inclusive")
+        result.update(p50_ms=round(cuts[49] * 1000, 1), p95_ms=round(cuts[94] * 1000, 1), p99_ms=round(cuts[98] * 1000, 1))
+    elif durations:
+        value = round(durations[0] * 1000, 1)
+        result.update(p50_ms=value, p95_ms=value, p99_ms=value)
+    return result
+
+
+def report(recorder: Recorder, stand_ins: StandIns, seconds: float, args) -> dict:
+    step_errors = defaultdict(int)
+    for (step, _), count in recorder.errors.items():
+        step_errors[step] += count
+    return {
+        "config": {
+            "duration_s": args.duration, "users": args.users, "workers": args.workers,
+            "latency_ms": {"postgrest": args.postgrest_ms, "storage": args.storage_ms, "stripe": args.stripe_ms},
+        },
+        "journeys": {
+            name: _summary(recorder.journeys[name], recorder.journey_errors[name], seconds)
+            for name in sorted(set(recorder.journeys) | set(recorder.journey_errors))
+        },
+        "steps": {
+            step: _summary(recorder.steps[step], step_errors[step], seconds)
+            for step in sorted(set(recorder.steps) | set(step_errors))
+        },
+        "errors": {f"{step} → {status}": count for (step, status), count in recorder.errors.items()},
+        "upstream_requests_per_second": {
+            service: round(count / seconds, 1) for service, count in stand_ins.measured_requests.items()
+        },
+    }
+
+
+def print_report(result: dict) -> None:
+    def table(title: str, rows: dict) -> None:
+        print(f"\n{title:<42}{'n':>7}{'/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'err':>6}")
+        for name, r in rows.items():
+            print(
+                f"{name:<42}{r['count']:>7}{r['per_second']:>8}{r.get('p50_ms', '-'):>9}"
+                f"{r.get('p95_ms', '-'):>9}{r.get('p99_ms', '-'):>9}{r['errors']:>6}"
+            )
+
+    table("Parcours", result["journeys"])
+    table("Étapes", result["steps"])
+    print("\nAppels amont reçus par les doublures (par seconde) :", result["upstream_requests_per_second"])
+    for error, count in result["errors"].items():
+        print(f"  erreur {error} : {count}")
+
+
+async def run(args) -> dict:
+    stand_ins = StandIns(args.postgrest_ms, args.storage_ms, args.stripe_ms, args.jitter)
+    fixtures = seed(stand_ins.db, JWT_SECRET, args.users, args.products)
+
+    stand_in_port, app_port = _free_port(), _free_port()
+    stand_in_server = uvicorn.Server(uvicorn.Config(
+        stand_ins, host="127.0.0.1", port=stand_in_port, log_level="warning", access_log=False,
+    ))
+    stand_in_task = asyncio.create_task(stand_in_server.serve())
+    app = subprocess.Popen(
+        [sys.executable, "-m", "app.server"],
+        cwd=BACKEND_DIR,
+        env=_app_env(f"http://127.0.0.1:{stand_in_port}", app_port, args),
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    recorder = Recorder()
+    try:
+        limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{app_port}", limits=limits, timeout=30.0
+        ) as client:
+            await _wait_ready(client, app)
+            journeys = args.journeys.split(",")
+            weights = [JOURNEYS[name][1] for name in journeys]
+            users = [VirtualUser(client, account, fixtures, recorder) for account in fixtures.users]
+
+            start = time.perf_counter()
+            stop_at = start + args.warmup + args.duration
+            tasks = [
+                asyncio.create_task(_virtual_user(user, journeys, weights, stop_at, args.think_ms / 1000))
+                for user in users
+            ]
+            # Échauffement hors mesure (connexions, caches, pool des variantes d'images)
+            await asyncio.sleep(args.warmup)
+            stand_ins.start_measuring()
+            recorder.active = True
+            measured_from = time.perf_counter()
+            await asyncio.gather(*tasks)
+            seconds = time.perf_counter() - measured_from
+    finally:
+        app.send_signal(signal.SIGTERM)
+        try:
+            app.wait(timeout=40)
+        except subprocess.TimeoutExpired:
+            app.kill()
+        stand_in_server.should_exit = True
+        await stand_in_task
+    return report(recorder, stand_ins, seconds, args)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Test de charge de bout en bout de l'API")
+    parser.add_argument("--duration", type=float, default=30, help="durée mesurée (s)")
+    parser.add_argument("--warmup", type=float, default=3, help="échauffement non mesuré (s)")
+    parser.add_argument("--users", type=int, default=20, help="utilisateurs virtuels simultanés")
+    parser.add_argument("--workers", type=int, default=1, help="workers de l'API (WEB_CONCURRENCY)")
+    parser.add_argument("--journeys", default=",".join(JOURNEYS), help=f"parmi {', '.join(JOURNEYS)}")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause moyenne entre deux parcours")
+    parser.add_argument("--postgrest-ms", type=float, default=5, help="latence injectée par requête PostgREST")
+    parser.add_argument("--storage-ms", type=float, default=20, help="latence injectée par appel Storage")
+    parser.add_argument("--stripe-ms", type=float, default=150, help="latence injectée par appel Stripe")
+    parser.add_argument("--jitter", type=float, default=0.2, help="variation relative de la latence injectée")
+    parser.add_argument("--products", type=int, default=40, help="taille du catalogue")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="garder la limitation de débit de l'API")
+    parser.add_argument("--json", help="écrit aussi le rapport JSON dans ce fichier")
+    parser.add_argument("--max-p95-ms", type=float, help="seuil de régression sur le p95 de chaque parcours")
+    parser.add_argument("--max-error-rate", type=float, help="seuil de régression (fraction des parcours en erreur)")
+    parser.add_argument("--verbose", action="store_true", help="affiche les logs de l'API")
+    args = parser.parse_args(argv)
+    unknown = set(args.journeys.split(",")) - set(JOURNEYS)
+    if unknown:
+        parser.error(f"parcours inconnu(s) : {', '.join(sorted(unknown))}")
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    failures = []
+    for name, summary in result["journeys"].items():
+        total = summary["count"] + summary["errors"]
+        if args.max_p95_ms and summary.get("p95_ms", 0) > args.max_p95_ms:
+            failures.append(f"{name} : p95 {summary['p95_ms']}ms > {args.max_p95_ms}ms")
+        if args.max_error_rate is not None and total and summary["errors"] / total > args.max_error_rate:
+            failures.append(f"{name} : {summary['errors']}/{total} parcours en erreur")
+    for failure in failures:
+        print(f"Régression : {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Parcours utilisateurs scriptés du test de charge et jeu de données initial.
+
+Chaque utilisateur virtuel a son compte (ligne Users + JWT HS256 signé avec
+SUPABASE_JWT_SECRET, validé localement par l'API) et un projet pour la
+messagerie. Un parcours enchaîne des requêtes HTTP sur l'API ; chaque
+requête est mesurée sous le nom de son étape (« POST /projects »...).
+"""
+from collections import defaultdict
+from typing import Optional
+import io
+import os
+import random
+import time
+
+import jwt
+
+from benchmarks.load.stand_ins import Database
+
+LEGAL_SLUGS = ("mentions-legales", "politique-confidentialite", "cgu", "cgv", "paiement-remboursement", "sav")
+PDF_DOCUMENT = b"%PDF-1.4\n1 0 obj << /Type /Catalog >> endobj\ntrailer << /Root 1 0 R >>\n%%EOF\n"
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow absent : projets avec un PDF seulement
+    Image = None
+
+
+class JourneyError(Exception):
+    """Réponse inattendue : le parcours est interrompu et compté en erreur."""
+
+
+class Recorder:
+    """Durées (secondes) par étape et par parcours, erreurs par (étape, statut)."""
+
+    def __init__(self):
+        self.steps = defaultdict(list)
+        self.journeys = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.journey_errors = defaultdict(int)
+        self.active = False
+
+
+class Fixtures:
+    """Jeu de données partagé par les utilisateurs virtuels."""
+
+    def __init__(self, db: Database, secret: str, products: list, users: list, images: list):
+        self.db = db
+        self.secret = secret
+        self.products = products
+        self.users = users
+        self.images = images
+
+    def image(self) -> Optional[bytes]:
+        """Image JPEG unique (octets aléatoires après la fin d'image) : jamais dédupliquée."""
+        if not self.images:
+            return None
+        return random.choice(self.images) + os.urandom(16)
+
+    def close_project(self, project_id: str) -> None:
+        # Hors mesure : libère la limite de 2 projets actifs par client
+        self.db.update("Projects", [("id", f"eq.{project_id}")], {"status": "terminé"})
+
+
+def _token(user_id: str, email: str, secret: str) -> str:
+    claims = {
+        "sub": user_id,
+        "email": email,
+        "role": "authenticated",
+        "aud": "authenticated",
+        "exp": int(time.time()) + 24 * 3600,
+        "user_metadata": {},
+    }
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+def _images(count: int) -> list:
+    if Image is None:
+        return []
+    images = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        Image.effect_noise((1200, 900), 40).convert("RGB").save(buffer, "JPEG", quality=85)
+        images.append(buffer.getvalue())
+    return images
+
+
+def seed(db: Database, secret: str, users: int, products: int) -> Fixtures:
+    """Catalogue, documents légaux, un admin, et un compte + un projet par utilisateur virtuel."""
+    catalog = [
+        db.insert("Products", {
+            "title": f"Modèle {i}",
+            "description": "Modèle 3D prêt à imprimer, plusieurs formats fournis. " * 4,
+            "price": 9.9 + i,
+            "overview_model_file": f"products/{i}/overview.glb",
+            "file_formats": ["stl", "obj"],
+            "stripe_product_id": f"prod_bench{i}",
+            "stripe_price_id": f"price_bench{i}",
+            "updated_at": None,
+        })
+        for i in range(products)
+    ]
+    for version, slug in enumerate(LEGAL_SLUGS, start=1):
+        db.insert("LegalDocuments", {
+            "slug": slug, "title": slug.replace("-", " ").title(),
+            "content": "Article. " * 600, "version": version, "updated_at": None,
+        })
+    db.insert("Users", {"email": "admin@bench.local", "firstName": "Admin", "lastName": "Bench", "role": "admin"})
+
+    accounts = []
+    for i in range(users):
+        email = f"client{i}@bench.local"
+        user = db.insert("Users", {"email": email, "firstName": "Client", "lastName": str(i), "role": "user"})
+        project = db.insert("Projects", {
+            "title": f"Projet de discussion {i}", "descriptionClient": "Pièce de rechange",
+            "userId": user["id"], "status": "en cours",
+        })
+        accounts.append({"id": user["id"], "token": _token(user["id"], email, secret), "project_id": project["id"]})
+    return Fixtures(db, secret, catalog, accounts, _images(4))
+
+
+class VirtualUser:
+    """Client HTTP authentifié d'un compte, qui mesure chaque requête."""
+
+    def __init__(self, client, account: dict, fixtures: Fixtures, recorder: Recorder):
+        self.client = client
+        self.account = account
+        self.fixtures = fixtures
+        self.recorder = recorder
+        self.headers = {"Authorization": f"Bearer {account['token']}", "Accept-Encoding": "gzip"}
+
+    async def call(self, step: str, method: str, url: str, expected=(200, 201), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except Exception as e:
+            if self.recorder.active:
+                self.recorder.errors[(step, type(e).__name__)] += 1
+            raise JourneyError(f"{step}: {e}") from e
+        if self.recorder.active:
+            self.recorder.steps[step].append(time.perf_counter() - start)
+        if response.status_code not in expected:
+            if self.recorder.active:
+                self.recorder.errors[(step, response.status_code)] += 1
+            raise JourneyError(f"{step}: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+
+async def browse_catalog(user: VirtualUser) -> None:
+    await user.call("GET /products", "GET", "/api/products")
+    await user.call("GET /legal", "GET", "/api/legal")
+    await user.call("GET /legal/{slug}", "GET", f"/api/legal/{random.choice(LEGAL_SLUGS)}")
+    await user.call("GET /cart/purchased-ids", "GET", "/api/cart/purchased-ids")
+
+
+async def checkout_cart(user: VirtualUser) -> None:
+    products = random.sample(user.fixtures.products, k=min(len(user.fixtures.products), random.randint(1, 3)))
+    await user.call("GET /products", "GET", "/api/products")
+    response = await user.call(
+        "POST /cart/checkout", "POST", "/api/cart/checkout", json={"product_ids": [p["id"] for p in products]}
+    )
+    if "checkout_url" not in response.json():
+        raise JourneyError("POST /cart/checkout: checkout_url absent")
+
+
+async def create_project(user: VirtualUser) -> None:
+    files = [("files", ("cahier-des-charges.pdf", PDF_DOCUMENT, "application/pdf"))]
+    image = user.fixtures.image()
+    if image is not None:
+        files.append(("files", ("reference.jpg", image, "image/jpeg")))
+    response = await user.call(
+        "POST /projects", "POST", "/api/projects",
+        data={"title": "Support mural", "descriptionClient": "Support imprimable en PLA", "budget": "50-100"},
+        files=files,
+    )
+    project_id = response.json()["projectId"]
+    try:
+        await user.call("GET /projects/{id}/overview", "GET", f"/api/projects/{project_id}/overview")
+        await user.call("GET /projects", "GET", "/api/projects?page=1&limit=20")
+    finally:
+        user.fixtures.close_project(project_id)
+
+
+async def chat(user: VirtualUser) -> None:
+    url = f"/api/projects/{user.account['project_id']}/messages"
+    # Ouverture de la page projet, puis polling de la discussion
+    await user.call("GET /projects/{id}/overview", "GET", f"/api/projects/{user.account['project_id']}/overview")
+    await user.call("POST /projects/{id}/messages", "POST", url, data={"content": "Où en est la modélisation ?"})
+    image = user.fixtures.image()
+    if image is not None and random.random() < 0.25:
+        await user.call(
+            "POST /projects/{id}/messages (image)", "POST", url,
+            files={"file": ("avancement.jpg", image, "image/jpeg")},
+        )
+    await user.call("GET /projects/{id}/messages", "GET", url)
+
+
+# Parcours disponibles et poids par défaut dans le mélange
+JOURNEYS = {
+    "browse": (browse_catalog, 5),
+    "checkout": (checkout_cart, 2),
+    "project": (create_project, 1),
+    "chat": (chat, 3),
+}
@@ -0,0 +1,509 @@
+"""
+Doublures en mémoire de PostgREST, Supabase Storage, Supabase Auth (JWKS)
+et Stripe, servies par une application Starlette dans le processus du
+harnais de charge.
+
+Elles implémentent le sous-ensemble des API utilisé par le backend
+(filtres eq / neq / in / is / gt..., `not.`, tri, pagination, count=exact,
+objets uniques, embeds Users(...), upsert, upload multipart, URLs signées,
+clients et sessions Checkout Stripe, création et listing), avec une latence injectée par service
+pour simuler le réseau et le temps de traitement amont.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+import asyncio
+import csv
+import itertools
+import random
+import re
+import time
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+# Clés étrangères : (table, colonne) -> table référencée (embeds Users(...)...)
+FOREIGN_KEYS = {
+    ("Projects", "userId"): "Users",
+    ("ProjectsImages", "projectId"): "Projects",
+    ("ProjectsMessages", "projectId"): "Projects",
+    ("ProjectsMessages", "senderId"): "Users",
+    ("ProjectChatSummaries", "project_id"): "Projects",
+    ("Orders", "client_id"): "Users",
+    ("Orders", "product_id"): "Products",
+}
+
+SINGLE_OBJECT = "application/vnd.pgrst.object+json"
+CLOSED_PROJECT_STATUSES = ("terminé", "devis_refusé")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _text(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _number_or_text(value: str):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _parse_list(value: str) -> set:
+    """« (a,b,"c,d") » -> {"a", "b", "c,d"}"""
+    return set(next(csv.reader([value.strip("()")])))
+
+
+def _split_top_level(select: str) -> list:
+    """Sépare une clause select sur les virgules hors parenthèses."""
+    parts, depth, current = [], 0, ""
+    for char in select:
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def matches(row: dict, column: str, expression: str) -> bool:
+    """Évalue un filtre PostgREST (« eq.x », « not.in.(a,b) »...) sur une ligne."""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    operator, _, value = expression.partition(".")
+    actual = row.get(column)
+    if operator == "eq":
+        result = _text(actual) == value
+    elif operator == "neq":
+        result = _text(actual) != value
+    elif operator == "in":
+        result = _text(actual) in _parse_list(value)
+    elif operator == "is":
+        result = _text(actual) == value
+    elif operator in ("gt", "gte", "lt", "lte"):
+        if actual is None:
+            result = False
+        else:
+            left, right = _number_or_text(_text(actual)), _number_or_text(value)
+            if type(left) is not type(right):
+                left, right = _text(actual), value
+            result = {
+                "gt": left > right, "gte": left >= right, "lt": left < right, "lte": left <= right,
+            }[operator]
+    elif operator in ("like", "ilike"):
+        pattern = re.escape(value).replace(r"\*", ".*").replace("%", ".*")
+        flags = re.IGNORECASE if operator == "ilike" else 0
+        result = actual is not None and re.fullmatch(pattern, _text(actual), flags) is not None
+    else:
+        raise ValueError(f"opérateur non supporté par la doublure : {operator}")
+    return result != negate
+
+
+def _create_project_within_limit(db: "Database", project: dict, max_active: int) -> list:
+    # Équivalent de la fonction SQL (migration 007), compteur recalculé
+    active = [
+        p for p in db.select("Projects", [("userId", f"eq.{project['userId']}")])
+        if p.get("status") not in CLOSED_PROJECT_STATUSES
+    ]
+    return [] if len(active) >= max_active else [db.insert("Projects", project)]
+
+
+def _order_and_limit(rows: list, order: str, offset: int, limit: Optional[str]) -> list:
+    """Tri (`col.desc,col2`) puis fenêtre offset/limit, comme PostgREST."""
+    rows = list(rows)
+    for clause in reversed(order.split(",")):
+        if clause:
+            column, _, direction = clause.partition(".")
+            rows.sort(
+                key=lambda r: (r.get(column) is None, _text(r.get(column))),
+                reverse=direction.startswith("desc"),
+            )
+    return rows[offset: offset + int(limit) if limit else None]
+
+
+def _send_project_message(db: "Database", project_id: str, sender_id: str, body=None,
+                          file_path=None, file_variants=None, sent_at=None) -> dict:
+    # Équivalent de la fonction SQL (migration 008)
+    projects = db.select("Projects", [("id", f"eq.{project_id}")])
+    if not projects:
+        return {"status": "not_found"}
+    senders = db.select("Users", [("id", f"eq.{sender_id}")])
+    sender = senders[0] if senders else {}
+    is_admin = sender.get("role") == "admin"
+    if projects[0].get("userId") != sender_id and not is_admin:
+        return {"status": "forbidden"}
+    created = db.insert("ProjectsMessages", {
+        "projectId": project_id,
+        "senderId": sender_id,
+        "sender_role": "admin" if is_admin else "client",
+        "content": body,
+        "fileUrl": file_path,
+        "variants": file_variants,
+        "created_at": sent_at,
+    })
+    _update_chat_summary(db, created)
+    users = {"firstName": sender.get("firstName"), "lastName": sender.get("lastName")}
+    return {"status": "sent", "message": {**created, "Users": users}}
+
+
+def _update_chat_summary(db: "Database", message: dict) -> None:
+    # Équivalent du trigger projects_messages_chat_summary (migration 009)
+    from_admin = message["sender_role"] == "admin"
+    rows = db.select("ProjectChatSummaries", [("project_id", f"eq.{message['projectId']}")])
+    summary = rows[0] if rows else db.insert("ProjectChatSummaries", {
+        "project_id": message["projectId"], "message_count": 0, "unread_by_client": 0, "unread_by_admin": 0,
+    })
+    summary.update({
+        "message_count": summary["message_count"] + 1,
+        "last_message_at": message["created_at"],
+        "last_sender_role": message["sender_role"],
+        "unread_by_client": summary["unread_by_client"] + 1 if from_admin else 0,
+        "unread_by_admin": 0 if from_admin else summary["unread_by_admin"] + 1,
+    })
+
+
+def _mark_project_chat_read(db: "Database", project_id: str, reader_role: str) -> None:
+    for summary in db.select("ProjectChatSummaries", [("project_id", f"eq.{project_id}")]):
+        summary[f"unread_by_{reader_role}"] = 0
+
+
+class Database:
+    """Tables en mémoire (listes de dicts) et fonctions RPC."""
+
+    def __init__(self):
+        self.tables: Dict[str, list] = defaultdict(list)
+        self.functions: Dict[str, Callable] = {
+            "create_project_within_limit": _create_project_within_limit,
+            "send_project_message": _send_project_message,
+            "mark_project_chat_read": _mark_project_chat_read,
+        }
+
+    def insert(self, table: str, row: dict) -> dict:
+        row = dict(row)
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", _now())
+        self.tables[table].append(row)
+        return row
+
+    def select(self, table: str, filters: list) -> list:
+        return [
+            row for row in self.tables.get(table, ())
+            if all(matches(row, column, expression) for column, expression in filters)
+        ]
+
+    def update(self, table: str, filters: list, values: dict) -> list:
+        rows = self.select(table, filters)
+        for row in rows:
+            row.update(values)
+        return rows
+
+    def delete(self, table: str, filters: list) -> list:
+        rows = self.select(table, filters)
+        ids = {id(row) for row in rows}
+        self.tables[table] = [row for row in self.tables[table] if id(row) not in ids]
+        return rows
+
+    def upsert(self, table: str, row: dict, conflict_columns: list, ignore_duplicates: bool) -> Optional[dict]:
+        existing = self.select(table, [(c, f"eq.{_text(row.get(c))}") for c in conflict_columns])
+        if existing:
+            if ignore_duplicates:
+                return None
+            existing[0].update(row)
+            return existing[0]
+        return self.insert(table, row)
+
+    def project(self, table: str, row: dict, select: str, embed_params: Optional[dict] = None) -> dict:
+        """
+        Colonnes demandées + embeds (ressources liées) d'une ligne.
+        `embed_params` : tri et limite des embeds 1-n ({"Embed.order": ..., "Embed.limit": ...}).
+        """
+        result = {}
+        for item in _split_top_level(select or "*"):
+            if item == "*":
+                result.update(row)
+            elif "(" in item:
+                name, _, columns = item.partition("(")
+                embed = name.split("!")[0].split(":")[-1].strip()
+                related = self._embed(table, row, embed, columns[:-1])
+                if isinstance(related, list) and embed_params:
+                    related = _order_and_limit(
+                        related, embed_params.get(f"{embed}.order", ""), 0, embed_params.get(f"{embed}.limit")
+                    )
+                result[embed] = related
+            else:
+                column = item.split(":")[-1].split("::")[0].strip()
+                result[item.split(":")[0].strip()] = row.get(column)
+        return result
+
+    def _embed(self, table: str, row: dict, embed: str, columns: str):
+        for (source, column), target in FOREIGN_KEYS.items():
+            # Relation directe (n-1) : la ligne porte la clé étrangère
+            if source == table and target == embed and row.get(column) is not None:
+                related = self.select(embed, [("id", f"eq.{row[column]}")])
+                return self.project(embed, related[0], columns) if related else None
+        for (source, column), target in FOREIGN_KEYS.items():
+            # Relation inverse (1-n) : lignes de `embed` qui référencent la ligne
+            if source == embed and target == table:
+                related = self.select(embed, [(column, f"eq.{row.get('id')}")])
+                return [self.project(embed, r, columns) for r in related]
+        return None
+
+
+class Latency:
+    """Latence injectée par service : `base_ms` ± `jitter` (fraction)."""
+
+    def __init__(self, base_ms: float = 0.0, jitter: float = 0.2):
+        self.base_ms = base_ms
+        self.jitter = jitter
+
+    async def wait(self) -> None:
+        if self.base_ms > 0:
+            factor = 1 + random.uniform(-self.jitter, self.jitter)
+            await asyncio.sleep(self.base_ms * factor / 1000)
+
+
+class StandIns:
+    """Application ASGI qui répond à la place de Supabase et de Stripe."""
+
+    def __init__(self, postgrest_ms: float = 0, storage_ms: float = 0, stripe_ms: float = 0, jitter: float = 0.2):
+        self.db = Database()
+        self.latency = {
+            "postgrest": Latency(postgrest_ms, jitter),
+            "storage": Latency(storage_ms, jitter),
+            "stripe": Latency(stripe_ms, jitter),
+        }
+        self.objects: Dict[str, int] = {}
+        self.customers: Dict[str, dict] = {}
+        self.checkout_sessions: Dict[str, dict] = {}
+        self.requests = defaultdict(int)
+        self._baseline: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self.app = Starlette(routes=[
+            Route("/auth/v1/.well-known/jwks.json", self.jwks),
+            Route("/rest/v1/rpc/{function}", self.rpc, methods=["POST"]),
+            Route("/rest/v1/{table}", self.postgrest, methods=["GET", "POST", "PATCH", "DELETE"]),
+            Route("/storage/v1/bucket", self.list_buckets),
+            Route("/storage/v1/object/sign/{bucket}", self.sign_many, methods=["POST"]),
+            Route("/storage/v1/object/sign/{bucket}/{path:path}", self.sign_one, methods=["POST"]),
+            Route("/storage/v1/object/{bucket}/{path:path}", self.upload, methods=["POST", "PUT"]),
+            Route("/storage/v1/object/{bucket}", self.remove, methods=["DELETE"]),
+            Route("/v1/balance", self.stripe_balance),
+            Route("/v1/customers", self.stripe_customers, methods=["GET", "POST"]),
+            Route("/v1/checkout/sessions", self.stripe_checkout_session, methods=["GET", "POST"]),
+            Route("/v1/{resource:path}", self.stripe_generic, methods=["GET", "POST"]),
+        ])
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+
+    def start_measuring(self) -> None:
+        """Point de départ des compteurs de `measured_requests` (fin de l'échauffement)."""
+        self._baseline = dict(self.requests)
+
+    @property
+    def measured_requests(self) -> Dict[str, int]:
+        return {service: count - self._baseline.get(service, 0) for service, count in self.requests.items()}
+
+    async def _enter(self, service: str, request: Request) -> None:
+        self.requests[service] += 1
+        await self.latency[service].wait()
+
+    # --- Auth ---------------------------------------------------------------
+
+    async def jwks(self, request: Request):
+        # Projet signé en HS256 : aucun JWKS (le harnais signe avec SUPABASE_JWT_SECRET)
+        return JSONResponse({"keys": []})
+
+    # --- PostgREST ----------------------------------------------------------
+
+    async def postgrest(self, request: Request):
+        await self._enter("postgrest", request)
+        table = request.path_params["table"]
+        params = request.query_params
+        prefer = request.headers.get("prefer", "")
+        filters = [
+            (column, value) for column, value in params.multi_items()
+            if column not in ("select", "order", "limit", "offset", "on_conflict", "columns")
+            and not column.endswith((".order", ".limit"))
+        ]
+        embed_params = {k: v for k, v in params.items() if k.endswith((".order", ".limit"))}
+
+        if request.method == "GET":
+            rows = self.db.select(table, filters)
+            total = len(rows)
+            offset = int(params.get("offset", 0))
+            rows = _order_and_limit(rows, params.get("order", ""), offset, params.get("limit"))
+            body = [self.db.project(table, row, params.get("select", "*"), embed_params) for row in rows]
+            headers = {}
+            if "count=exact" in prefer:
+                headers["content-range"] = f"{offset}-{offset + len(body) - 1}/{total}" if body else f"*/{total}"
+            return self._rows_response(request, body, headers)
+
+        if request.method == "POST":
+            payload = await request.json()
+            rows = payload if isinstance(payload, list) else [payload]
+            if "resolution=" in prefer:
+                conflict = params.get("on_conflict", "id").split(",")
+                ignore = "resolution=ignore-duplicates" in prefer
+                created = [self.db.upsert(table, row, conflict, ignore) for row in rows]
+                created = [row for row in created if row is not None]
+            else:
+                created = [self.db.insert(table, row) for row in rows]
+            return self._rows_response(request, created, status_code=201)
+
+        if request.method == "PATCH":
+            updated = self.db.update(table, filters, await request.json())
+            return self._rows_response(request, updated)
+
+        return self._rows_response(request, self.db.delete(table, filters))
+
+    def _rows_response(self, request: Request, rows: list, headers: Optional[dict] = None, status_code: int = 200):
+        if request.headers.get("accept") == SINGLE_OBJECT:
+            if len(rows) != 1:
+                return JSONResponse(
+                    {
+                        "code": "PGRST116",
+                        "details": f"The result contains {len(rows)} rows",
+                        "hint": None,
+                        "message": "JSON object requested, multiple (or no) rows returned",
+                    },
+                    status_code=406,
+                )
+            return JSONResponse(rows[0], status_code=status_code, headers=headers)
+        return JSONResponse(rows, status_code=status_code, headers=headers)
+
+    async def rpc(self, request: Request):
+        await self._enter("postgrest", request)
+        name = request.path_params["function"]
+        function = self.db.functions.get(name)
+        if function is None:
+            return JSONResponse(
+                {"code": "PGRST202", "details": None, "hint": None, "message": f"Could not find the function {name}"},
+                status_code=404,
+            )
+        body = await request.body()
+        params = await request.json() if body else {}
+        return JSONResponse(function(self.db, **params))
+
+    # --- Storage ------------------------------------------------------------
+
+    async def list_buckets(self, request: Request):
+        await self._enter("storage", request)
+        return JSONResponse([{"id": "project-images", "name": "project-images", "public": False}])
+
+    def _signed(self, bucket: str, path: str) -> str:
+        return f"/object/sign/{bucket}/{path}?token=bench-{next(self._ids)}"
+
+    async def sign_one(self, request: Request):
+        await self._enter("storage", request)
+        bucket, path = request.path_params["bucket"], request.path_params["path"]
+        return JSONResponse({"signedURL": self._signed(bucket, path)})
+
+    async def sign_many(self, request: Request):
+        await self._enter("storage", request)
+        bucket = request.path_params["bucket"]
+        payload = await request.json()
+        return JSONResponse([
+            {"path": path, "signedURL": self._signed(bucket, path), "error": None}
+            for path in payload.get("paths", [])
+        ])
+
+    async def upload(self, request: Request):
+        await self._enter("storage", request)
+        bucket, path = request.path_params["bucket"], request.path_params["path"]
+        # Corps multipart lu en entier (coût réseau simulé) ; seule la taille est gardée
+        size = len(await request.body())
+        self.objects[f"{bucket}/{path}"] = size
+        return JSONResponse({"Key": f"{bucket}/{path}", "Id": str(uuid.uuid4())})
+
+    async def remove(self, request: Request):
+        await self._enter("storage", request)
+        bucket = request.path_params["bucket"]
+        payload = await request.json()
+        removed = [p for p in payload.get("prefixes", []) if self.objects.pop(f"{bucket}/{p}", None) is not None]
+        return JSONResponse([{"name": p} for p in removed])
+
+    # --- Stripe -------------------------------------------------------------
+
+    def _stripe_id(self, prefix: str) -> str:
+        return f"{prefix}_bench{next(self._ids):012d}"
+
+    async def stripe_balance(self, request: Request):
+        await self._enter("stripe", request)
+        return JSONResponse({
+            "object": "balance", "livemode": False,
+            "available": [{"amount": 0, "currency": "eur"}], "pending": [],
+        })
+
+    async def stripe_customers(self, request: Request):
+        await self._enter("stripe", request)
+        if request.method == "GET":
+            email = request.query_params.get("email")
+            data = [c for c in self.customers.values() if email is None or c["email"] == email][:1]
+            return JSONResponse({"object": "list", "data": data, "has_more": False, "url": "/v1/customers"})
+        form = await request.form()
+        customer = {"id": self._stripe_id("cus"), "object": "customer", "email": form.get("email"), "name": form.get("name")}
+        self.customers[customer["id"]] = customer
+        return JSONResponse(customer)
+
+    async def stripe_checkout_session(self, request: Request):
+        await self._enter("stripe", request)
+        if request.method == "GET":
+            return JSONResponse(self._list_checkout_sessions(request.query_params))
+        form = await request.form()
+        session_id = self._stripe_id("cs_test")
+        self.checkout_sessions[session_id] = {
+            "id": session_id, "object": "checkout.session", "mode": "payment",
+            "status": "open", "payment_status": "unpaid", "payment_intent": None,
+            "amount_total": None, "created": int(time.time()),
+            "metadata": {key[9:-1]: value for key, value in form.multi_items() if key.startswith("metadata[")},
+            "url": f"https://checkout.stripe.test/c/pay/{session_id}",
+        }
+        return JSONResponse(self.checkout_sessions[session_id])
+
+    def complete_checkout_session(self, session_id: str, amount_total: int = 0, created: Optional[int] = None) -> dict:
+        """Simule le paiement d'une session (client passé par Checkout)."""
+        session = self.checkout_sessions[session_id]
+        session.update(
+            status="complete", payment_status="paid",
+            payment_intent=self._stripe_id("pi"), amount_total=amount_total,
+        )
+        if created is not None:
+            session["created"] = created
+        return session
+
+    def _list_checkout_sessions(self, params) -> dict:
+        # Ordre Stripe : plus récentes d'abord ; pagination par starting_after
+        sessions = sorted(self.checkout_sessions.values(), key=lambda s: (s["created"], s["id"]), reverse=True)
+        if params.get("status"):
+            sessions = [s for s in sessions if s["status"] == params["status"]]
+        if params.get("created[gt]"):
+            sessions = [s for s in sessions if s["created"] > int(params["created[gt]"])]
+        if params.get("starting_after"):
+            ids = [s["id"] for s in sessions]
+            sessions = sessions[ids.index(params["starting_after"]) + 1:]
+        limit = int(params.get("limit", 10))
+        return {
+            "object": "list", "url": "/v1/checkout/sessions",
+            "data": sessions[:limit], "has_more": len(sessions) > limit,
+        }
+
+    async def stripe_generic(self, request: Request):
+        await self._enter("stripe", request)
+        resource = request.path_params["resource"].split("/")[0]
+        return JSONResponse({"id": self._stripe_id(resource[:4]), "object": resource.rstrip("s")})
@@ -0,0 +1,119 @@
+"""
+Benchmark de débit : configuration de production (python -m app.server) contre
+la commande actuelle (uvicorn main:app, un seul processus, boucle et parseur
+par défaut).
+
+Un client asyncio ouvre N connexions keep-alive et envoie des requêtes en
+boucle sur un endpoint sans dépendance externe (/health/live par défaut)
+pendant une durée fixe. Depuis backend/ :
+
+    python -m benchmarks.server_bench --duration 10 --connections 64
+"""
+from statistics import quantiles
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.startup_bench import BACKEND_DIR, FIRST_RESPONSE_TIMEOUT, _env, _free_port
+
+CONFIGURATIONS = {
+    "uvicorn": lambda port: [
+        sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+        "--loop", "asyncio", "--http", "h11", "--no-access-log",
+    ],
+    "app.server": lambda port: [sys.executable, "-m", "app.server"],
+}
+
+
+def _wait_ready(port: int, path: str) -> None:
+    deadline = time.perf_counter() + FIRST_RESPONSE_TIMEOUT
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"Serveur injoignable sur le port {port}")
+
+
+async def _connection(port: int, request: bytes, stop_at: float, latencies: list) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    done = 0
+    try:
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            writer.write(request)
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            done += 1
+    finally:
+        writer.close()
+    return done
+
+
+async def _load(port: int, path: str, connections: int, duration: float) -> dict:
+    request = f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode()
+    latencies = []
+    stop_at = time.perf_counter() + duration
+    counts = await asyncio.gather(
+        *(_connection(port, request, stop_at, latencies) for _ in range(connections))
+    )
+    percentiles = quantiles(latencies, n=100)
+    return {
+        "requests": sum(counts),
+        "rps": round(sum(counts) / duration, 1),
+        "p50_ms": round(percentiles[49] * 1000, 2),
+        "p99_ms": round(percentiles[98] * 1000, 2),
+    }
+
+
+def bench(name: str, path: str, connections: int, duration: float) -> dict:
+    port = _free_port()
+    env = _env()
+    env.update(HOST="127.0.0.1", PORT=str(port))
+    server = subprocess.Popen(
+        CONFIGURATIONS[name](port),
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(port, path)
+        return asyncio.run(_load(port, path, connections, duration))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=40)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de débit du serveur")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--path", default="/health/live")
+    parser.add_argument("--workers", type=int, help="WEB_CONCURRENCY pour app.server (auto sinon)")
+    args = parser.parse_args(argv)
+
+    if args.workers:
+        os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    report = {
+        name: bench(name, args.path, args.connections, args.duration) for name in CONFIGURATIONS
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark du démarrage à froid de l'API.
+
+Mesure, sur plusieurs exécutions dans des processus neufs :
+- le temps d'import de `main` (routers, services, dépendances) ;
+- le temps jusqu'à la première réponse : lancement d'uvicorn jusqu'au premier
+  200 sur /health/live.
+
+Les clients Supabase / Stripe n'étant construits qu'au premier usage, des
+valeurs factices suffisent pour SUPABASE_URL et SUPABASE_KEY si elles ne sont
+pas définies. Depuis backend/ :
+
+    python -m benchmarks.startup_bench --runs 5
+    python -m benchmarks.startup_bench --max-import-ms 1500   # échoue au-delà (CI)
+"""
+from statistics import median
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import main; "
+    "print(time.perf_counter() - start)"
+)
+FIRST_RESPONSE_TIMEOUT = 30.0
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.pop("TESTING", None)
+    env.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+    env.setdefault("SUPABASE_KEY", "bench-key")
+    # Pas d'appel Stripe réel depuis la sonde de santé pendant la mesure
+    env.pop("STRIPE_SECRET_KEY", None)
+    return env
+
+
+def measure_import() -> float:
+    """Temps d'import de main (secondes), dans un processus neuf."""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response() -> float:
+    """Temps entre le lancement d'uvicorn et la première réponse 200 (secondes)."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health/live"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        env=_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < FIRST_RESPONSE_TIMEOUT:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn s'est arrêté avant de répondre")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError(f"Pas de réponse sur {url} après {FIRST_RESPONSE_TIMEOUT}s")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def run(runs: int) -> dict:
+    imports = [measure_import() for _ in range(runs)]
+    first_responses = [measure_first_response() for _ in range(runs)]
+    return {
+        "runs": runs,
+        "import_ms": {"median": round(median(imports) * 1000, 1), "max": round(max(imports) * 1000, 1)},
+        "first_response_ms": {
+            "median": round(median(first_responses) * 1000, 1),
+            "max": round(max(first_responses) * 1000, 1),
+        },
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage à froid de l'API")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, help="seuil de régression (médiane)")
+    parser.add_argument("--max-first-response-ms", type=float, help="seuil de régression (médiane)")
+    args = parser.parse_args(argv)
+
+    report = run(args.runs)
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    if args.max_import_ms and report["import_ms"]["median"] > args.max_import_ms:
+        failures.append(f"import {report['import_ms']['median']}ms > {args.max_import_ms}ms")
+    if args.max_first_response_ms and report["first_response_ms"]["median"] > args.max_first_response_ms:
+        failures.append(
+            f"première réponse {report['first_response_ms']['median']}ms > {args.max_first_response_ms}ms"
+        )
+    for failure in failures:
+        print(f"Régression du démarrage : {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,11 +2,20 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import projects, users, products, legal, cart, webhooks, messages
-from app.database import supabase_admin
-import uvicorn
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.routers import projects, users, products, legal, cart, webhooks, messages, exports, stats
+from app.database import close_clients, supabase_admin
+from app.metrics import MetricsMiddleware, render_metrics
+from app.rate_limit import UploadAdmissionMiddleware
+from app.responses import CompressionMiddleware, FastJSONResponse
+from app.services.cache import check_warm, start_refresher, stop_refresher
+from app.services.health import HealthProber, check_database, check_storage
+from app.services.image_variants import shutdown_executor
+from app.services.stripe_service import ping_stripe
+import secrets
 import os
 import logging
 
@@ -18,12 +27,46 @@ missing_vars = [var for var in REQUIRED_ENV_VARS if not os.getenv(var)]
 if missing_vars:
     raise RuntimeError(f"Variables d'environnement manquantes: {', '.join(missing_vars)}")
 
+
+# Sonde de santé : la base et le préchauffage des caches sont critiques
+# (readiness), Storage et Stripe non
+_health_checks = {
+    "database": lambda: check_database(supabase_admin),
+    "storage": lambda: check_storage(supabase_admin),
+    "caches": check_warm,
+}
+if os.getenv("STRIPE_SECRET_KEY"):
+    _health_checks["stripe"] = ping_stripe
+health_prober = HealthProber(_health_checks, critical=("database", "caches"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Catalogue, documents légaux, JWKS et admins : préchauffés en arrière-plan
+    # (readiness fausse d'ici là) puis rafraîchis périodiquement
+    start_refresher()
+    health_prober.start()
+    yield
+    await health_prober.stop()
+    await stop_refresher()
+    # Arrêt du pool de processus des variantes d'images
+    shutdown_executor()
+    close_clients()
+
+
 app = FastAPI(
     title="Modelify API",
     description="API pour la plateforme de demandes de modélisation 3D Modelify",
     version="1.0.0",
+    lifespan=lifespan,
+    # Sérialisation orjson pour toutes les routes (voir app/responses.py)
+    default_response_class=FastJSONResponse,
 )
 
+# Plafond d'octets d'upload en cours de traitement (429 avant lecture du corps).
+# Ajouté avant CORS pour que la 429 porte les en-têtes CORS
+app.add_middleware(UploadAdmissionMiddleware)
+
 # Configuration CORS
 origins = ["http://localhost:3000", os.getenv("FRONTEND_URL")]  # Default fallback
 
@@ -33,8 +76,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type"],
+    # Délai indiqué par les 429 (limitation de débit), lisible par le frontend
+    expose_headers=["Retry-After"],
 )
 
+# Compression brotli / gzip des réponses au-delà de COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
+# Latence par route (exposée sur /metrics), compression comprise
+app.add_middleware(MetricsMiddleware)
+
 # Routes
 app.include_router(projects.router, prefix="/api", tags=["projects"])
 app.include_router(users.router, prefix="/api", tags=["users"])
@@ -43,6 +94,8 @@ app.include_router(legal.router, prefix="/api", tags=["legal"])
 app.include_router(cart.router, prefix="/api", tags=["cart"])
 app.include_router(webhooks.router, prefix="/api", tags=["webhooks"])
 app.include_router(messages.router, prefix="/api", tags=["messages"])
+app.include_router(exports.router, prefix="/api", tags=["exports"])
+app.include_router(stats.router, prefix="/api", tags=["stats"])
 
 
 @app.get("/")
@@ -52,18 +105,58 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check avec vérification de la connexion à la base de données"""
-    db_status = "connected"
-    try:
-        # Test de connexion à Supabase
-        supabase_admin.table("Users").select("id").limit(1).execute()
-    except Exception as e:
-        logger.warning(f"Database health check failed: {e}")
-        db_status = "disconnected"
-    
+    """
+    Health check (format historique) : état de la base d'après le dernier
+    passage de la sonde de santé, sans requête à chaque appel.
+    """
+    database = health_prober.snapshot()["database"]
+    db_status = {"up": "connected", "down": "disconnected"}.get(database["status"], "unknown")
     status = "healthy" if db_status == "connected" else "degraded"
     return {"status": status, "database": db_status}
 
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness : le processus répond (aucune dépendance vérifiée)."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness : état de chaque dépendance d'après la sonde en arrière-plan
+    (statut, latence et date de la dernière vérification).
+    503 tant que la base n'a pas répondu à la dernière vérification.
+    """
+    dependencies = health_prober.snapshot()
+    ready = health_prober.is_ready(dependencies)
+    if not ready:
+        status = "unavailable"
+    elif all(dep["status"] == "up" for dep in dependencies.values()):
+        status = "healthy"
+    else:
+        status = "degraded"
+    return JSONResponse(
+        {"status": status, "dependencies": dependencies},
+        status_code=200 if ready else 503,
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """
+    Métriques au format Prometheus. Si METRICS_TOKEN est défini, le scraper
+    doit l'envoyer en header `Authorization: Bearer <token>`.
+    """
+    token = os.getenv("METRICS_TOKEN")
+    if token:
+        provided = request.headers.get("authorization", "")
+        if not secrets.compare_digest(provided, f"Bearer {token}"):
+            raise HTTPException(status_code=401, detail="Non autorisé")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,6 @@
+-- Variantes d'images (miniature / taille moyenne, WebP sans EXIF) générées à
+-- l'upload : {"thumb": "<chemin>", "medium": "<chemin>"} dans le bucket
+-- project-images. NULL pour les documents et les anciens enregistrements.
+
+ALTER TABLE "ProjectsImages" ADD COLUMN IF NOT EXISTS variants jsonb;
+ALTER TABLE "ProjectsMessages" ADD COLUMN IF NOT EXISTS variants jsonb;
@@ -0,0 +1,20 @@
+-- Stockage adressé par contenu : un objet par (bucket, SHA-256).
+-- Les uploads identiques réutilisent `path` au lieu de créer une copie.
+-- Table réservée au backend (service role) : RLS activé sans policy.
+
+CREATE TABLE IF NOT EXISTS "StorageBlobs" (
+    bucket       text        NOT NULL,
+    sha256       char(64)    NOT NULL,
+    path         text        NOT NULL,
+    size         bigint      NOT NULL,
+    content_type text,
+    variants     jsonb,
+    created_at   timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (bucket, sha256)
+);
+
+ALTER TABLE "StorageBlobs" ENABLE ROW LEVEL SECURITY;
+
+-- Nom d'origine du fichier : la clé de contenu (cas/ab/abcd...ef.stl) n'est
+-- pas lisible, le nom sert aux téléchargements (archives ZIP)
+ALTER TABLE "ProjectsImages" ADD COLUMN IF NOT EXISTS file_name text;
@@ -0,0 +1,73 @@
+-- Annuaire admin des utilisateurs (GET /api/users) : pagination par curseur
+-- ("createdAt", id), recherche sur nom / prénom / email et nombre de projets
+-- actifs par utilisateur, en une seule requête.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Parcours paginé : ordre d'affichage (plus récents d'abord)
+CREATE INDEX IF NOT EXISTS users_created_at_id_idx
+    ON "Users" ("createdAt" DESC, id DESC);
+
+-- Recherche : trigrammes sur le texte concaténé (ILIKE '%terme%' indexé,
+-- préfixe comme sous-chaîne)
+CREATE INDEX IF NOT EXISTS users_search_trgm_idx
+    ON "Users" USING gin (
+        lower(coalesce("firstName", '') || ' ' || coalesce("lastName", '') || ' ' || coalesce(email, ''))
+        gin_trgm_ops
+    );
+
+-- Décompte des projets actifs d'une page d'utilisateurs
+CREATE INDEX IF NOT EXISTS projects_user_id_status_idx
+    ON "Projects" ("userId", status);
+
+-- Une page d'utilisateurs (colonnes affichées uniquement, jamais les
+-- identifiants Stripe) après le curseur (cursor_created_at, cursor_id).
+-- `closed_statuses` : statuts de projet non comptés comme actifs.
+CREATE OR REPLACE FUNCTION admin_list_users(
+    search            text        DEFAULT NULL,
+    cursor_created_at timestamptz DEFAULT NULL,
+    cursor_id         uuid        DEFAULT NULL,
+    page_size         integer     DEFAULT 50,
+    closed_statuses   text[]      DEFAULT ARRAY['terminé', 'devis_refusé']
+)
+RETURNS TABLE (
+    id              uuid,
+    email           text,
+    "firstName"     text,
+    "lastName"      text,
+    role            text,
+    "createdAt"     timestamptz,
+    active_projects bigint
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        u.id,
+        u.email,
+        u."firstName",
+        u."lastName",
+        u.role,
+        u."createdAt",
+        (
+            SELECT count(*)
+            FROM "Projects" p
+            WHERE p."userId" = u.id
+              AND NOT (p.status = ANY (closed_statuses))
+        ) AS active_projects
+    FROM "Users" u
+    WHERE (
+        search IS NULL
+        OR lower(coalesce(u."firstName", '') || ' ' || coalesce(u."lastName", '') || ' ' || coalesce(u.email, ''))
+           LIKE '%' || replace(replace(replace(lower(search), '\', '\\'), '%', '\%'), '_', '\_') || '%'
+    )
+      AND (
+        cursor_created_at IS NULL
+        OR (u."createdAt", u.id) < (cursor_created_at, cursor_id)
+    )
+    ORDER BY u."createdAt" DESC, u.id DESC
+    LIMIT page_size;
+$$;
+
+-- Réservée au backend (service role)
+REVOKE EXECUTE ON FUNCTION admin_list_users(text, timestamptz, uuid, integer, text[]) FROM PUBLIC, anon, authenticated;
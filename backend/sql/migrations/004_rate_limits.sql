@@ -0,0 +1,49 @@
+-- Seaux à jetons partagés entre workers (RATE_LIMIT_BACKEND=database).
+-- Table réservée au backend (service role) : RLS activé sans policy.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS "RateLimitBuckets" (
+    key        text             PRIMARY KEY,
+    tokens     double precision NOT NULL,
+    updated_at timestamptz      NOT NULL DEFAULT clock_timestamp()
+);
+
+ALTER TABLE "RateLimitBuckets" ENABLE ROW LEVEL SECURITY;
+
+-- Consomme `cost` jetons du seau `bucket_key` (créé plein au premier appel).
+-- Retourne 0 si accepté, sinon le nombre de secondes avant d'avoir assez de
+-- jetons. Le verrou de ligne de l'upsert sérialise les appels concurrents.
+CREATE OR REPLACE FUNCTION rate_limit_take(
+    bucket_key        text,
+    cost              double precision,
+    capacity          double precision,
+    refill_per_second double precision
+)
+RETURNS double precision
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    available double precision;
+BEGIN
+    INSERT INTO "RateLimitBuckets" AS b (key, tokens, updated_at)
+    VALUES (bucket_key, capacity, clock_timestamp())
+    ON CONFLICT (key) DO UPDATE
+        SET tokens = least(
+                capacity,
+                b.tokens + extract(epoch FROM clock_timestamp() - b.updated_at) * refill_per_second
+            ),
+            updated_at = clock_timestamp()
+    RETURNING tokens INTO available;
+
+    IF available >= cost THEN
+        UPDATE "RateLimitBuckets" SET tokens = available - cost WHERE key = bucket_key;
+        RETURN 0;
+    END IF;
+    RETURN (cost - available) / refill_per_second;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION rate_limit_take(text, double precision, double precision, double precision) FROM PUBLIC, anon, authenticated;
+
+-- Purge des seaux inactifs (pleins depuis longtemps), à planifier (pg_cron)
+-- ou lancer ponctuellement :
+--   DELETE FROM "RateLimitBuckets" WHERE updated_at < now() - interval '1 day';
@@ -0,0 +1,46 @@
+-- Changement de statut en masse (PUT /api/projects/status) : une seule
+-- requête UPDATE pour tout le lot au lieu d'un appel par projet.
+
+-- `changes` : tableau JSON [{"projectId": "...", "status": "..."}] déjà validé
+-- par l'API (ids uniques, statuts connus). Retourne une ligne par projet
+-- trouvé, avec son statut précédent et `changed` à false s'il avait déjà le
+-- statut demandé (ligne non réécrite). Les projets absents n'apparaissent pas.
+CREATE OR REPLACE FUNCTION admin_set_project_statuses(
+    changes    jsonb,
+    updated_on date DEFAULT current_date
+)
+RETURNS TABLE (
+    id              uuid,
+    previous_status text,
+    status          text,
+    changed         boolean
+)
+LANGUAGE sql
+AS $$
+    WITH wanted AS (
+        SELECT c."projectId"::uuid AS id, c.status
+        FROM jsonb_to_recordset(changes) AS c("projectId" text, status text)
+    ),
+    locked AS (
+        -- Verrou des lignes : statut précédent cohérent avec la mise à jour
+        SELECT p.id, p.status AS previous_status, w.status
+        FROM "Projects" p
+        JOIN wanted w ON w.id = p.id
+        FOR UPDATE OF p
+    ),
+    updated AS (
+        UPDATE "Projects" p
+        SET status = l.status,
+            "updatedAt" = updated_on
+        FROM locked l
+        WHERE p.id = l.id
+          AND p.status IS DISTINCT FROM l.status
+        RETURNING p.id
+    )
+    SELECT l.id, l.previous_status, l.status, u.id IS NOT NULL
+    FROM locked l
+    LEFT JOIN updated u ON u.id = l.id;
+$$;
+
+-- Réservée au backend (service role)
+REVOKE EXECUTE ON FUNCTION admin_set_project_statuses(jsonb, date) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,42 @@
+-- Réconciliation Stripe (python -m app.jobs.stripe_reconcile) : rattrape les
+-- paiements dont le webhook a été manqué, pour que /cart/order-status et
+-- /projects/{id}/verify-payment répondent depuis la base seule.
+
+-- Point de reprise des tâches planifiées (une ligne par tâche).
+-- Table réservée au backend (service role) : RLS activé sans policy.
+CREATE TABLE IF NOT EXISTS "JobWatermarks" (
+    name       text        PRIMARY KEY,
+    value      timestamptz NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE "JobWatermarks" ENABLE ROW LEVEL SECURITY;
+
+-- Suivi d'une commande au retour de Stripe (polling de /cart/order-status)
+CREATE INDEX IF NOT EXISTS orders_stripe_session_id_idx
+    ON "Orders" (stripe_session_id);
+
+-- Passe à « payé » les projets d'un lot de paiements confirmés
+-- ([{"projectId": "...", "payment_intent": "..."}]), en une requête. Seuls les
+-- projets encore en attente de paiement sont modifiés : un projet déjà payé
+-- ou plus avancé (en cours, terminé) n'est jamais ramené en arrière.
+-- Retourne les ids des projets modifiés.
+CREATE OR REPLACE FUNCTION reconcile_project_payments(
+    payments   jsonb,
+    updated_on date DEFAULT current_date
+)
+RETURNS TABLE (id uuid)
+LANGUAGE sql
+AS $$
+    UPDATE "Projects" p
+    SET status = 'payé',
+        stripe_invoice_id = x.payment_intent,
+        "updatedAt" = updated_on
+    FROM jsonb_to_recordset(payments) AS x("projectId" text, payment_intent text)
+    WHERE p.id = x."projectId"::uuid
+      AND p.status IN ('devis_envoyé', 'paiement_attente')
+    RETURNING p.id;
+$$;
+
+-- Réservée au backend (service role)
+REVOKE EXECUTE ON FUNCTION reconcile_project_payments(jsonb, date) FROM PUBLIC, anon, authenticated;
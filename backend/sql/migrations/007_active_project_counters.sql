@@ -0,0 +1,122 @@
+-- Limite de projets actifs par client : compteur maintenu par trigger et
+-- création atomique (POST /api/projects, GET /api/projects/count).
+--
+-- Avant : un count(*) sur Projects à chaque appel, et une vérification puis
+-- une insertion séparées (deux soumissions simultanées pouvaient dépasser la
+-- limite). Le compteur est une ligne par client, lue par clé primaire ; la
+-- création verrouille cette ligne, ce qui sérialise les soumissions d'un même
+-- client.
+
+-- Statuts clos : ne comptent pas dans la limite (CLOSED_STATUSES côté API)
+CREATE OR REPLACE FUNCTION project_status_is_active(status text)
+RETURNS boolean
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT status IS NULL OR status NOT IN ('terminé', 'devis_refusé');
+$$;
+
+-- Table réservée au backend (service role) : RLS activé sans policy.
+CREATE TABLE IF NOT EXISTS "UserProjectCounters" (
+    user_id         uuid    PRIMARY KEY REFERENCES "Users" (id) ON DELETE CASCADE,
+    active_projects integer NOT NULL DEFAULT 0 CHECK (active_projects >= 0)
+);
+
+ALTER TABLE "UserProjectCounters" ENABLE ROW LEVEL SECURITY;
+
+-- Décrément : mise à jour seule (le compteur d'un client supprimé ne doit
+-- pas être recréé pendant la suppression en cascade de ses projets)
+CREATE OR REPLACE FUNCTION _bump_active_projects(owner uuid, delta integer)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF delta < 0 THEN
+        UPDATE "UserProjectCounters"
+        SET active_projects = greatest(active_projects + delta, 0)
+        WHERE user_id = owner;
+    ELSE
+        INSERT INTO "UserProjectCounters" AS c (user_id, active_projects)
+        VALUES (owner, delta)
+        ON CONFLICT (user_id) DO UPDATE
+            SET active_projects = c.active_projects + delta;
+    END IF;
+END;
+$$;
+
+-- Maintient le compteur à chaque insertion, suppression, changement de
+-- statut ou de propriétaire d'un projet (quelle que soit la route d'écriture :
+-- API, webhook, réconciliation, console Supabase).
+CREATE OR REPLACE FUNCTION _projects_active_counter()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE')
+       AND OLD."userId" IS NOT NULL AND project_status_is_active(OLD.status) THEN
+        PERFORM _bump_active_projects(OLD."userId", -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE')
+       AND NEW."userId" IS NOT NULL AND project_status_is_active(NEW.status) THEN
+        PERFORM _bump_active_projects(NEW."userId", 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+BEGIN;
+
+-- Aucune écriture sur Projects entre l'initialisation et la pose du trigger
+LOCK TABLE "Projects" IN SHARE ROW EXCLUSIVE MODE;
+
+INSERT INTO "UserProjectCounters" (user_id, active_projects)
+SELECT "userId", count(*) FILTER (WHERE project_status_is_active(status))
+FROM "Projects"
+WHERE "userId" IS NOT NULL
+GROUP BY "userId"
+ON CONFLICT (user_id) DO UPDATE SET active_projects = EXCLUDED.active_projects;
+
+DROP TRIGGER IF EXISTS projects_active_counter ON "Projects";
+CREATE TRIGGER projects_active_counter
+    AFTER INSERT OR DELETE OR UPDATE OF status, "userId" ON "Projects"
+    FOR EACH ROW EXECUTE FUNCTION _projects_active_counter();
+
+COMMIT;
+
+-- Crée le projet si son propriétaire a moins de `max_active` projets actifs.
+-- `project` : colonnes du projet (JSON, converties selon le type de la table).
+-- Retourne la ligne créée, ou aucune ligne si la limite est atteinte.
+CREATE OR REPLACE FUNCTION create_project_within_limit(project jsonb, max_active integer)
+RETURNS SETOF "Projects"
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    owner  uuid := (project ->> 'userId')::uuid;
+    active integer;
+BEGIN
+    INSERT INTO "UserProjectCounters" (user_id) VALUES (owner) ON CONFLICT (user_id) DO NOTHING;
+    -- Verrou de la ligne compteur : les créations simultanées du client attendent
+    SELECT active_projects INTO active FROM "UserProjectCounters" WHERE user_id = owner FOR UPDATE;
+    IF active >= max_active THEN
+        RETURN;
+    END IF;
+
+    -- Le trigger incrémente le compteur dans la même transaction
+    RETURN QUERY
+    WITH created AS (
+        INSERT INTO "Projects" (
+            title, "descriptionClient", "userId", format, "deadlineType", "deadlineDate", budget, status, created_at
+        )
+        SELECT
+            r.title, r."descriptionClient", r."userId", r.format, r."deadlineType", r."deadlineDate",
+            r.budget, r.status, r.created_at
+        FROM jsonb_populate_record(NULL::"Projects", project) AS r
+        RETURNING *
+    )
+    SELECT * FROM created;
+END;
+$$;
+
+-- Réservées au backend (service role)
+REVOKE EXECUTE ON FUNCTION create_project_within_limit(jsonb, integer) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION _bump_active_projects(uuid, integer) FROM PUBLIC, anon, authenticated;
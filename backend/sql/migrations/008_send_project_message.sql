@@ -0,0 +1,60 @@
+-- Envoi d'un message de discussion en un seul aller-retour
+-- (POST /api/projects/{id}/messages).
+--
+-- Avant : lecture du projet, lecture du rôle, insertion puis lecture du nom de
+-- l'expéditeur, soit quatre requêtes successives. La fonction vérifie l'accès
+-- (propriétaire ou admin), insère le message avec le rôle de l'expéditeur et
+-- renvoie la ligne créée avec l'embed Users(firstName, lastName) attendu par
+-- l'API.
+--
+-- Retourne {"status": "sent", "message": {...}}, ou {"status": "not_found"} /
+-- {"status": "forbidden"} sans rien insérer.
+CREATE OR REPLACE FUNCTION send_project_message(
+    project_id    uuid,
+    sender_id     uuid,
+    body          text        DEFAULT NULL,
+    file_path     text        DEFAULT NULL,
+    file_variants jsonb       DEFAULT NULL,
+    sent_at       timestamptz DEFAULT now()
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    owner   uuid;
+    sender  "Users"%ROWTYPE;
+    created "ProjectsMessages"%ROWTYPE;
+BEGIN
+    SELECT "userId" INTO owner FROM "Projects" WHERE id = project_id;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'not_found');
+    END IF;
+
+    SELECT * INTO sender FROM "Users" WHERE id = sender_id;
+    IF owner IS DISTINCT FROM sender_id AND sender.role IS DISTINCT FROM 'admin' THEN
+        RETURN jsonb_build_object('status', 'forbidden');
+    END IF;
+
+    INSERT INTO "ProjectsMessages" ("projectId", "senderId", sender_role, content, "fileUrl", variants, created_at)
+    VALUES (
+        project_id,
+        sender_id,
+        CASE WHEN sender.role = 'admin' THEN 'admin' ELSE 'client' END,
+        body,
+        file_path,
+        file_variants,
+        sent_at
+    )
+    RETURNING * INTO created;
+
+    RETURN jsonb_build_object(
+        'status', 'sent',
+        'message', to_jsonb(created) || jsonb_build_object(
+            'Users', jsonb_build_object('firstName', sender."firstName", 'lastName', sender."lastName")
+        )
+    );
+END;
+$$;
+
+-- Réservée au backend (service role) : l'expéditeur est fourni par l'API
+REVOKE EXECUTE ON FUNCTION send_project_message(uuid, uuid, text, text, jsonb, timestamptz) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,86 @@
+-- Résumé de la discussion de chaque projet pour les listes (GET /api/projects) :
+-- dernier message, rôle de son expéditeur et messages non lus de chaque côté
+-- (client propriétaire, équipe admin).
+--
+-- Avant : afficher l'activité de la messagerie dans une liste demandait de
+-- relire l'historique ProjectsMessages de chaque projet. Le résumé est une
+-- ligne par projet tenue à jour par trigger, embarquée dans la requête de liste.
+
+-- Table réservée au backend (service role) : RLS activé sans policy.
+CREATE TABLE IF NOT EXISTS "ProjectChatSummaries" (
+    project_id       uuid        PRIMARY KEY REFERENCES "Projects" (id) ON DELETE CASCADE,
+    message_count    integer     NOT NULL DEFAULT 0,
+    last_message_at  timestamptz,
+    last_sender_role text,
+    unread_by_client integer     NOT NULL DEFAULT 0 CHECK (unread_by_client >= 0),
+    unread_by_admin  integer     NOT NULL DEFAULT 0 CHECK (unread_by_admin >= 0)
+);
+
+ALTER TABLE "ProjectChatSummaries" ENABLE ROW LEVEL SECURITY;
+
+-- Nouveau message : non lu pour l'autre côté ; l'expéditeur a forcément lu
+-- la discussion, son compteur repart à zéro.
+CREATE OR REPLACE FUNCTION _project_chat_summary()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    from_admin boolean := NEW.sender_role = 'admin';
+BEGIN
+    INSERT INTO "ProjectChatSummaries" AS s (
+        project_id, message_count, last_message_at, last_sender_role, unread_by_client, unread_by_admin
+    )
+    VALUES (
+        NEW."projectId"::uuid, 1, NEW.created_at, NEW.sender_role,
+        CASE WHEN from_admin THEN 1 ELSE 0 END,
+        CASE WHEN from_admin THEN 0 ELSE 1 END
+    )
+    ON CONFLICT (project_id) DO UPDATE SET
+        message_count    = s.message_count + 1,
+        last_message_at  = greatest(s.last_message_at, EXCLUDED.last_message_at),
+        last_sender_role = CASE
+            WHEN s.last_message_at > EXCLUDED.last_message_at THEN s.last_sender_role
+            ELSE EXCLUDED.last_sender_role
+        END,
+        unread_by_client = CASE WHEN from_admin THEN s.unread_by_client + 1 ELSE 0 END,
+        unread_by_admin  = CASE WHEN from_admin THEN 0 ELSE s.unread_by_admin + 1 END;
+    RETURN NULL;
+END;
+$$;
+
+BEGIN;
+
+-- Aucun message envoyé entre l'initialisation et la pose du trigger
+LOCK TABLE "ProjectsMessages" IN SHARE ROW EXCLUSIVE MODE;
+
+-- Historique existant considéré comme lu (pas de vague de non-lus au déploiement)
+INSERT INTO "ProjectChatSummaries" (project_id, message_count, last_message_at, last_sender_role)
+SELECT DISTINCT ON ("projectId")
+    "projectId"::uuid,
+    count(*) OVER (PARTITION BY "projectId"),
+    created_at,
+    sender_role
+FROM "ProjectsMessages"
+ORDER BY "projectId", created_at DESC
+ON CONFLICT (project_id) DO NOTHING;
+
+DROP TRIGGER IF EXISTS projects_messages_chat_summary ON "ProjectsMessages";
+CREATE TRIGGER projects_messages_chat_summary
+    AFTER INSERT ON "ProjectsMessages"
+    FOR EACH ROW EXECUTE FUNCTION _project_chat_summary();
+
+COMMIT;
+
+-- Discussion lue par un côté ('client' ou 'admin') : remet son compteur à zéro
+CREATE OR REPLACE FUNCTION mark_project_chat_read(project_id uuid, reader_role text)
+RETURNS void
+LANGUAGE sql
+AS $$
+    UPDATE "ProjectChatSummaries" s
+    SET unread_by_client = CASE WHEN reader_role = 'client' THEN 0 ELSE s.unread_by_client END,
+        unread_by_admin  = CASE WHEN reader_role = 'admin' THEN 0 ELSE s.unread_by_admin END
+    WHERE s.project_id = mark_project_chat_read.project_id;
+$$;
+
+-- Réservée au backend (service role)
+REVOKE EXECUTE ON FUNCTION mark_project_chat_read(uuid, text) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,221 @@
+-- Statistiques de ventes pour le tableau de bord admin (GET /api/admin/stats) :
+-- agrégats journaliers tenus à jour à l'écriture.
+--
+-- Avant : chaque question de chiffre d'affaires parcourait Orders.amount_paid
+-- et Projects.price des projets payés, un coût qui grandit avec l'historique.
+-- Les triggers ci-dessous mettent à jour les agrégats à chaque écriture, quelle
+-- qu'en soit la source (webhook Stripe, réconciliation, changement de statut,
+-- console Supabase) ; la lecture ne dépend que de la période demandée.
+--
+-- Les jours sont ceux du fuseau de la base (UTC sur Supabase).
+
+-- Tables réservées au backend (service role) : RLS activé sans policy.
+CREATE TABLE IF NOT EXISTS "DailySales" (
+    day             date          PRIMARY KEY,
+    order_count     integer       NOT NULL DEFAULT 0,
+    order_revenue   numeric(12,2) NOT NULL DEFAULT 0,
+    projects_paid   integer       NOT NULL DEFAULT 0,
+    project_revenue numeric(12,2) NOT NULL DEFAULT 0
+);
+
+-- Pas de clé étrangère vers Products : l'historique survit au retrait d'un produit
+CREATE TABLE IF NOT EXISTS "DailyProductSales" (
+    day         date          NOT NULL,
+    product_id  uuid          NOT NULL,
+    order_count integer       NOT NULL DEFAULT 0,
+    revenue     numeric(12,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, product_id)
+);
+
+-- Entonnoir : nombre actuel de projets par statut
+CREATE TABLE IF NOT EXISTS "ProjectStatusCounts" (
+    status   text    PRIMARY KEY,
+    projects integer NOT NULL DEFAULT 0
+);
+
+ALTER TABLE "DailySales" ENABLE ROW LEVEL SECURITY;
+ALTER TABLE "DailyProductSales" ENABLE ROW LEVEL SECURITY;
+ALTER TABLE "ProjectStatusCounts" ENABLE ROW LEVEL SECURITY;
+
+-- Statuts d'un projet payé (le paiement reste acquis pendant la réalisation)
+CREATE OR REPLACE FUNCTION project_status_is_paid(status text)
+RETURNS boolean
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT status IN ('payé', 'en cours', 'terminé');
+$$;
+
+-- Ajoute (sign = 1) ou retire (sign = -1) une commande des agrégats.
+-- Seules les commandes abouties (status 'completed') comptent.
+CREATE OR REPLACE FUNCTION _bump_order_sales(order_row "Orders", sign integer)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    order_day date := order_row.created_at::date;
+    amount    numeric := sign * coalesce(order_row.amount_paid, 0);
+BEGIN
+    IF order_row.status IS DISTINCT FROM 'completed' THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO "DailySales" AS d (day, order_count, order_revenue)
+    VALUES (order_day, sign, amount)
+    ON CONFLICT (day) DO UPDATE SET
+        order_count   = d.order_count + EXCLUDED.order_count,
+        order_revenue = d.order_revenue + EXCLUDED.order_revenue;
+
+    IF order_row.product_id IS NOT NULL THEN
+        INSERT INTO "DailyProductSales" AS p (day, product_id, order_count, revenue)
+        VALUES (order_day, order_row.product_id::uuid, sign, amount)
+        ON CONFLICT (day, product_id) DO UPDATE SET
+            order_count = p.order_count + EXCLUDED.order_count,
+            revenue     = p.revenue + EXCLUDED.revenue;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION _orders_sales_aggregates()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM _bump_order_sales(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM _bump_order_sales(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Entonnoir par statut, et chiffre d'affaires des projets au jour du paiement
+-- (entrée dans les statuts payés). Un projet qui sort des statuts payés
+-- (correction, remboursement) est retiré le jour de la sortie ; un projet
+-- supprimé reste dans l'historique des ventes.
+CREATE OR REPLACE FUNCTION _projects_sales_aggregates()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    was_paid boolean := TG_OP = 'UPDATE' AND project_status_is_paid(OLD.status);
+    is_paid  boolean := TG_OP <> 'DELETE' AND project_status_is_paid(NEW.status);
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.status IS NOT DISTINCT FROM NEW.status THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status IS NOT NULL THEN
+        UPDATE "ProjectStatusCounts" SET projects = projects - 1 WHERE status = OLD.status;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IS NOT NULL THEN
+        INSERT INTO "ProjectStatusCounts" AS c (status, projects)
+        VALUES (NEW.status, 1)
+        ON CONFLICT (status) DO UPDATE SET projects = c.projects + 1;
+    END IF;
+
+    IF is_paid AND NOT was_paid THEN
+        INSERT INTO "DailySales" AS d (day, projects_paid, project_revenue)
+        VALUES (current_date, 1, coalesce(NEW.price, 0))
+        ON CONFLICT (day) DO UPDATE SET
+            projects_paid   = d.projects_paid + 1,
+            project_revenue = d.project_revenue + EXCLUDED.project_revenue;
+    ELSIF was_paid AND NOT is_paid THEN
+        INSERT INTO "DailySales" AS d (day, projects_paid, project_revenue)
+        VALUES (current_date, -1, -coalesce(OLD.price, 0))
+        ON CONFLICT (day) DO UPDATE SET
+            projects_paid   = d.projects_paid - 1,
+            project_revenue = d.project_revenue + EXCLUDED.project_revenue;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+BEGIN;
+
+-- Aucune écriture entre l'initialisation des agrégats et la pose des triggers
+LOCK TABLE "Orders", "Projects" IN SHARE ROW EXCLUSIVE MODE;
+
+DELETE FROM "DailySales";
+DELETE FROM "DailyProductSales";
+DELETE FROM "ProjectStatusCounts";
+
+INSERT INTO "DailySales" (day, order_count, order_revenue)
+SELECT created_at::date, count(*), coalesce(sum(amount_paid), 0)
+FROM "Orders"
+WHERE status = 'completed'
+GROUP BY 1;
+
+INSERT INTO "DailyProductSales" (day, product_id, order_count, revenue)
+SELECT created_at::date, product_id::uuid, count(*), coalesce(sum(amount_paid), 0)
+FROM "Orders"
+WHERE status = 'completed' AND product_id IS NOT NULL
+GROUP BY 1, 2;
+
+-- Jour de paiement inconnu pour l'historique : dernière mise à jour du projet
+INSERT INTO "DailySales" AS d (day, projects_paid, project_revenue)
+SELECT coalesce("updatedAt"::date, created_at::date), count(*), coalesce(sum(price), 0)
+FROM "Projects"
+WHERE project_status_is_paid(status)
+GROUP BY 1
+ON CONFLICT (day) DO UPDATE SET
+    projects_paid   = d.projects_paid + EXCLUDED.projects_paid,
+    project_revenue = d.project_revenue + EXCLUDED.project_revenue;
+
+INSERT INTO "ProjectStatusCounts" (status, projects)
+SELECT status, count(*)
+FROM "Projects"
+WHERE status IS NOT NULL
+GROUP BY status;
+
+DROP TRIGGER IF EXISTS orders_sales_aggregates ON "Orders";
+CREATE TRIGGER orders_sales_aggregates
+    AFTER INSERT OR DELETE OR UPDATE OF status, amount_paid, product_id, created_at ON "Orders"
+    FOR EACH ROW EXECUTE FUNCTION _orders_sales_aggregates();
+
+DROP TRIGGER IF EXISTS projects_sales_aggregates ON "Projects";
+CREATE TRIGGER projects_sales_aggregates
+    AFTER INSERT OR DELETE OR UPDATE OF status ON "Projects"
+    FOR EACH ROW EXECUTE FUNCTION _projects_sales_aggregates();
+
+COMMIT;
+
+-- Tableau de bord : agrégats journaliers depuis `since`, meilleurs produits de
+-- la période (chiffre d'affaires) et entonnoir actuel des projets, en une requête.
+CREATE OR REPLACE FUNCTION admin_sales_stats(since date, top_n integer DEFAULT 5)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'daily', coalesce((
+            SELECT jsonb_agg(to_jsonb(d) ORDER BY d.day)
+            FROM "DailySales" d
+            WHERE d.day >= since
+        ), '[]'::jsonb),
+        'top_products', coalesce((
+            SELECT jsonb_agg(to_jsonb(t) ORDER BY t.revenue DESC, t.order_count DESC)
+            FROM (
+                SELECT s.product_id, p.title, sum(s.order_count) AS order_count, sum(s.revenue) AS revenue
+                FROM "DailyProductSales" s
+                LEFT JOIN "Products" p ON p.id = s.product_id
+                WHERE s.day >= since
+                GROUP BY s.product_id, p.title
+                HAVING sum(s.order_count) > 0
+                ORDER BY sum(s.revenue) DESC, sum(s.order_count) DESC
+                LIMIT top_n
+            ) t
+        ), '[]'::jsonb),
+        'funnel', coalesce((
+            SELECT jsonb_object_agg(c.status, c.projects)
+            FROM "ProjectStatusCounts" c
+            WHERE c.projects > 0
+        ), '{}'::jsonb)
+    );
+$$;
+
+-- Réservées au backend (service role)
+REVOKE EXECUTE ON FUNCTION admin_sales_stats(date, integer) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION _bump_order_sales("Orders", integer) FROM PUBLIC, anon, authenticated;
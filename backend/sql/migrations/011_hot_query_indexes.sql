@@ -0,0 +1,33 @@
+-- Index des filtres les plus fréquents de l'API (plans comparés avant / après
+-- par python -m benchmarks.index_bench).
+--
+-- Déjà couverts par ailleurs : Orders(stripe_session_id) (migration 006),
+-- Projects("userId", status) (migration 003), Orders(client_id, product_id)
+-- (contrainte d'unicité des upserts de commandes).
+--
+-- Sur une base déjà volumineuse, exécuter chaque CREATE INDEX avec
+-- CONCURRENTLY, hors transaction, pour ne pas bloquer les écritures.
+
+-- Achats aboutis d'un client : /products/{id}/purchased, /cart/purchased-ids,
+-- contrôle du panier avant checkout. Partiel : seules les commandes
+-- 'completed' sont lues, et product_id dans l'index évite la lecture de la table.
+CREATE INDEX IF NOT EXISTS orders_client_completed_idx
+    ON "Orders" (client_id, product_id)
+    WHERE status = 'completed';
+
+-- Liste des projets d'un client, plus récents d'abord (GET /projects)
+CREATE INDEX IF NOT EXISTS projects_user_id_created_at_idx
+    ON "Projects" ("userId", created_at DESC);
+
+-- Liste admin de tous les projets, plus récents d'abord (GET /projects)
+CREATE INDEX IF NOT EXISTS projects_created_at_idx
+    ON "Projects" (created_at DESC);
+
+-- Fichiers d'un projet (détail, vue d'ensemble, archive des livrables)
+CREATE INDEX IF NOT EXISTS projects_images_project_id_idx
+    ON "ProjectsImages" ("projectId");
+
+-- Discussion d'un projet dans l'ordre chronologique (/messages), et derniers
+-- messages de la vue d'ensemble (même index parcouru à l'envers)
+CREATE INDEX IF NOT EXISTS projects_messages_project_id_created_at_idx
+    ON "ProjectsMessages" ("projectId", created_at);
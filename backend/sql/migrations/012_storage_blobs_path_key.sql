@@ -0,0 +1,11 @@
+-- Déduplication par (bucket, chemin) au lieu de (bucket, empreinte).
+--
+-- Le chemin (cas/ab/abcd...ef.stl) contient l'empreinte et l'extension : un
+-- même contenu envoyé sous deux extensions donne deux objets, chacun stocké
+-- avec le type de contenu de son premier envoi, au lieu de réutiliser
+-- l'extension et le type du tout premier uploader.
+--
+-- Les lignes existantes restent valides : (bucket, sha256) unique implique
+-- (bucket, path) unique.
+ALTER TABLE "StorageBlobs" DROP CONSTRAINT IF EXISTS "StorageBlobs_pkey";
+ALTER TABLE "StorageBlobs" ADD PRIMARY KEY (bucket, path);
@@ -0,0 +1,10 @@
+-- Dernière réutilisation d'un objet adressé par contenu.
+--
+-- Un upload identique réutilise l'objet existant sans le réécrire : son
+-- created_at côté storage ne bouge pas. Le ramasse-miettes applique donc son
+-- délai de grâce à last_used_at (mis à jour à chaque réutilisation, avant
+-- l'insertion de la ligne qui référence l'objet) et non à l'âge de l'objet.
+-- Les lignes existantes partent de now() : aucune suppression avant un délai
+-- de grâce complet après la migration.
+ALTER TABLE "StorageBlobs"
+    ADD COLUMN IF NOT EXISTS last_used_at timestamptz NOT NULL DEFAULT now();
@@ -0,0 +1,49 @@
+-- Consommation atomique de plusieurs seaux (utilisateur + IP) en un appel.
+--
+-- Avec rate_limit_take (migration 004), le seau utilisateur était débité
+-- avant la vérification du seau IP : une requête refusée par l'IP coûtait
+-- quand même des jetons à l'utilisateur. Ici, `cost` n'est retiré de chaque
+-- seau que si tous en ont assez ; sinon rien n'est consommé et la fonction
+-- retourne l'attente (s) du seau le plus en retard. Un aller-retour au lieu
+-- de deux.
+CREATE OR REPLACE FUNCTION rate_limit_take_all(
+    bucket_keys       text[],
+    capacities        double precision[],
+    cost              double precision,
+    refill_per_second double precision
+)
+RETURNS double precision
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    wait      double precision := 0;
+    available double precision;
+    i         bigint;
+BEGIN
+    -- Seaux créés pleins, remplissage appliqué. Les verrous de ligne sont pris
+    -- dans l'ordre des clés : pas d'interblocage entre appels concurrents.
+    FOR i IN
+        SELECT k.ord FROM unnest(bucket_keys) WITH ORDINALITY AS k(key, ord) ORDER BY k.key
+    LOOP
+        INSERT INTO "RateLimitBuckets" AS b (key, tokens, updated_at)
+        VALUES (bucket_keys[i], capacities[i], clock_timestamp())
+        ON CONFLICT (key) DO UPDATE
+            SET tokens = least(
+                    EXCLUDED.tokens,
+                    b.tokens + extract(epoch FROM clock_timestamp() - b.updated_at) * refill_per_second
+                ),
+                updated_at = clock_timestamp()
+        RETURNING tokens INTO available;
+
+        wait := greatest(wait, (cost - available) / refill_per_second);
+    END LOOP;
+
+    IF wait > 0 THEN
+        RETURN wait;
+    END IF;
+    UPDATE "RateLimitBuckets" SET tokens = tokens - cost WHERE key = ANY (bucket_keys);
+    RETURN 0;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION rate_limit_take_all(text[], double precision[], double precision, double precision) FROM PUBLIC, anon, authenticated;
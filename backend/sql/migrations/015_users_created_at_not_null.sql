@@ -0,0 +1,21 @@
+-- "createdAt" obligatoire : l'annuaire admin (admin_list_users, migration 003)
+-- pagine sur ("createdAt", id). Une ligne à NULL produisait un curseur
+-- "None|<id>" refusé par l'API (400) et la comparaison de lignes avec NULL
+-- n'est jamais vraie : la pagination s'arrêtait à ces utilisateurs.
+--
+-- Rattrapage depuis la date de création du compte Supabase Auth (même id),
+-- à défaut l'heure de la migration.
+UPDATE "Users" u
+SET "createdAt" = coalesce(a.created_at, now())
+FROM auth.users a
+WHERE u."createdAt" IS NULL
+  AND a.id = u.id;
+
+UPDATE "Users"
+SET "createdAt" = now()
+WHERE "createdAt" IS NULL;
+
+-- Profils insérés sans date (hors POST /users) : date du jour
+ALTER TABLE "Users"
+    ALTER COLUMN "createdAt" SET DEFAULT now(),
+    ALTER COLUMN "createdAt" SET NOT NULL;
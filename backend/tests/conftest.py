@@ -0,0 +1,19 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.round_trips import pytest_runtest_call  # noqa: F401  (plugin budget d'allers-retours)
+
+
+import pytest
+
+from app.rate_limit import get_backend
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Seaux de limitation de débit vidés entre les tests (état en mémoire partagé)."""
+    get_backend().reset()
+    yield
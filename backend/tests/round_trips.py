@@ -0,0 +1,56 @@
+"""
+Plugin pytest : budget d'allers-retours amont des endpoints.
+
+Les endpoints déclarent leur budget avec `@round_trip_budget(n)`
+(app.request_trace). Pendant chaque test, un dépassement constaté à la sortie
+du handler fait échouer le test avec le détail des appels.
+
+Pour que les appels soient comptés avec des clients mockés, utiliser
+`UpstreamMock` à la place de MagicMock pour supabase_admin (chaque
+`.execute()` et chaque appel Storage compte) et pour les fonctions de
+stripe_service patchées (chaque appel direct compte).
+"""
+from unittest.mock import MagicMock
+import pytest
+
+from app.request_trace import add_budget_listener, record_call, remove_budget_listener
+
+# Méthodes qui correspondent à un aller-retour réseau
+ROUND_TRIP_METHODS = {
+    "execute",
+    "upload",
+    "remove",
+    "list",
+    "download",
+    "create_signed_url",
+    "create_signed_urls",
+}
+
+
+class UpstreamMock(MagicMock):
+    """MagicMock dont les appels réseau sont ajoutés à la trace de la requête."""
+
+    def _execute_mock_call(self, *args, **kwargs):
+        name = self._mock_name
+        is_root = self._mock_parent is None and self._mock_new_parent is None
+        if name in ROUND_TRIP_METHODS or is_root:
+            record_call("mock", name or "call", 0.0)
+        return super()._execute_mock_call(*args, **kwargs)
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    violations = []
+
+    def on_exceeded(endpoint, budget, calls):
+        operations = ", ".join(operation for _, operation, _ in calls)
+        violations.append(f"{endpoint}: {len(calls)} appel(s) amont pour un budget de {budget} ({operations})")
+
+    add_budget_listener(on_exceeded)
+    try:
+        result = yield
+    finally:
+        remove_budget_listener(on_exceeded)
+    if violations:
+        pytest.fail("Budget d'allers-retours dépassé\n" + "\n".join(violations), pytrace=False)
+    return result
@@ -2,8 +2,10 @@ import unittest
 from unittest.mock import MagicMock, patch, AsyncMock
 from fastapi import HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials
+import jwt
 import sys
 import os
+import time
 
 # Add backend to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -60,3 +62,22 @@ class TestAuthUnit(BaseAsyncTestCase):
             await get_current_user(credentials)
 
         self.assertEqual(cm.exception.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @patch("app.dependencies.supabase")
+    async def test_local_hs256_checks_audience(self, mock_supabase):
+        """Secret JWT présent → token 'authenticated' validé localement, autre audience renvoyée à Supabase Auth"""
+        secret = "jwt-secret-" + "x" * 32
+        claims = {"sub": "user123", "exp": int(time.time()) + 3600}
+        session = jwt.encode({**claims, "aud": "authenticated"}, secret, algorithm="HS256")
+        other = jwt.encode({**claims, "aud": "anon"}, secret, algorithm="HS256")
+        mock_supabase.auth.get_user.return_value = MagicMock(user=None)
+
+        with patch.dict(os.environ, {"SUPABASE_JWT_SECRET": secret}):
+            user = await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=session))
+            mock_supabase.auth.get_user.assert_not_called()
+            with self.assertRaises(HTTPException) as cm:
+                await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=other))
+
+        self.assertEqual(user.id, "user123")
+        self.assertEqual(cm.exception.status_code, status.HTTP_401_UNAUTHORIZED)
+        mock_supabase.auth.get_user.assert_called_once_with(other)
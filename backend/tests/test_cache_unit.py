@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import json
+import time
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app.services.cache import WarmCache, warm_up
+from app.dependencies import _decode_with_jwks, is_cached_admin
+from tests.base_test import BaseAsyncTestCase
+
+
+class TestCacheUnit(BaseAsyncTestCase):
+    """Tests unitaires des caches préchauffés"""
+
+    async def test_inactive_cache_calls_loader(self):
+        """Caches non démarrés (tests, jobs) → chargeur appelé à chaque accès"""
+        loader = MagicMock(return_value=["a"])
+        cache = WarmCache("test", loader, 60)
+
+        cache.get()
+        cache.get()
+
+        self.assertEqual(loader.call_count, 2)
+        self.assertIsNone(cache.peek())
+
+    async def test_active_cache_serves_and_invalidates(self):
+        """Caches actifs → valeur servie depuis la mémoire, rechargée après invalidation"""
+        loader = MagicMock(side_effect=[["v1"], ["v2"]])
+        cache = WarmCache("test", loader, 60)
+
+        with patch.dict("app.services.cache._state", {"active": True}):
+            self.assertEqual(cache.get(), ["v1"])
+            self.assertEqual(cache.get(), ["v1"])
+            cache.invalidate()
+            self.assertEqual(cache.get(), ["v2"])
+
+        self.assertEqual(loader.call_count, 2)
+
+    async def test_warm_up_reports_failures(self):
+        """Préchauffage avec un chargeur en échec → False, les autres caches chargés"""
+        ok = WarmCache("ok", lambda: {"x": 1}, 60)
+        broken = WarmCache("broken", MagicMock(side_effect=ConnectionError("DB down")), 60)
+
+        with patch.dict("app.services.cache._registry", {"ok": ok, "broken": broken}, clear=True):
+            result = await warm_up()
+
+        self.assertFalse(result)
+        self.assertIsNotNone(ok.age)
+        self.assertIsNone(broken.age)
+
+    async def test_cached_admin_shortcut(self):
+        """Ensemble des admins en cache → raccourci, repli en base sinon"""
+        with patch.dict("app.services.cache._state", {"active": True}), patch(
+            "app.dependencies.admin_ids_cache", WarmCache("admin_ids", lambda: frozenset({"admin1"}), 60)
+        ) as cache:
+            self.assertFalse(is_cached_admin("admin1"))  # cache froid
+            cache.refresh()
+            self.assertTrue(is_cached_admin("admin1"))
+            self.assertFalse(is_cached_admin("user1"))
+
+    async def test_jwks_local_validation(self):
+        """JWT ES256 signé par une clé du JWKS en cache → utilisateur sans appel à Supabase Auth"""
+        private_key = ec.generate_private_key(ec.SECP256R1())
+        public_jwk = json.loads(jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key()))
+        public_jwk.update(kid="key-1", alg="ES256")
+        keys = {"key-1": jwt.PyJWK(public_jwk)}
+
+        def sign(**claims):
+            payload = {"sub": "user123", "email": "a@b.fr", "user_metadata": {},
+                       "aud": "authenticated", "exp": int(time.time()) + 3600, **claims}
+            payload = {k: v for k, v in payload.items() if v is not None}
+            return jwt.encode(payload, private_key, algorithm="ES256", headers={"kid": "key-1"})
+
+        token = sign()
+        with patch.dict("app.services.cache._state", {"active": True}), patch(
+            "app.dependencies.jwks_cache", WarmCache("jwks", lambda: keys, 60)
+        ) as cache:
+            cache.refresh()
+            user = _decode_with_jwks(token)
+            unknown = _decode_with_jwks(token.replace(token.split(".")[2], "x"))
+            # Mêmes contrôles que la validation HS256 : audience, expiration, sujet
+            rejected = [
+                _decode_with_jwks(sign(aud="anon")),
+                _decode_with_jwks(sign(aud=None)),
+                _decode_with_jwks(sign(exp=int(time.time()) - 60)),
+                _decode_with_jwks(sign(sub=None)),
+            ]
+
+        self.assertEqual(user.id, "user123")
+        self.assertIsNone(unknown)
+        self.assertEqual(rejected, [None, None, None, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
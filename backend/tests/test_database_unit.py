@@ -0,0 +1,53 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import LazyClient
+from tests.base_test import BaseTestCase
+
+
+class TestDatabaseUnit(BaseTestCase):
+    """Tests unitaires des clients Supabase paresseux"""
+
+    def test_client_built_on_first_use_only(self):
+        """Proxy paresseux → client construit au premier accès, une seule fois"""
+        factory = MagicMock()
+        client = LazyClient("test", factory)
+
+        self.assertFalse(client.initialized)
+        factory.assert_not_called()
+
+        client.table("Users")
+        client.table("Projects")
+
+        factory.assert_called_once()
+        self.assertEqual(factory.return_value.table.call_count, 2)
+
+    def test_close_releases_sessions(self):
+        """close() → sessions HTTP fermées, client reconstruit au prochain usage"""
+        built = MagicMock()
+        client = LazyClient("test", lambda: built)
+        client.get()
+
+        client.close()
+
+        built._postgrest.session.close.assert_called_once()
+        built._storage.session.close.assert_called_once()
+        self.assertFalse(client.initialized)
+
+    def test_private_attributes_not_delegated(self):
+        """Attributs privés → AttributeError sans construire le client"""
+        factory = MagicMock()
+        client = LazyClient("test", factory)
+
+        with self.assertRaises(AttributeError):
+            client._something
+        factory.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
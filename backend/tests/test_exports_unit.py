@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi import HTTPException
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.routers.exports import export_dataset
+from app.services.table_export import encode_export, keyset_pages
+from tests.base_test import BaseAsyncTestCase
+
+
+def make_table_client(rows):
+    """
+    Client Supabase mocké servant `rows` (triées par id) comme PostgREST :
+    order("id"), limit(n) et gt("id", dernier) appliqués à la lecture.
+    """
+    client = MagicMock()
+    client.reads = []
+
+    def table(name):
+        state = {"after": None, "limit": None}
+        query = MagicMock()
+        query.select.return_value = query
+        query.order.return_value = query
+
+        def limit(n):
+            state["limit"] = n
+            return query
+
+        def gt(column, value):
+            state["after"] = value
+            return query
+
+        def execute():
+            client.reads.append(state["after"])
+            selected = [r for r in rows if state["after"] is None or r["id"] > state["after"]]
+            return MagicMock(data=selected[: state["limit"]])
+
+        query.limit.side_effect = limit
+        query.gt.side_effect = gt
+        query.execute.side_effect = execute
+        return query
+
+    client.table.side_effect = table
+    return client
+
+
+async def read_body(response) -> bytes:
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+class TestExportsUnit(BaseAsyncTestCase):
+    """Tests unitaires des exports admin en streaming"""
+
+    def setUp(self):
+        super().setUp()
+        self.mock_user = MagicMock()
+        self.mock_user.id = "admin1"
+        self.rows = [
+            {"id": f"{i:04d}", "createdAt": f"2026-01-{i % 28 + 1:02d}T10:00:00+00:00", "email": f"u{i}@test.fr",
+             "firstName": "Jean", "lastName": "Dupont", "role": "user"}
+            for i in range(7)
+        ]
+
+    def test_keyset_pages_follow_last_id(self):
+        """Pages de 3 → reprise après le dernier id de chaque page, arrêt sur page incomplète"""
+        client = make_table_client(self.rows)
+
+        pages = list(keyset_pages(client, "Users", ["id", "email"], page_size=3))
+
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+        self.assertEqual(client.reads, [None, "0002", "0005"])
+
+    def test_keyset_pages_are_lazy(self):
+        """Générateur : une page n'est lue que lorsque la précédente a été consommée"""
+        client = make_table_client(self.rows)
+
+        pages = keyset_pages(client, "Users", ["id"], page_size=3)
+        next(pages)
+
+        self.assertEqual(client.reads, [None])
+
+    def test_csv_neutralizes_formulas_and_chunks(self):
+        """CSV → en-tête, valeurs vides pour None, formules préfixées, blocs regroupés"""
+        pages = [[
+            {"id": "1", "title": "=HYPERLINK(\"http://x\")", "amount": -12.5, "status": None},
+            {"id": "2", "title": "Support, mural", "amount": 3, "status": "payé"},
+        ]]
+
+        chunks = list(encode_export(pages, ["id", "title", "amount", "status"], "csv", chunk_size=1024))
+
+        self.assertEqual(len(chunks), 1)
+        rows = list(csv.reader(io.StringIO(chunks[0].decode("utf-8"))))
+        self.assertEqual(rows[0], ["id", "title", "amount", "status"])
+        self.assertEqual(rows[1], ["1", "'=HYPERLINK(\"http://x\")", "-12.5", ""])
+        self.assertEqual(rows[2], ["2", "Support, mural", "3", "payé"])
+
+    async def test_export_users_ndjson_streams_all_pages(self):
+        """Admin, format ndjson → une ligne JSON par utilisateur, colonnes exportées seulement"""
+        rows = [{**r, "secret": "x"} for r in self.rows]
+        client = make_table_client(rows)
+
+        with patch("app.routers.exports.supabase_admin", client), \
+                patch("app.routers.exports.check_admin"), \
+                patch("app.routers.exports.keyset_pages",
+                      lambda c, t, cols: keyset_pages(c, t, cols, page_size=3)):
+            response = await export_dataset("users", format="ndjson", current_user=self.mock_user)
+            # Seule la première page est lue avant l'envoi
+            self.assertEqual(client.reads, [None])
+            body = await read_body(response)
+
+        self.assertEqual(response.media_type, "application/x-ndjson")
+        self.assertIn('attachment; filename="modelify-users-', response.headers["content-disposition"])
+        lines = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+        self.assertEqual([line["id"] for line in lines], [r["id"] for r in self.rows])
+        self.assertNotIn("secret", lines[0])
+        self.assertEqual(len(client.reads), 3)
+
+    async def test_export_rejects_unknown_dataset_format_and_non_admin(self):
+        """Jeu inconnu → 404, format inconnu → 400, non-admin → 403"""
+        with self.assertRaises(HTTPException) as ctx:
+            await export_dataset("secrets", format="csv", current_user=self.mock_user)
+        self.assertEqual(ctx.exception.status_code, 404)
+
+        with self.assertRaises(HTTPException) as ctx:
+            await export_dataset("orders", format="xlsx", current_user=self.mock_user)
+        self.assertEqual(ctx.exception.status_code, 400)
+
+        forbidden = HTTPException(status_code=403, detail="Accès administrateur requis")
+        with patch("app.routers.exports.check_admin", side_effect=forbidden):
+            with self.assertRaises(HTTPException) as ctx:
+                await export_dataset("orders", format="csv", current_user=self.mock_user)
+        self.assertEqual(ctx.exception.status_code, 403)
+
+    async def test_export_database_down_before_streaming(self):
+        """Base indisponible à la première page → 500 (pas de fichier vide)"""
+        client = MagicMock()
+        client.table.return_value.select.return_value.order.return_value.limit.return_value.execute.side_effect = (
+            Exception("connexion refusée")
+        )
+
+        with patch("app.routers.exports.supabase_admin", client), patch("app.routers.exports.check_admin"):
+            with self.assertRaises(HTTPException) as ctx:
+                await export_dataset("projects", format="csv", current_user=self.mock_user)
+
+        self.assertEqual(ctx.exception.status_code, 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import threading
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from app.services.health import HealthProber
+from tests.base_test import BaseAsyncTestCase
+
+
+def failing_check():
+    raise ConnectionError("connexion refusée")
+
+
+class TestHealthUnit(BaseAsyncTestCase):
+    """Tests unitaires de la sonde de santé"""
+
+    async def test_probe_records_status_and_latency(self):
+        """Vérifications OK / en échec → statut, latence et erreur par dépendance"""
+        prober = HealthProber({"database": lambda: None, "stripe": failing_check}, critical=("database",))
+
+        await prober.probe_all()
+        snapshot = prober.snapshot()
+
+        self.assertEqual(snapshot["database"]["status"], "up")
+        self.assertIsNotNone(snapshot["database"]["latency_ms"])
+        self.assertEqual(snapshot["stripe"]["status"], "down")
+        self.assertIn("connexion refusée", snapshot["stripe"]["error"])
+        # Stripe n'est pas critique : l'API reste prête
+        self.assertTrue(prober.is_ready(snapshot))
+
+    async def test_probe_timeout_does_not_pile_up(self):
+        """Dépendance bloquée → timeout, puis pas de nouveau thread tant qu'elle ne répond pas"""
+        release = threading.Event()
+        calls = []
+
+        def hanging_check():
+            calls.append(1)
+            release.wait(5)
+
+        prober = HealthProber({"database": hanging_check}, critical=("database",), timeout=0.05)
+        try:
+            await prober.probe_all()
+            await prober.probe_all()
+        finally:
+            release.set()
+
+        snapshot = prober.snapshot()
+        self.assertEqual(snapshot["database"]["status"], "down")
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(prober.is_ready(snapshot))
+
+    async def test_ready_endpoint_uses_cached_results(self):
+        """/health/ready → résultats en cache, 503 si la base est indisponible, /health/live constant"""
+        prober = HealthProber({"database": failing_check, "storage": lambda: None}, critical=("database",))
+        await prober.probe_all()
+        client = TestClient(app)
+
+        with patch("main.health_prober", prober), patch("main.supabase_admin") as mock_supabase:
+            ready = client.get("/health/ready")
+            live = client.get("/health/live")
+
+        mock_supabase.table.assert_not_called()
+        self.assertEqual(ready.status_code, 503)
+        self.assertEqual(ready.json()["status"], "unavailable")
+        self.assertEqual(ready.json()["dependencies"]["storage"]["status"], "up")
+        self.assertEqual(live.json(), {"status": "alive"})
+
+
+if __name__ == "__main__":
+    unittest.main()
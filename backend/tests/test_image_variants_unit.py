@@ -0,0 +1,151 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import io
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from app.services.image_variants import (
+    render_variants,
+    store_image_variants,
+    sign_batch,
+    sign_with_variants,
+    variant_path,
+    VARIANT_SIZES,
+)
+from app.routers.messages import _serialize_message
+from tests.base_test import BaseAsyncTestCase
+
+
+def make_jpeg_with_exif(width=2000, height=1000) -> bytes:
+    """JPEG avec orientation EXIF (rotation 90°) et un champ d'identification."""
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation
+    exif[0x010F] = "Canon"  # Make
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, "JPEG", exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+class TestImageVariantsUnit(BaseAsyncTestCase):
+    """Tests unitaires des variantes d'images (miniature / taille moyenne)"""
+
+    def test_render_variants_webp_without_exif(self):
+        """Rendu → WebP redimensionnés, orientation appliquée, EXIF supprimé"""
+        variants = render_variants(make_jpeg_with_exif())
+
+        self.assertEqual(set(variants), set(VARIANT_SIZES))
+        for name, data in variants.items():
+            with Image.open(io.BytesIO(data)) as img:
+                self.assertEqual(img.format, "WEBP")
+                # Image portrait après application de l'orientation EXIF
+                self.assertEqual(img.size[1], VARIANT_SIZES[name])
+                self.assertLess(img.size[0], img.size[1])
+                self.assertEqual(dict(img.getexif()), {})
+
+    def test_variant_path(self):
+        """Chemin de variante → à côté de l'original, extension .webp"""
+        self.assertEqual(
+            variant_path("messages/proj1/123_photo.png", "thumb"),
+            "messages/proj1/123_photo_thumb.webp",
+        )
+
+    async def test_store_variants_skips_non_images(self):
+        """Contenu non décodable → aucune variante, aucun upload"""
+        bucket = MagicMock()
+
+        result = await store_image_variants(bucket, "proj1/1_doc.png", b"not-an-image")
+
+        self.assertIsNone(result)
+        bucket.upload.assert_not_called()
+
+    async def test_store_variants_uploads_each_variant(self):
+        """Image valide → une variante WebP uploadée par taille"""
+        bucket = MagicMock()
+        rendered = {"thumb": b"t", "medium": b"m"}
+
+        with patch(
+            "app.services.image_variants.generate_variants", return_value=rendered
+        ):
+            result = await store_image_variants(bucket, "proj1/1_photo.jpg", b"...")
+
+        self.assertEqual(
+            result,
+            {"thumb": "proj1/1_photo_thumb.webp", "medium": "proj1/1_photo_medium.webp"},
+        )
+        self.assertEqual(bucket.upload.call_count, 2)
+        self.assertEqual(bucket.upload.call_args[0][2], {"content-type": "image/webp"})
+
+    def test_sign_with_variants_single_call(self):
+        """Original + variantes → signés en un seul appel storage"""
+        bucket = MagicMock()
+        bucket.create_signed_urls.return_value = [
+            {"path": "a.png", "signedURL": "https://signed/a", "error": None},
+            {"path": "a_thumb.webp", "signedURL": "https://signed/t", "error": None},
+        ]
+
+        url, variants = sign_with_variants(bucket, "a.png", {"thumb": "a_thumb.webp"})
+
+        self.assertEqual(url, "https://signed/a")
+        self.assertEqual(variants, {"thumb": "https://signed/t"})
+        bucket.create_signed_urls.assert_called_once()
+        bucket.create_signed_url.assert_not_called()
+
+    def test_sign_batch_deduplicates_paths(self):
+        """Plusieurs éléments (dont un fichier partagé) → un seul appel, ordre conservé"""
+        bucket = MagicMock()
+        bucket.create_signed_urls.side_effect = lambda paths, ttl: [
+            {"path": p, "signedURL": f"https://signed/{p}", "error": None} for p in paths
+        ]
+
+        result = sign_batch(bucket, [
+            ("a.png", {"thumb": "a_thumb.webp"}),
+            (None, None),
+            ("a.png", None),
+        ])
+
+        self.assertEqual(result, [
+            ("https://signed/a.png", {"thumb": "https://signed/a_thumb.webp"}),
+            (None, {}),
+            ("https://signed/a.png", {}),
+        ])
+        bucket.create_signed_urls.assert_called_once_with(["a.png", "a_thumb.webp"], 3600)
+
+    def test_sign_batch_failure_keeps_paths(self):
+        """Échec storage → chemins bruts, variantes omises"""
+        bucket = MagicMock()
+        bucket.create_signed_urls.side_effect = Exception("storage down")
+
+        self.assertEqual(sign_batch(bucket, [("a.png", {"thumb": "a_thumb.webp"})]), [("a.png", {})])
+
+    def test_serialize_message_with_variants(self):
+        """Message avec variantes → URLs signées exposées dans 'variants'"""
+        mock_admin = MagicMock()
+        mock_admin.storage.from_.return_value.create_signed_urls.return_value = [
+            {"path": "m/1.png", "signedURL": "https://signed/orig", "error": None},
+            {"path": "m/1_thumb.webp", "signedURL": "https://signed/thumb", "error": None},
+            {"path": "m/1_medium.webp", "signedURL": "https://signed/medium", "error": None},
+        ]
+        msg = {
+            "id": "msg1",
+            "fileUrl": "m/1.png",
+            "variants": {"thumb": "m/1_thumb.webp", "medium": "m/1_medium.webp"},
+            "Users": {"firstName": "Jean", "lastName": "Dupont"},
+        }
+
+        with patch("app.routers.messages.supabase_admin", mock_admin):
+            result = _serialize_message(msg)
+
+        self.assertEqual(result["fileUrl"], "https://signed/orig")
+        self.assertEqual(
+            result["variants"],
+            {"thumb": "https://signed/thumb", "medium": "https://signed/medium"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -46,23 +46,15 @@ class TestIntegration(BaseTestCase):
 
         def table_side_effect(table_name):
             mock_t = MagicMock()
-            if table_name == "Projects":
-                # Mock pour l'insertion
-                mock_t.insert.return_value.execute.return_value.data = [{"id": 123}]
-
-                # Mock pour le count (select -> eq -> neq -> execute)
-                mock_select_chain = MagicMock()
-                mock_t.select.return_value = mock_select_chain
-                mock_select_chain.eq.return_value = mock_select_chain
-                mock_select_chain.not_.in_.return_value = mock_select_chain
-
-                mock_count_result = MagicMock()
-                mock_count_result.count = 0
-                mock_select_chain.execute.return_value = mock_count_result
+            if table_name == "StorageBlobs":
+                # Contenu encore jamais stocké : pas de déduplication
+                mock_t.update.return_value.eq.return_value.eq.return_value.execute.return_value.data = []
 
             return mock_t
 
         mock_supabase_admin.table.side_effect = table_side_effect
+        # Limite non atteinte : la RPC crée le projet
+        mock_supabase_admin.rpc.return_value.execute.return_value.data = [{"id": 123}]
 
         # L'upload storage passe par le même client admin
         mock_storage_response = MagicMock()
@@ -84,7 +76,7 @@ class TestIntegration(BaseTestCase):
         self.assertEqual(json_resp["message"], "Demande de projet créée avec succès")
         self.assertEqual(json_resp["projectId"], 123)
 
-        mock_supabase_admin.table.assert_any_call("Projects")
+        mock_supabase_admin.rpc.assert_called_once()
         mock_supabase_admin.storage.from_.assert_called_with("project-images")
         mock_supabase_admin.table.assert_called_with("ProjectsImages")
 
@@ -109,7 +101,7 @@ class TestIntegration(BaseTestCase):
     def test_create_project_db_error(self, mock_supabase):
         """Erreur DB → HTTP 500"""
         # On simule une exception lors de l'appel à la base
-        mock_supabase.table.side_effect = Exception(
+        mock_supabase.rpc.side_effect = Exception(
             "Erreur de connexion Supabase simulée"
         )
 
@@ -171,6 +163,43 @@ class TestIntegration(BaseTestCase):
         self.assertIn("limit", json_resp)
         self.assertIn("total_pages", json_resp)
 
+    @patch("app.routers.projects.supabase_admin")
+    def test_get_all_projects_chat_summary(self, mock_supabase):
+        """GET /api/projects → résumé de discussion embarqué, non-lus du côté du lecteur"""
+        mock_users = MagicMock()
+        mock_users.select.return_value.eq.return_value.single.return_value.execute.return_value.data = {"role": "user"}
+        mock_projects = MagicMock()
+        mock_projects.select.return_value.eq.return_value.execute.return_value.count = 2
+        mock_projects.select.return_value.eq.return_value.order.return_value.range.return_value.execute.return_value.data = [
+            {
+                "id": 1,
+                "title": "Avec discussion",
+                "ProjectChatSummaries": {
+                    "message_count": 3,
+                    "last_message_at": "2026-07-08T10:00:00+00:00",
+                    "last_sender_role": "admin",
+                    "unread_by_client": 2,
+                    "unread_by_admin": 0,
+                },
+            },
+            {"id": 2, "title": "Sans message", "ProjectChatSummaries": None},
+        ]
+        mock_supabase.table.side_effect = lambda name: mock_users if name == "Users" else mock_projects
+
+        response = self.client.get("/api/projects")
+
+        self.assertEqual(response.status_code, 200)
+        first, second = response.json()["projects"]
+        self.assertEqual(first["chat"], {
+            "messageCount": 3,
+            "lastMessageAt": "2026-07-08T10:00:00+00:00",
+            "lastSenderRole": "admin",
+            "unread": 2,
+        })
+        self.assertNotIn("ProjectChatSummaries", first)
+        self.assertEqual(second["chat"]["unread"], 0)
+        self.assertIn("ProjectChatSummaries(", mock_projects.select.call_args[0][0])
+
     @patch("app.routers.projects.supabase_admin")
     def test_get_project_detail(self, mock_supabase_admin):
         """GET /api/projects/:id → détails projet"""
@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from app.dependencies import get_current_user
+from app.routers.legal import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, legal_cache
+from tests.base_test import BaseTestCase
+
+
+def _documents(cgv_version=3):
+    return [
+        {"slug": "cgu", "title": "CGU", "content": "…", "version": 1},
+        {"slug": "cgv", "title": "CGV", "content": "…", "version": cgv_version},
+    ]
+
+
+class TestLegalUnit(BaseTestCase):
+    """Tests unitaires des documents légaux (ETag, 304, URLs versionnées)"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = TestClient(app)
+        patcher = patch("app.routers.legal.supabase")
+        self.mock_supabase = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_supabase.table.return_value.select.return_value.order.return_value.execute.return_value.data = _documents()
+
+    def test_list_has_etag_and_revalidates(self):
+        """GET /legal → ETag + no-cache ; If-None-Match identique → 304 sans corps"""
+        first = self.client.get("/api/legal")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers["cache-control"], REVALIDATE_CACHE_CONTROL)
+        self.assertEqual(len(first.json()), 2)
+
+        second = self.client.get("/api/legal", headers={"If-None-Match": first.headers["etag"]})
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+        self.assertEqual(second.headers["etag"], first.headers["etag"])
+
+    def test_list_etag_changes_with_version(self):
+        """Version d'un document incrémentée → nouvel ETag, 200 avec le contenu à jour"""
+        etag = self.client.get("/api/legal").headers["etag"]
+        self.mock_supabase.table.return_value.select.return_value.order.return_value.execute.return_value.data = _documents(4)
+
+        response = self.client.get("/api/legal", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], etag)
+
+    def test_slug_versioned_url_is_immutable(self):
+        """GET /legal/{slug}?v=<version courante> → Cache-Control immuable"""
+        response = self.client.get("/api/legal/cgv?v=3")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["slug"], "cgv")
+        self.assertEqual(response.headers["cache-control"], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response.headers["etag"], '"legal-cgv-v3"')
+
+    def test_slug_without_version_revalidates(self):
+        """GET /legal/{slug} sans version → no-cache ; ETag faible (compression) → 304"""
+        response = self.client.get("/api/legal/cgu", headers={"If-None-Match": 'W/"legal-cgu-v1"'})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["cache-control"], REVALIDATE_CACHE_CONTROL)
+
+    def test_slug_unknown(self):
+        """Slug inconnu → 404"""
+        response = self.client.get("/api/legal/inconnu")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_newer_version_requested_keeps_cache(self):
+        """Version demandée plus récente que le cache → ni invalidation ni lecture en base, réponse non immuable"""
+        with patch.object(legal_cache, "invalidate") as mock_invalidate:
+            response = self.client.get("/api/legal/cgv?v=999999")
+
+        mock_invalidate.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["version"], 3)
+        self.assertEqual(response.headers["cache-control"], REVALIDATE_CACHE_CONTROL)
+
+    def test_versions_manifest(self):
+        """GET /legal/versions → {slug: version} revalidé par ETag, nouvel ETag à chaque version"""
+        first = self.client.get("/api/legal/versions")
+
+        self.assertEqual(first.json(), {"cgu": 1, "cgv": 3})
+        self.assertEqual(first.headers["cache-control"], REVALIDATE_CACHE_CONTROL)
+        self.assertEqual(
+            self.client.get("/api/legal/versions", headers={"If-None-Match": first.headers["etag"]}).status_code,
+            304,
+        )
+
+        self.mock_supabase.table.return_value.select.return_value.order.return_value.execute.return_value.data = _documents(4)
+        updated = self.client.get("/api/legal/versions", headers={"If-None-Match": first.headers["etag"]})
+
+        self.assertEqual(updated.status_code, 200)
+        self.assertEqual(updated.json()["cgv"], 4)
+
+    @patch("app.routers.legal.supabase_admin")
+    def test_update_invalidates_cache(self, mock_admin):
+        """PUT /legal/{slug} → version incrémentée et cache invalidé"""
+        user = MagicMock()
+        user.id = "admin_id"
+        app.dependency_overrides[get_current_user] = lambda: user
+        self.addCleanup(app.dependency_overrides.clear)
+        mock_admin.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value.data = {
+            "role": "admin",
+            "version": 3,
+        }
+        mock_admin.table.return_value.update.return_value.eq.return_value.execute.return_value.data = [
+            {"slug": "cgv", "version": 4}
+        ]
+
+        with patch.object(legal_cache, "invalidate") as mock_invalidate:
+            response = self.client.put("/api/legal/cgv", json={"title": "CGV", "content": "nouveau"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_admin.table.return_value.update.call_args[0][0]["version"], 4)
+        mock_invalidate.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
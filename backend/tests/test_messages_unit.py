@@ -7,41 +7,56 @@ import os
 # Add backend to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.routers.messages import get_project_messages, send_project_message
+from app.routers.messages import (
+    get_project_messages,
+    get_project_overview,
+    send_project_message,
+    OVERVIEW_MESSAGE_LIMIT,
+)
 from tests.base_test import BaseAsyncTestCase
+from tests.round_trips import UpstreamMock
 
 
-def make_supabase_admin(project=None, role="user", messages=None, inserted=None):
+def make_supabase_admin(project=None, role="user", messages=None, inserted=None, send_status=None):
     """
     Construit un mock de supabase_admin routé par nom de table :
-    Projects (accès projet), Users (rôle + nom expéditeur), ProjectsMessages.
+    Projects (accès projet), Users (rôle + nom expéditeur), ProjectsMessages,
+    StorageBlobs (déduplication des uploads). La RPC send_project_message
+    renvoie `inserted` avec l'embed Users, ou `send_status` (not_found...).
     """
-    mock_admin = MagicMock()
-
-    projects_table = MagicMock()
+    mock_admin = UpstreamMock()
+    if inserted:
+        sent = {**inserted, "Users": {"firstName": "Jean", "lastName": "Dupont"}}
+        mock_admin.rpc.return_value.execute.return_value.data = {"status": "sent", "message": sent}
+    else:
+        mock_admin.rpc.return_value.execute.return_value.data = {"status": send_status or "not_found"}
+
+    projects_table = UpstreamMock()
     projects_table.select.return_value.eq.return_value.execute.return_value.data = (
         [project] if project else []
     )
 
-    users_table = MagicMock()
+    users_table = UpstreamMock()
     users_table.select.return_value.eq.return_value.single.return_value.execute.return_value.data = {
         "role": role,
         "firstName": "Jean",
         "lastName": "Dupont",
     }
 
-    messages_table = MagicMock()
+    messages_table = UpstreamMock()
     messages_table.select.return_value.eq.return_value.order.return_value.execute.return_value.data = (
         messages or []
     )
-    messages_table.insert.return_value.execute.return_value.data = (
-        [inserted] if inserted else []
-    )
+
+    # Stockage adressé par contenu : aucune image déjà connue
+    blobs_table = UpstreamMock()
+    blobs_table.update.return_value.eq.return_value.eq.return_value.execute.return_value.data = []
 
     tables = {
         "Projects": projects_table,
         "Users": users_table,
         "ProjectsMessages": messages_table,
+        "StorageBlobs": blobs_table,
     }
     mock_admin.table.side_effect = lambda name: tables[name]
     mock_admin.storage.from_.return_value.create_signed_url.return_value = {
@@ -82,6 +97,25 @@ class TestMessagesUnit(BaseAsyncTestCase):
         self.assertEqual(result["messages"][0]["senderName"], "Jean Dupont")
         self.assertEqual(result["messages"][0]["content"], "Bonjour")
 
+    async def test_get_messages_marks_chat_read(self):
+        """Non-lus côté client → remis à zéro à l'ouverture ; aucun non-lu → pas d'écriture"""
+        for unread, expected_calls in ((3, 1), (0, 0)):
+            project = {
+                "id": "proj1",
+                "userId": "user123",
+                "ProjectChatSummaries": {"unread_by_client": unread, "unread_by_admin": 5},
+            }
+            mock_admin, _ = make_supabase_admin(project=project)
+
+            with patch("app.routers.messages.supabase_admin", mock_admin):
+                await get_project_messages("proj1", current_user=self.mock_user)
+
+            self.assertEqual(mock_admin.rpc.call_count, expected_calls)
+            if expected_calls:
+                mock_admin.rpc.assert_called_with(
+                    "mark_project_chat_read", {"project_id": "proj1", "reader_role": "client"}
+                )
+
     async def test_get_messages_project_not_found(self):
         """Projet inexistant → 404"""
         mock_admin, _ = make_supabase_admin(project=None)
@@ -103,6 +137,97 @@ class TestMessagesUnit(BaseAsyncTestCase):
 
         self.assertEqual(ctx.exception.status_code, 403)
 
+    def _overview_admin(self, project, role="user"):
+        """supabase_admin pour la vue d'ensemble : projet embarqué + signature en lot."""
+        mock_admin, _ = make_supabase_admin(role=role)
+        projects_table = UpstreamMock()
+        query = projects_table.select.return_value.eq.return_value.order.return_value.limit.return_value
+        query.execute.return_value.data = [project] if project else []
+        tables = {"Projects": projects_table, "Users": mock_admin.table("Users")}
+        mock_admin.table.side_effect = lambda name: tables[name]
+        mock_admin.table.reset_mock()
+        mock_admin.storage.from_.return_value.create_signed_urls.side_effect = lambda paths, ttl: [
+            {"path": p, "signedURL": f"https://signed/{p}", "error": None} for p in paths
+        ]
+        return mock_admin, projects_table
+
+    async def test_overview_single_query_and_single_signing_call(self):
+        """Propriétaire → projet, images et messages en une requête, fichiers signés en un appel"""
+        project = {
+            "id": "proj1",
+            "userId": "user123",
+            "ProjectsImages": [{"id": "img1", "fileUrl": "proj1/ref.png", "variants": {"thumb": "proj1/ref_thumb.webp"}}],
+            # Embed trié du plus récent au plus ancien
+            "ProjectsMessages": [
+                {"id": "m2", "content": None, "fileUrl": "cas/ab.png", "variants": None,
+                 "Users": {"firstName": "Admin", "lastName": ""}},
+                {"id": "m1", "content": "Bonjour", "fileUrl": None, "variants": None,
+                 "Users": {"firstName": "Jean", "lastName": "Dupont"}},
+            ],
+        }
+        mock_admin, projects_table = self._overview_admin(project)
+
+        with patch("app.routers.messages.supabase_admin", mock_admin), \
+                patch("app.routers.messages.is_cached_admin", return_value=False):
+            result = await get_project_overview("proj1", current_user=self.mock_user)
+
+        self.assertEqual(result["viewerRole"], "client")
+        self.assertFalse(result["hasMoreMessages"])
+        self.assertEqual([m["id"] for m in result["messages"]], ["m1", "m2"])
+        self.assertEqual(result["messages"][0]["senderName"], "Jean Dupont")
+        self.assertEqual(result["messages"][1]["fileUrl"], "https://signed/cas/ab.png")
+        image = result["project"]["images"][0]
+        self.assertEqual(image["fileUrl"], "https://signed/proj1/ref.png")
+        self.assertEqual(image["variants"], {"thumb": "https://signed/proj1/ref_thumb.webp"})
+        self.assertNotIn("ProjectsMessages", result["project"])
+        # Une seule requête base (Users non consulté) et un seul appel storage
+        self.assertEqual([c[0][0] for c in mock_admin.table.call_args_list], ["Projects"])
+        mock_admin.storage.from_.return_value.create_signed_urls.assert_called_once()
+        mock_admin.storage.from_.return_value.create_signed_url.assert_not_called()
+        order = projects_table.select.return_value.eq.return_value.order
+        self.assertEqual(order.call_args[1], {"desc": True, "foreign_table": "ProjectsMessages"})
+
+    async def test_overview_truncates_to_latest_page(self):
+        """Plus de OVERVIEW_MESSAGE_LIMIT messages → dernière page seulement, hasMoreMessages"""
+        recent = [
+            {"id": f"m{i}", "content": "x", "fileUrl": None, "Users": None}
+            for i in range(OVERVIEW_MESSAGE_LIMIT + 1, 0, -1)
+        ]
+        mock_admin, _ = self._overview_admin({"id": "proj1", "userId": "user123", "ProjectsMessages": recent})
+
+        with patch("app.routers.messages.supabase_admin", mock_admin), \
+                patch("app.routers.messages.is_cached_admin", return_value=False):
+            result = await get_project_overview("proj1", current_user=self.mock_user)
+
+        self.assertTrue(result["hasMoreMessages"])
+        self.assertEqual(len(result["messages"]), OVERVIEW_MESSAGE_LIMIT)
+        self.assertEqual(result["messages"][-1]["id"], f"m{OVERVIEW_MESSAGE_LIMIT + 1}")
+        self.assertEqual(result["project"]["images"], [])
+
+    async def test_overview_admin_from_cache(self):
+        """Admin en cache, projet d'un autre client → accès sans requête de rôle"""
+        mock_admin, _ = self._overview_admin({"id": "proj1", "userId": "someone-else"})
+
+        with patch("app.routers.messages.supabase_admin", mock_admin), \
+                patch("app.routers.messages.is_cached_admin", return_value=True):
+            result = await get_project_overview("proj1", current_user=self.mock_user)
+
+        self.assertEqual(result["viewerRole"], "admin")
+        self.assertEqual(result["messages"], [])
+        self.assertEqual(result["project"]["chat"]["unread"], 0)
+        mock_admin.rpc.assert_not_called()
+        self.assertEqual([c[0][0] for c in mock_admin.table.call_args_list], ["Projects"])
+
+    async def test_overview_forbidden_and_not_found(self):
+        """Ni propriétaire ni admin → 403 ; projet inexistant → 404"""
+        for project, status in (({"id": "proj1", "userId": "someone-else"}, 403), (None, 404)):
+            mock_admin, _ = self._overview_admin(project, role="user")
+            with patch("app.routers.messages.supabase_admin", mock_admin), \
+                    patch("app.routers.messages.is_cached_admin", return_value=False):
+                with self.assertRaises(HTTPException) as ctx:
+                    await get_project_overview("proj1", current_user=self.mock_user)
+            self.assertEqual(ctx.exception.status_code, status)
+
     async def test_send_message_empty(self):
         """Message sans texte ni image → 400"""
         mock_admin, _ = make_supabase_admin(project=self.project)
@@ -136,35 +261,49 @@ class TestMessagesUnit(BaseAsyncTestCase):
             )
 
         self.assertEqual(result["message"], "Message envoyé")
-        insert_arg = messages_table.insert.call_args[0][0]
-        self.assertEqual(insert_arg["sender_role"], "client")
-        self.assertEqual(insert_arg["content"], "Bonjour")
-        self.assertIsNone(insert_arg["fileUrl"])
-
-    async def test_send_message_admin_role(self):
-        """Admin non propriétaire → accès autorisé et sender_role 'admin'"""
-        project = {"id": "proj1", "userId": "someone-else"}
-        inserted = {
-            "id": "msg2",
-            "projectId": "proj1",
-            "senderId": "user123",
-            "sender_role": "admin",
-            "content": "Réponse admin",
-            "fileUrl": None,
-            "created_at": "2026-07-08T10:05:00+00:00",
-        }
-        mock_admin, messages_table = make_supabase_admin(
-            project=project, role="admin", inserted=inserted
-        )
+        self.assertEqual(result["data"]["senderName"], "Jean Dupont")
+        name, params = mock_admin.rpc.call_args[0]
+        self.assertEqual(name, "send_project_message")
+        self.assertEqual(params["project_id"], "proj1")
+        self.assertEqual(params["sender_id"], "user123")
+        self.assertEqual(params["body"], "Bonjour")
+        self.assertIsNone(params["file_path"])
+        # Un seul aller-retour : ni lecture du projet, ni du rôle, ni de l'expéditeur
+        mock_admin.table.assert_not_called()
+        messages_table.insert.assert_not_called()
+
+    async def test_send_message_access_refused_by_rpc(self):
+        """RPC : projet inexistant → 404, ni propriétaire ni admin → 403"""
+        for send_status, code in (("not_found", 404), ("forbidden", 403)):
+            mock_admin, _ = make_supabase_admin(send_status=send_status)
+
+            with patch("app.routers.messages.supabase_admin", mock_admin):
+                with self.assertRaises(HTTPException) as ctx:
+                    await send_project_message(
+                        "proj1", content="Bonjour", file=None, current_user=self.mock_user
+                    )
+
+            self.assertEqual(ctx.exception.status_code, code)
+
+    async def test_send_image_forbidden_before_upload(self):
+        """Image sur le projet d'un autre client (non admin) → 403 avant tout upload"""
+        mock_file = AsyncMock(spec=UploadFile)
+        mock_file.filename = "avancement.png"
+        mock_file.content_type = "image/png"
+        mock_file.read.return_value = b"fake-image-content"
+        mock_admin, _ = make_supabase_admin(project={"id": "proj1", "userId": "someone-else"}, role="user")
 
-        with patch("app.routers.messages.supabase_admin", mock_admin):
-            result = await send_project_message(
-                "proj1", content="Réponse admin", file=None, current_user=self.mock_user
-            )
+        with patch("app.routers.messages.supabase_admin", mock_admin), patch(
+            "app.routers.messages.validate_mime_type", return_value="image/png"
+        ), patch("app.routers.messages.is_cached_admin", return_value=False):
+            with self.assertRaises(HTTPException) as ctx:
+                await send_project_message(
+                    "proj1", content=None, file=mock_file, current_user=self.mock_user
+                )
 
-        self.assertEqual(result["message"], "Message envoyé")
-        insert_arg = messages_table.insert.call_args[0][0]
-        self.assertEqual(insert_arg["sender_role"], "admin")
+        self.assertEqual(ctx.exception.status_code, 403)
+        mock_admin.storage.from_.return_value.upload.assert_not_called()
+        mock_admin.rpc.assert_not_called()
 
     async def test_send_message_invalid_file_type(self):
         """Fichier non-image → 400, aucun upload"""
@@ -203,7 +342,7 @@ class TestMessagesUnit(BaseAsyncTestCase):
             "fileUrl": "messages/proj1/123_avancement.png",
             "created_at": "2026-07-08T10:10:00+00:00",
         }
-        mock_admin, messages_table = make_supabase_admin(
+        mock_admin, _ = make_supabase_admin(
             project=self.project, inserted=inserted
         )
 
@@ -219,8 +358,8 @@ class TestMessagesUnit(BaseAsyncTestCase):
 
         self.assertEqual(result["message"], "Message envoyé")
         mock_admin.storage.from_.return_value.upload.assert_called_once()
-        insert_arg = messages_table.insert.call_args[0][0]
-        self.assertTrue(insert_arg["fileUrl"].startswith("messages/proj1/"))
+        params = mock_admin.rpc.call_args[0][1]
+        self.assertTrue(params["file_path"].startswith("cas/"))
         # L'URL renvoyée au frontend est signée
         self.assertEqual(result["data"]["fileUrl"], "https://signed.example/img")
 
@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from app.metrics import (
+    Histogram,
+    InstrumentedClient,
+    UPSTREAM_CALLS,
+    UPSTREAM_LATENCY,
+    UPLOAD_BYTES,
+    REQUEST_LATENCY,
+    instrumented,
+)
+from tests.base_test import BaseTestCase
+
+
+class TestMetricsUnit(BaseTestCase):
+    """Tests unitaires des métriques Prometheus"""
+
+    def test_histogram_render_cumulative(self):
+        """Histogramme → buckets cumulés, somme et total"""
+        histogram = Histogram("test_duration_seconds", "test", ("route",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, "/a")
+        histogram.observe(0.5, "/a")
+        histogram.observe(5.0, "/a")
+
+        lines = histogram.render()
+
+        self.assertIn('test_duration_seconds_bucket{route="/a",le="0.1"} 1', lines)
+        self.assertIn('test_duration_seconds_bucket{route="/a",le="1.0"} 2', lines)
+        self.assertIn('test_duration_seconds_bucket{route="/a",le="+Inf"} 3', lines)
+        self.assertIn('test_duration_seconds_count{route="/a"} 3', lines)
+
+    def test_instrumented_client_tracks_queries_and_uploads(self):
+        """Client instrumenté → opération « Table.verbe », appels storage et octets uploadés"""
+        client = InstrumentedClient(MagicMock())
+        before_query = UPSTREAM_LATENCY.count("postgrest", "MetricsTest.select")
+        before_bytes = UPLOAD_BYTES.value("metrics-bucket")
+
+        client.table("MetricsTest").select("id").eq("id", 1).in_("status", []).execute()
+        client.storage.from_("metrics-bucket").upload("a/b.png", b"12345", {})
+
+        self.assertEqual(UPSTREAM_LATENCY.count("postgrest", "MetricsTest.select"), before_query + 1)
+        self.assertEqual(UPSTREAM_LATENCY.count("storage", "metrics-bucket.upload"), 1)
+        self.assertEqual(UPLOAD_BYTES.value("metrics-bucket"), before_bytes + 5)
+
+    def test_instrumented_decorator_counts_errors(self):
+        """Fonction instrumentée en échec → compteur outcome=error, exception propagée"""
+
+        @instrumented("stripe", "metrics_test_failure")
+        def failing():
+            raise RuntimeError("Stripe down")
+
+        with self.assertRaises(RuntimeError):
+            failing()
+
+        self.assertEqual(UPSTREAM_CALLS.value("stripe", "metrics_test_failure", "error"), 1)
+
+    @patch("app.routers.products.supabase")
+    def test_metrics_endpoint_uses_route_template(self, mock_supabase):
+        """GET /metrics → latence par gabarit de route, format Prometheus"""
+        mock_supabase.table.return_value.select.return_value.order.return_value.execute.return_value.data = []
+        client = TestClient(app)
+
+        client.get("/api/products")
+        response = client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/plain", response.headers["content-type"])
+        self.assertIn('route="/api/products"', response.text)
+        self.assertGreaterEqual(REQUEST_LATENCY.count("GET", "/api/products", "200"), 1)
+
+    def test_metrics_endpoint_token(self):
+        """METRICS_TOKEN défini → 401 sans le bon header"""
+        client = TestClient(app)
+        with patch.dict(os.environ, {"METRICS_TOKEN": "secret"}):
+            self.assertEqual(client.get("/metrics").status_code, 401)
+            response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+            self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,8 +13,11 @@ from app.routers.projects import (
     create_project_request,
     get_project_count,
     refuse_project_quote,
+    update_project_statuses,
 )
+from app.schemas.projects import BulkProjectStatusUpdate
 from tests.base_test import BaseAsyncTestCase
+from tests.round_trips import UpstreamMock
 
 
 class TestProjectsUnit(BaseAsyncTestCase):
@@ -28,16 +31,24 @@ class TestProjectsUnit(BaseAsyncTestCase):
     async def test_get_project_count(self):
         """Compteur projets actifs → retourne count et limite"""
         with patch("app.routers.projects.supabase_admin") as mock_supabase:
-            mock_count_response = MagicMock()
-            mock_count_response.count = 1
-            mock_supabase.table.return_value.select.return_value.eq.return_value.not_.in_.return_value.execute.return_value = (
-                mock_count_response
-            )
+            mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [
+                {"active_projects": 1}
+            ]
 
             result = await get_project_count(current_user=self.mock_user)
 
             self.assertEqual(result, {"active_projects": 1, "limit": 2})
-            mock_supabase.table.assert_called_with("Projects")
+            mock_supabase.table.assert_called_with("UserProjectCounters")
+            mock_supabase.table.return_value.select.return_value.eq.assert_called_with("user_id", "user123")
+
+    async def test_get_project_count_without_counter(self):
+        """Client sans compteur (aucun projet créé) → 0 projet actif"""
+        with patch("app.routers.projects.supabase_admin") as mock_supabase:
+            mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = []
+
+            result = await get_project_count(current_user=self.mock_user)
+
+            self.assertEqual(result["active_projects"], 0)
 
     def test_sanitize_filename(self):
         """Noms fichiers → nettoyage caractères spéciaux"""
@@ -75,18 +86,11 @@ class TestProjectsUnit(BaseAsyncTestCase):
         mock_file.content_type = "image/png"
         mock_file.read.return_value = b"fake-image-content"
 
-        # Mock active projects count (0 projects)
-        mock_count_response = MagicMock()
-        mock_count_response.count = 0
-        mock_supabase_admin.table.return_value.select.return_value.eq.return_value.not_.in_.return_value.execute.return_value = (
-            mock_count_response
-        )
+        # Limite non atteinte : la RPC crée le projet
+        mock_supabase_admin.rpc.return_value.execute.return_value.data = [{"id": "proj123"}]
 
-        mock_insert_response = MagicMock()
-        mock_insert_response.data = [{"id": "proj123"}]
-        mock_supabase_admin.table.return_value.insert.return_value.execute.return_value = (
-            mock_insert_response
-        )
+        # Contenu jamais stocké : pas de déduplication
+        mock_supabase_admin.table.return_value.update.return_value.eq.return_value.eq.return_value.execute.return_value.data = []
 
         # Upload storage et insert ProjectsImages passent par le client admin
         mock_supabase_admin.storage.from_.return_value.upload.return_value = {
@@ -112,18 +116,8 @@ class TestProjectsUnit(BaseAsyncTestCase):
         mock_file.content_type = "application/x-msdownload"
         mock_file.read.return_value = b"MZ..."
 
-        # Mock active projects count (0 projects)
-        mock_count_response = MagicMock()
-        mock_count_response.count = 0
-        mock_supabase_admin.table.return_value.select.return_value.eq.return_value.not_.in_.return_value.execute.return_value = (
-            mock_count_response
-        )
-
-        mock_insert_response = MagicMock()
-        mock_insert_response.data = [{"id": "proj123"}]
-        mock_supabase_admin.table.return_value.insert.return_value.execute.return_value = (
-            mock_insert_response
-        )
+        # Limite non atteinte : la RPC crée le projet
+        mock_supabase_admin.rpc.return_value.execute.return_value.data = [{"id": "proj123"}]
 
         result = await create_project_request(
             title="Test Project",
@@ -138,12 +132,8 @@ class TestProjectsUnit(BaseAsyncTestCase):
     @patch("app.routers.projects.supabase_admin")
     async def test_create_project_limit_reached(self, mock_supabase):
         """Limite 2 projets atteinte → HTTP 400"""
-        # Mock active projects count >= 2
-        mock_count_response = MagicMock()
-        mock_count_response.count = 2
-        mock_supabase.table.return_value.select.return_value.eq.return_value.not_.in_.return_value.execute.return_value = (
-            mock_count_response
-        )
+        # Limite atteinte : la RPC ne crée rien
+        mock_supabase.rpc.return_value.execute.return_value.data = []
 
         with self.assertRaises(HTTPException) as cm:
             await create_project_request(
@@ -155,6 +145,12 @@ class TestProjectsUnit(BaseAsyncTestCase):
 
         self.assertEqual(cm.exception.status_code, 400)
         self.assertIn("Limite de projets atteinte", cm.exception.detail)
+        name, params = mock_supabase.rpc.call_args[0]
+        self.assertEqual(name, "create_project_within_limit")
+        self.assertEqual(params["max_active"], 2)
+        self.assertEqual(params["project"]["userId"], "user123")
+        self.assertEqual(params["project"]["status"], "en attente")
+        mock_supabase.table.assert_not_called()
 
     def _mock_project_fetch(self, mock_supabase, project):
         """Configure le mock supabase pour retourner un projet donné"""
@@ -164,8 +160,8 @@ class TestProjectsUnit(BaseAsyncTestCase):
             mock_response
         )
 
-    @patch("app.routers.projects.cancel_quote")
-    @patch("app.routers.projects.supabase_admin")
+    @patch("app.routers.projects.cancel_quote", new_callable=UpstreamMock)
+    @patch("app.routers.projects.supabase_admin", new_callable=UpstreamMock)
     async def test_refuse_quote_success(self, mock_supabase_admin, mock_cancel_quote):
         """Client propriétaire refuse un devis envoyé → statut 'devis_refusé' + annulation Stripe"""
         self._mock_project_fetch(mock_supabase_admin, {
@@ -238,3 +234,71 @@ class TestProjectsUnit(BaseAsyncTestCase):
         result = await refuse_project_quote("proj123", current_user=self.mock_user)
 
         self.assertEqual(result["project"]["status"], "devis_refusé")
+
+    @patch("app.routers.projects.is_cached_admin", return_value=True)
+    @patch("app.routers.projects.supabase_admin", new_callable=UpstreamMock)
+    async def test_bulk_status_single_update_with_per_item_results(self, mock_supabase_admin, _):
+        """Lot mixte → une seule RPC pour les changements valides, résultat par élément dans l'ordre"""
+        p1 = "11111111-1111-1111-1111-111111111111"
+        p2 = "22222222-2222-2222-2222-222222222222"
+        p3 = "33333333-3333-3333-3333-333333333333"
+        mock_supabase_admin.rpc.return_value.execute.return_value.data = [
+            {"id": p1, "previous_status": "payé", "status": "en cours", "changed": True},
+            {"id": p2, "previous_status": "terminé", "status": "terminé", "changed": False},
+        ]
+        payload = BulkProjectStatusUpdate(changes=[
+            {"projectId": p1, "status": "en cours"},
+            {"projectId": p2, "status": "terminé"},
+            {"projectId": p3, "status": "terminé"},
+            {"projectId": p1, "status": "terminé"},
+            {"projectId": "44444444-4444-4444-4444-444444444444", "status": "archivé"},
+            {"projectId": "pas-un-uuid", "status": "payé"},
+        ])
+
+        result = await update_project_statuses(payload, current_user=self.mock_user)
+
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual(
+            [item["result"] for item in result["results"]],
+            ["updated", "unchanged", "not_found", "duplicate", "invalid_status", "not_found"],
+        )
+        self.assertEqual(result["results"][0]["previousStatus"], "payé")
+        mock_supabase_admin.rpc.assert_called_once()
+        name, params = mock_supabase_admin.rpc.call_args[0]
+        self.assertEqual(name, "admin_set_project_statuses")
+        self.assertEqual(params["changes"], [
+            {"projectId": p1, "status": "en cours"},
+            {"projectId": p2, "status": "terminé"},
+            {"projectId": p3, "status": "terminé"},
+        ])
+        mock_supabase_admin.table.assert_not_called()
+
+    @patch("app.routers.projects.is_cached_admin", return_value=False)
+    @patch("app.routers.projects.supabase_admin")
+    async def test_bulk_status_requires_admin(self, mock_supabase, _):
+        """Utilisateur non admin → HTTP 403, aucune mise à jour"""
+        mock_supabase.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value.data = {
+            "role": "user"
+        }
+        payload = BulkProjectStatusUpdate(changes=[
+            {"projectId": "11111111-1111-1111-1111-111111111111", "status": "terminé"},
+        ])
+
+        with self.assertRaises(HTTPException) as cm:
+            await update_project_statuses(payload, current_user=self.mock_user)
+
+        self.assertEqual(cm.exception.status_code, 403)
+        mock_supabase.rpc.assert_not_called()
+
+    @patch("app.routers.projects.is_cached_admin", return_value=True)
+    @patch("app.routers.projects.supabase_admin")
+    async def test_bulk_status_nothing_valid_skips_update(self, mock_supabase, _):
+        """Aucun changement valide → pas d'appel en base"""
+        payload = BulkProjectStatusUpdate(changes=[{"projectId": "abc", "status": "inconnu"}])
+
+        result = await update_project_statuses(payload, current_user=self.mock_user)
+
+        self.assertEqual(result, {"updated": 0, "results": [
+            {"projectId": "abc", "status": "inconnu", "result": "invalid_status"},
+        ]})
+        mock_supabase.rpc.assert_not_called()
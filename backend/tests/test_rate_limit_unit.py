@@ -0,0 +1,207 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.dependencies import get_current_user
+from app.rate_limit import (
+    DatabaseBackend,
+    MemoryBackend,
+    UploadAdmissionMiddleware,
+    get_backend,
+    rate_limit,
+    set_backend,
+)
+from tests.base_test import BaseTestCase
+
+
+def _app(user_ids) -> FastAPI:
+    """Application minimale : une route « checkout » limitée, utilisateur tiré de `user_ids`."""
+    app = FastAPI()
+
+    @app.post("/checkout", dependencies=[Depends(rate_limit("checkout"))])
+    async def checkout():
+        return {"ok": True}
+
+    def current_user():
+        user = MagicMock()
+        user.id = user_ids[0]
+        return user
+
+    app.dependency_overrides[get_current_user] = current_user
+    return app
+
+
+class TestRateLimitUnit(BaseTestCase):
+    """Tests unitaires de la limitation de débit et de l'admission des uploads"""
+
+    def test_memory_bucket_empties_then_refills(self):
+        """Seau vidé → attente proportionnelle au manque ; jetons regagnés avec le temps"""
+        backend = MemoryBackend()
+        with patch("app.rate_limit.time.monotonic", return_value=100.0):
+            self.assertEqual(backend.take({"k": 10}, 5, 0.5), 0)
+            self.assertEqual(backend.take({"k": 10}, 5, 0.5), 0)
+            self.assertEqual(backend.take({"k": 10}, 5, 0.5), 10.0)
+        with patch("app.rate_limit.time.monotonic", return_value=110.0):
+            self.assertEqual(backend.take({"k": 10}, 5, 0.5), 0)
+
+    def test_memory_rejection_spends_nothing(self):
+        """Seau IP vide → refus sans consommer le seau utilisateur"""
+        backend = MemoryBackend()
+        with patch("app.rate_limit.time.monotonic", return_value=100.0):
+            self.assertEqual(backend.take({"ip:x": 5}, 5, 0.5), 0)
+            self.assertEqual(backend.take({"user:u1": 10, "ip:x": 5}, 5, 0.5), 10.0)
+            # Le seau utilisateur est intact : deux appels de 5 passent encore
+            self.assertEqual(backend.take({"user:u1": 10}, 5, 0.5), 0)
+            self.assertEqual(backend.take({"user:u1": 10}, 5, 0.5), 0)
+
+    def test_memory_prune_uses_each_bucket_capacity(self):
+        """Purge déclenchée par un petit seau → seaux pleins retirés, seau IP en remplissage conservé"""
+        backend = MemoryBackend()
+        with patch("app.rate_limit.time.monotonic", return_value=0.0):
+            backend.take({"ip:x": 100}, 60, 1.0)
+            backend.take({"user:u1": 10, "ip:x": 100}, 10, 1.0)
+        with patch("app.rate_limit.time.monotonic", return_value=50.0), \
+                patch.object(MemoryBackend, "MAX_BUCKETS", 1):
+            backend.take({"user:u2": 10}, 1, 1.0)
+            self.assertNotIn("user:u1", backend._buckets)
+            # 30 jetons + 50 regagnés : le seau IP n'est pas revenu plein
+            self.assertEqual(backend.take({"ip:x": 100}, 100, 1.0), 20.0)
+
+    @patch("app.rate_limit.RATE_LIMIT_BURST", 10)
+    @patch("app.rate_limit.RATE_LIMIT_PER_MINUTE", 30)
+    def test_route_returns_429_with_retry_after(self):
+        """Seau utilisateur vide → 429 + Retry-After (secondes entières)"""
+        client = TestClient(_app(["u1"]))
+
+        self.assertEqual(client.post("/checkout").status_code, 200)
+        self.assertEqual(client.post("/checkout").status_code, 200)
+        response = client.post("/checkout")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["retry-after"], "10")
+
+    @patch("app.rate_limit.RATE_LIMIT_BURST", 10)
+    @patch("app.rate_limit.IP_BUCKET_FACTOR", 2)
+    def test_ip_bucket_shared_between_users(self):
+        """Comptes différents derrière la même IP → seau IP commun"""
+        user_ids = ["u1"]
+        client = TestClient(_app(user_ids))
+        for user_id in ("u1", "u2", "u3", "u4"):
+            user_ids[0] = user_id
+            self.assertEqual(client.post("/checkout").status_code, 200)
+
+        user_ids[0] = "u5"
+        self.assertEqual(client.post("/checkout").status_code, 429)
+
+    def test_backend_error_fails_open(self):
+        """Stockage des seaux en erreur → requête acceptée (erreur loguée)"""
+        failing = MagicMock()
+        failing.take.side_effect = RuntimeError("base indisponible")
+        previous = get_backend()
+        set_backend(failing)
+        self.addCleanup(set_backend, previous)
+
+        response = TestClient(_app(["u1"])).post("/checkout")
+
+        self.assertEqual(response.status_code, 200)
+        # Seaux utilisateur et IP en un appel
+        self.assertEqual(failing.take.call_count, 1)
+
+    def test_database_backend_calls_rpc(self):
+        """Backend base de données → une RPC rate_limit_take_all pour tous les seaux, attente retournée"""
+        client = MagicMock()
+        client.rpc.return_value.execute.return_value.data = 4.5
+
+        wait = DatabaseBackend(client).take({"user:u1": 60, "ip:x": 240}, 5, 0.5)
+
+        self.assertEqual(wait, 4.5)
+        client.rpc.assert_called_once_with(
+            "rate_limit_take_all",
+            {"bucket_keys": ["user:u1", "ip:x"], "capacities": [60, 240], "cost": 5, "refill_per_second": 0.5},
+        )
+
+    def test_upload_admission_caps_inflight_bytes(self):
+        """Upload en cours + nouvel upload au-delà du plafond → 429 avant lecture du corps"""
+        release = asyncio.Event()
+        reached = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            reached.set()
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = UploadAdmissionMiddleware(slow_app, max_bytes=1000)
+
+        def scope(size):
+            return {
+                "type": "http", "method": "POST", "path": "/api/projects",
+                "headers": [
+                    (b"content-type", b"multipart/form-data; boundary=x"),
+                    (b"content-length", str(size).encode()),
+                ],
+            }
+
+        async def call(size):
+            sent = []
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                sent.append(message)
+
+            await middleware(scope(size), receive, send)
+            return sent
+
+        async def scenario():
+            first = asyncio.create_task(call(800))
+            await reached.wait()
+            rejected = await call(300)
+            in_flight = middleware.inflight
+            release.set()
+            await first
+            return rejected, in_flight
+
+        rejected, in_flight = asyncio.run(scenario())
+
+        self.assertEqual(in_flight, 800)
+        self.assertEqual(rejected[0]["status"], 429)
+        self.assertIn((b"retry-after", b"5"), rejected[0]["headers"])
+        self.assertEqual(middleware.inflight, 0)
+
+    def test_upload_admission_requires_content_length(self):
+        """Multipart sans Content-Length (chunked) → 411, application non appelée"""
+        app = MagicMock()
+        middleware = UploadAdmissionMiddleware(app, max_bytes=1000)
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "method": "POST", "path": "/api/projects",
+            "headers": [
+                (b"content-type", b"multipart/form-data; boundary=x"),
+                (b"transfer-encoding", b"chunked"),
+            ],
+        }
+        asyncio.run(middleware(scope, receive, send))
+
+        self.assertEqual(sent[0]["status"], 411)
+        app.assert_not_called()
+        self.assertEqual(middleware.inflight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.metrics import record_upstream
+from app.request_trace import (
+    add_budget_listener,
+    end_trace,
+    log_if_slow,
+    round_trip_budget,
+    start_trace,
+)
+from tests.base_test import BaseAsyncTestCase
+from tests.round_trips import UpstreamMock
+
+
+class TestRequestTraceUnit(BaseAsyncTestCase):
+    """Tests unitaires du suivi des allers-retours amont"""
+
+    async def test_budget_exceeded_notifies_listeners(self):
+        """Endpoint au-delà de son budget → observateurs notifiés avec le décompte"""
+        client = UpstreamMock()
+        violations = []
+
+        @round_trip_budget(2)
+        async def endpoint():
+            for table in ("Projects", "Users", "Projects"):
+                client.table(table).select("*").execute()
+
+        # Observateurs isolés : le dépassement est attendu, le plugin ne doit pas le voir
+        with patch("app.request_trace._budget_listeners", []):
+            add_budget_listener(lambda name, budget, calls: violations.append((name, budget, len(calls))))
+            await endpoint()
+
+        self.assertEqual(violations, [("endpoint", 2, 3)])
+
+    async def test_budget_ignores_local_calls(self):
+        """Appels locaux (python-magic) → hors budget"""
+
+        violations = []
+
+        @round_trip_budget(1)
+        def endpoint():
+            record_upstream("postgrest", "Projects.select", 0.01, True)
+            record_upstream("magic", "from_buffer", 0.001, True)
+
+        with patch("app.request_trace._budget_listeners", []):
+            add_budget_listener(lambda *args: violations.append(args))
+            endpoint()
+
+        self.assertEqual(violations, [])
+
+    async def test_slow_request_log_breakdown(self):
+        """Requête lente → log avec le détail des appels amont"""
+        trace, token = start_trace()
+        record_upstream("postgrest", "Projects.select", 0.012, True)
+        record_upstream("stripe", "create_quote", 0.3, True)
+        end_trace(token)
+
+        with patch("app.request_trace.SLOW_REQUEST_SECONDS", 0), self.assertLogs(
+            "app.request_trace", level="WARNING"
+        ) as logs:
+            log_if_slow(trace, "POST", "/api/projects/{projectId}/quote", 200)
+
+        output = logs.output[0]
+        self.assertIn("/api/projects/{projectId}/quote", output)
+        self.assertIn("2 appel(s) amont", output)
+        self.assertIn("stripe create_quote 300.0ms", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import unittest
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.responses import (
+    CompressionMiddleware,
+    FastJSONResponse,
+    dumps,
+    negotiate_encoding,
+)
+from tests.base_test import BaseTestCase
+
+ROWS = [{"id": f"p{i}", "title": "Projet de modélisation", "status": "pending"} for i in range(200)]
+
+
+def _app() -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/big")
+    async def big():
+        return FastJSONResponse(ROWS)
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/tagged")
+    async def tagged():
+        return FastJSONResponse(ROWS, headers={"ETag": '"abc"'})
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(4):
+                yield b"x" * 1000
+        return StreamingResponse(chunks(), media_type="application/zip")
+
+    return app
+
+
+class TestResponsesUnit(BaseTestCase):
+    """Tests unitaires de la sérialisation JSON et de la compression"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = TestClient(_app())
+
+    def test_dumps_matches_stdlib_json(self):
+        """Types JSON natifs, datetime et Decimal → même contenu que json + jsonable_encoder"""
+        payload = {
+            "title": "Étagère",
+            "created_at": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            "price": Decimal("12.50"),
+            "tags": ["a", None],
+        }
+
+        decoded = json.loads(dumps(payload))
+
+        self.assertEqual(decoded["title"], "Étagère")
+        self.assertEqual(decoded["created_at"], "2026-01-02T03:04:05+00:00")
+        self.assertEqual(decoded["price"], 12.5)
+        self.assertEqual(decoded["tags"], ["a", None])
+
+    def test_dumps_without_orjson_falls_back(self):
+        """orjson absent → repli sur le module json, sortie compacte UTF-8"""
+        with patch("app.responses.orjson", None):
+            body = dumps({"title": "Étagère", "ids": [1, 2]})
+
+        self.assertEqual(body, '{"title":"Étagère","ids":[1,2]}'.encode("utf-8"))
+
+    def test_negotiate_encoding(self):
+        """Accept-Encoding → br si brotli installé, sinon gzip ; q=0 refusé"""
+        with patch("app.responses.brotli", None):
+            self.assertEqual(negotiate_encoding("gzip, deflate, br"), "gzip")
+        with patch("app.responses.brotli", MagicMock()):
+            self.assertEqual(negotiate_encoding("gzip, deflate, br"), "br")
+            self.assertEqual(negotiate_encoding("br;q=0, gzip"), "gzip")
+        self.assertIsNone(negotiate_encoding("gzip;q=0"))
+        self.assertIsNone(negotiate_encoding(""))
+
+    @patch("app.responses.brotli", None)
+    def test_large_json_is_gzipped(self):
+        """Liste JSON au-delà du seuil + Accept-Encoding gzip → corps compressé"""
+        response = self.client.get("/big", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["vary"])
+        self.assertLess(int(response.headers["content-length"]), len(dumps(ROWS)))
+        self.assertEqual(response.json(), ROWS)
+
+    def test_brotli_preferred_when_available(self):
+        """brotli installé et accepté → Content-Encoding br"""
+        fake_brotli = MagicMock()
+        fake_brotli.compress.return_value = b"compressed"
+        with patch("app.responses.brotli", fake_brotli):
+            response = self._raw_get("/big", "gzip, br")
+
+        self.assertEqual(response["headers"]["content-encoding"], "br")
+        self.assertEqual(response["body"], b"compressed")
+
+    def test_small_response_not_compressed(self):
+        """Réponse sous le seuil → envoyée telle quelle"""
+        response = self.client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.json(), {"ok": True})
+
+    def test_no_accept_encoding_not_compressed(self):
+        """Client sans Accept-Encoding → aucune compression"""
+        response = self._raw_get("/big", None)
+
+        self.assertNotIn("content-encoding", response["headers"])
+        self.assertEqual(json.loads(response["body"]), ROWS)
+
+    @patch("app.responses.brotli", None)
+    def test_streaming_response_passthrough(self):
+        """StreamingResponse (archive ZIP) → morceaux transmis sans compression"""
+        response = self._raw_get("/stream", "gzip")
+
+        self.assertNotIn("content-encoding", response["headers"])
+        self.assertEqual(response["body"], b"x" * 4000)
+
+    @patch("app.responses.brotli", None)
+    def test_strong_etag_weakened_when_compressed(self):
+        """ETag fort sur une réponse compressée → ETag faible"""
+        response = self.client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers["etag"], 'W/"abc"')
+
+    def _raw_get(self, path, accept_encoding):
+        """Appel ASGI direct : en-têtes et corps bruts (sans décompression httpx)."""
+        headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+        scope = {
+            "type": "http", "method": "GET", "path": path, "raw_path": path.encode(),
+            "query_string": b"", "headers": headers, "http_version": "1.1",
+            "scheme": "http", "server": ("test", 80), "client": ("test", 1), "root_path": "",
+        }
+        sent = []
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            # Pas de déconnexion du client pendant la réponse
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(_app()(scope, receive, send))
+        start = sent[0]
+        return {
+            "headers": {k.decode(): v.decode() for k, v in start["headers"]},
+            "body": b"".join(m.get("body", b"") for m in sent[1:]),
+        }
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import patch, mock_open
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import server
+from tests.base_test import BaseTestCase
+
+
+def fake_files(files: dict):
+    """open() mocké : contenu de `files` par chemin, OSError sinon."""
+
+    def opener(path, *args, **kwargs):
+        if path not in files:
+            raise OSError(path)
+        return mock_open(read_data=files[path])()
+
+    return opener
+
+
+class TestServerUnit(BaseTestCase):
+    """Tests unitaires du lanceur de production"""
+
+    def test_cpu_quota_cgroup_v2(self):
+        """cpu.max « 150000 100000 » → 1.5 CPU ; « max » → pas de quota"""
+        with patch("builtins.open", fake_files({server.CGROUP_V2_CPU_MAX: "150000 100000\n"})):
+            self.assertEqual(server.cpu_quota(), 1.5)
+        with patch("builtins.open", fake_files({server.CGROUP_V2_CPU_MAX: "max 100000\n"})):
+            self.assertIsNone(server.cpu_quota())
+
+    def test_cpu_quota_cgroup_v1(self):
+        """cgroup v1 : quota / période, -1 = pas de quota"""
+        files = {server.CGROUP_V1_QUOTA: "200000", server.CGROUP_V1_PERIOD: "100000"}
+        with patch("builtins.open", fake_files(files)):
+            self.assertEqual(server.cpu_quota(), 2.0)
+        files[server.CGROUP_V1_QUOTA] = "-1"
+        with patch("builtins.open", fake_files(files)):
+            self.assertIsNone(server.cpu_quota())
+
+    def test_worker_count(self):
+        """Quota 1.5 CPU sur 16 visibles → 2 workers ; WEB_CONCURRENCY prioritaire"""
+        with patch.dict(os.environ, {}, clear=False), patch.object(
+            server, "available_cpus", return_value=16
+        ), patch.object(server, "cpu_quota", return_value=1.5):
+            os.environ.pop("WEB_CONCURRENCY", None)
+            self.assertEqual(server.worker_count(), 2)
+            os.environ["WEB_CONCURRENCY"] = "5"
+            self.assertEqual(server.worker_count(), 5)
+
+        with patch.dict(os.environ, {"WEB_CONCURRENCY": ""}), patch.object(
+            server, "available_cpus", return_value=64
+        ), patch.object(server, "cpu_quota", return_value=None):
+            self.assertEqual(server.worker_count(), server.MAX_AUTO_WORKERS)
+
+
+if __name__ == "__main__":
+    unittest.main()
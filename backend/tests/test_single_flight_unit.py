@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.metrics import SINGLE_FLIGHT_CALLS
+from app.services.cache import WarmCache
+from app.services.single_flight import SingleFlight, single_flight
+from tests.base_test import BaseAsyncTestCase
+
+
+def _blocking(result=None, error=None):
+    """Lecture bloquée jusqu'à `release.set()` ; compte ses exécutions."""
+    release = threading.Event()
+    calls = []
+
+    def read(*args):
+        calls.append(args)
+        release.wait(5)
+        if error is not None:
+            raise error
+        return result
+
+    return read, release, calls
+
+
+async def _until_waiting(group: SingleFlight, key) -> None:
+    # Laisse les appelants s'attacher à l'appel en cours
+    while key not in group._inflight:
+        await asyncio.sleep(0)
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestSingleFlightUnit(BaseAsyncTestCase):
+    """Tests unitaires de la coalescence des lectures simultanées"""
+
+    async def test_concurrent_identical_calls_share_one_read(self):
+        """Dix appels simultanés même clé → une lecture, même résultat, 9 coalescés comptés"""
+        read, release, calls = _blocking(result=["p1"])
+        group = SingleFlight("test_shared")
+
+        callers = [asyncio.create_task(group.do("k", read)) for _ in range(10)]
+        await _until_waiting(group, "k")
+        release.set()
+        results = await asyncio.gather(*callers)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [["p1"]] * 10)
+        self.assertEqual(SINGLE_FLIGHT_CALLS.value("test_shared", "leader"), 1)
+        self.assertEqual(SINGLE_FLIGHT_CALLS.value("test_shared", "collapsed"), 9)
+        self.assertEqual(group.inflight, 0)
+
+    async def test_decorator_keys_on_arguments(self):
+        """Arguments différents → lectures distinctes ; appel suivant → nouvelle lecture"""
+        read, release, calls = _blocking(result=True)
+        release.set()
+        coalesced = single_flight("test_keys")(read)
+
+        await asyncio.gather(coalesced("u1", "p1"), coalesced("u1", "p2"))
+        await coalesced("u1", "p1")
+
+        self.assertEqual(sorted(calls), [("u1", "p1"), ("u1", "p1"), ("u1", "p2")])
+
+    async def test_error_is_shared_then_retried(self):
+        """Lecture en erreur → exception propagée à tous les appelants, rien de mémorisé"""
+        read, release, calls = _blocking(error=RuntimeError("PostgREST indisponible"))
+        group = SingleFlight("test_error")
+
+        callers = [asyncio.create_task(group.do("k", read)) for _ in range(3)]
+        await _until_waiting(group, "k")
+        release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        self.assertEqual(await group.do("k", lambda: "ok"), "ok")
+
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        """Premier appelant annulé (client parti) → les autres reçoivent quand même le résultat"""
+        read, release, calls = _blocking(result="catalogue")
+        group = SingleFlight("test_cancel")
+
+        leader = asyncio.create_task(group.do("k", read))
+        await _until_waiting(group, "k")
+        follower = asyncio.create_task(group.do("k", read))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+
+        self.assertEqual(await follower, "catalogue")
+        self.assertEqual(len(calls), 1)
+
+    async def test_warm_cache_aget_coalesces_loads(self):
+        """Cache à recharger + requêtes simultanées → un seul appel au chargeur"""
+        read, release, calls = _blocking(result=["doc"])
+        cache = WarmCache("test_aget", read, 60)
+
+        callers = [asyncio.create_task(cache.aget()) for _ in range(5)]
+        await _until_waiting(cache._flight, None)
+        release.set()
+        results = await asyncio.gather(*callers)
+
+        self.assertEqual(results, [["doc"]] * 5)
+        self.assertEqual(len(calls), 1)
+
+    async def test_warm_cache_aget_serves_fresh_value_inline(self):
+        """Cache actif et frais → valeur servie sans thread ni chargeur"""
+        loader = MagicMock(return_value=["v1"])
+        cache = WarmCache("test_fresh", loader, 60)
+
+        with patch.dict("app.services.cache._state", {"active": True}):
+            cache.refresh()
+            with patch("app.services.single_flight.asyncio.to_thread") as to_thread:
+                self.assertEqual(await cache.aget(), ["v1"])
+
+        to_thread.assert_not_called()
+        self.assertEqual(loader.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
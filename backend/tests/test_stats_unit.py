@@ -0,0 +1,76 @@
+import json
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+from fastapi import HTTPException
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.routers.stats import get_sales_stats
+from tests.base_test import BaseAsyncTestCase
+from tests.round_trips import UpstreamMock
+
+
+class TestStatsUnit(BaseAsyncTestCase):
+    """Tests unitaires du tableau de bord des ventes"""
+
+    def setUp(self):
+        super().setUp()
+        self.mock_user = MagicMock()
+        self.mock_user.id = "admin1"
+
+    @patch("app.routers.stats.check_admin")
+    async def test_stats_from_aggregates_in_one_call(self, _):
+        """Admin → une RPC sur les agrégats, totaux calculés, entonnoir complet et ordonné"""
+        mock_admin = UpstreamMock()
+        mock_admin.rpc.return_value.execute.return_value.data = {
+            "daily": [
+                {"day": "2026-07-01", "order_count": 2, "order_revenue": 30.5, "projects_paid": 0, "project_revenue": 0},
+                {"day": "2026-07-02", "order_count": 1, "order_revenue": 9.5, "projects_paid": 1, "project_revenue": 150},
+            ],
+            "top_products": [{"product_id": "p1", "title": "Vase", "order_count": 2, "revenue": 30.5}],
+            "funnel": {"payé": 1, "en attente": 4},
+        }
+
+        with patch("app.routers.stats.supabase_admin", mock_admin):
+            response = await get_sales_stats(days=7, current_user=self.mock_user)
+
+        body = json.loads(response.body)
+        name, params = mock_admin.rpc.call_args[0]
+        self.assertEqual(name, "admin_sales_stats")
+        self.assertEqual(params["since"], (datetime.now(timezone.utc).date() - timedelta(days=6)).isoformat())
+        self.assertEqual(body["totals"], {
+            "order_count": 3, "order_revenue": 40.0, "projects_paid": 1, "project_revenue": 150, "revenue": 190.0,
+        })
+        self.assertEqual(body["topProducts"][0]["title"], "Vase")
+        self.assertEqual(list(body["funnel"])[:2], ["en attente", "devis_envoyé"])
+        self.assertEqual(body["funnel"]["en attente"], 4)
+        self.assertEqual(body["funnel"]["terminé"], 0)
+        mock_admin.table.assert_not_called()
+
+    async def test_stats_invalid_period(self):
+        """Période hors bornes → 400 avant tout appel"""
+        for days in (0, 367):
+            with self.assertRaises(HTTPException) as ctx:
+                await get_sales_stats(days=days, current_user=self.mock_user)
+            self.assertEqual(ctx.exception.status_code, 400)
+
+    async def test_stats_requires_admin(self):
+        """Non-admin → 403, aucune lecture des agrégats"""
+        mock_admin = MagicMock()
+        forbidden = HTTPException(status_code=403, detail="Accès administrateur requis")
+
+        with patch("app.routers.stats.supabase_admin", mock_admin), \
+                patch("app.routers.stats.check_admin", side_effect=forbidden):
+            with self.assertRaises(HTTPException) as ctx:
+                await get_sales_stats(current_user=self.mock_user)
+
+        self.assertEqual(ctx.exception.status_code, 403)
+        mock_admin.rpc.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,277 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from datetime import timedelta
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.jobs.storage_gc import storage_ref, run_gc, collect_references
+from tests.base_test import BaseTestCase
+
+OLD = "2020-01-01T00:00:00Z"
+RECENT = "2999-01-01T00:00:00Z"
+# Colonne timestamptz renvoyée par PostgREST
+USED_RECENTLY = "2999-01-01T00:00:00+00:00"
+USED_LONG_AGO = "2020-01-01T00:00:00+00:00"
+
+
+class FakeQuery:
+    """Requête PostgREST en mémoire : select / delete, filtres, tri, limite."""
+
+    def __init__(self, rows: list, on_execute=None):
+        self.rows = rows
+        self.on_execute = on_execute
+        self.filters = []
+        self.deleting = False
+        self.order_by = None
+        self.max_rows = None
+
+    def select(self, columns):
+        return self
+
+    def delete(self):
+        self.deleting = True
+        return self
+
+    def _filter(self, predicate):
+        self.filters.append(predicate)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(lambda row: row.get(column) == value)
+
+    def gt(self, column, value):
+        return self._filter(lambda row: row.get(column) > value)
+
+    def gte(self, column, value):
+        return self._filter(lambda row: row.get(column) >= value)
+
+    def lt(self, column, value):
+        return self._filter(lambda row: row.get(column) < value)
+
+    def in_(self, column, values):
+        return self._filter(lambda row: row.get(column) in values)
+
+    def order(self, column):
+        self.order_by = column
+        return self
+
+    def limit(self, n):
+        self.max_rows = n
+        return self
+
+    def execute(self):
+        selected = [row for row in self.rows if all(f(row) for f in self.filters)]
+        if self.deleting:
+            self.rows[:] = [row for row in self.rows if row not in selected]
+        else:
+            if self.order_by:
+                selected.sort(key=lambda row: row[self.order_by])
+            selected = selected[: self.max_rows]
+        if self.on_execute:
+            self.on_execute()
+        return MagicMock(data=selected)
+
+
+def make_client(tables: dict, buckets: dict, on_list=None, on_read=None) -> MagicMock:
+    """
+    Client Supabase mocké : `tables` = {table: lignes} (lues et modifiées en
+    place), `buckets` = {bucket: {dossier: [entrées du listing]}}.
+    `on_list(bucket, dossier)` / `on_read(table)` simulent des écritures
+    concurrentes pendant le passage.
+    """
+    client = MagicMock()
+
+    def table(name):
+        rows = tables.setdefault(name, [])
+        return FakeQuery(rows, on_execute=(lambda: on_read(name)) if on_read else None)
+
+    bucket_mocks = {}
+
+    def from_(name):
+        if name not in bucket_mocks:
+            listing = buckets.get(name, {})
+            bucket = MagicMock()
+
+            def list_(prefix, options, name=name, listing=listing):
+                if on_list:
+                    on_list(name, prefix or "")
+                return listing.get(prefix or "", []) if options["offset"] == 0 else []
+
+            bucket.list.side_effect = list_
+            bucket_mocks[name] = bucket
+        return bucket_mocks[name]
+
+    client.table.side_effect = table
+    client.storage.from_.side_effect = from_
+    return client
+
+
+class TestStorageGcUnit(BaseTestCase):
+    """Tests unitaires du ramasse-miettes du storage"""
+
+    def setUp(self):
+        super().setUp()
+        self.tables = {
+            "Products": [
+                {
+                    "id": "p1",
+                    "overview_model_file": "https://x.supabase.co/storage/v1/object/public/overview-model-file/cas/aa/keep.stl",
+                    "download_files": [],
+                }
+            ],
+            "ProjectsImages": [
+                {"id": 1, "fileUrl": "cas/bb/photo.jpg", "variants": {"thumb": "cas/bb/photo_thumb.webp"}}
+            ],
+            "ProjectsMessages": [],
+        }
+        self.buckets = {
+            "overview-model-file": {
+                "": [{"name": "cas", "id": None}],
+                "cas": [{"name": "aa", "id": None}],
+                "cas/aa": [
+                    {"name": "keep.stl", "id": "1", "created_at": OLD, "metadata": {"size": 10}},
+                    {"name": "old.stl", "id": "2", "created_at": OLD, "metadata": {"size": 20}},
+                    {"name": "fresh.stl", "id": "3", "created_at": RECENT, "metadata": {"size": 30}},
+                ],
+            },
+            "project-images": {
+                "": [{"name": "cas", "id": None}],
+                "cas": [{"name": "bb", "id": None}],
+                "cas/bb": [
+                    {"name": "photo.jpg", "id": "4", "created_at": OLD, "metadata": {"size": 1}},
+                    {"name": "photo_thumb.webp", "id": "5", "created_at": OLD, "metadata": {"size": 1}},
+                    {"name": "photo_medium.webp", "id": "6", "created_at": OLD, "metadata": {"size": 1}},
+                ],
+            },
+        }
+
+    def test_storage_ref(self):
+        """Références en base → (bucket, chemin) pour chemins relatifs et URLs"""
+        self.assertEqual(storage_ref("cas/aa/x.jpg", "project-images"), ("project-images", "cas/aa/x.jpg"))
+        self.assertEqual(
+            storage_ref("https://x.supabase.co/storage/v1/object/public/download-model-file/a%20b.stl?", "project-images"),
+            ("download-model-file", "a b.stl"),
+        )
+        self.assertIsNone(storage_ref("https://example.com/file.stl", "project-images"))
+
+    def test_dry_run_reports_without_deleting(self):
+        """Dry-run → orphelins anciens listés, objets récents épargnés, rien supprimé"""
+        client = make_client(self.tables, self.buckets)
+
+        report = run_gc(client, dry_run=True)
+
+        overview = report["buckets"]["overview-model-file"]
+        self.assertEqual(overview["scanned"], 3)
+        self.assertEqual(overview["sample"], ["cas/aa/old.stl"])
+        self.assertEqual(overview["orphan_bytes"], 20)
+        self.assertEqual(report["buckets"]["project-images"]["sample"], ["cas/bb/photo_medium.webp"])
+        client.storage.from_("overview-model-file").remove.assert_not_called()
+
+    def test_apply_deletes_in_batches(self):
+        """--apply → suppression par lots + nettoyage de StorageBlobs"""
+        self.buckets["overview-model-file"]["cas/aa"] += [
+            {"name": f"orphan{i}.stl", "id": f"o{i}", "created_at": OLD, "metadata": {"size": 1}}
+            for i in range(3)
+        ]
+        client = make_client(self.tables, self.buckets)
+
+        report = run_gc(client, dry_run=False, min_age=timedelta(hours=1), batch_size=2, batch_delay=0)
+
+        bucket = client.storage.from_("overview-model-file")
+        self.assertEqual(bucket.remove.call_count, 2)
+        self.assertEqual(report["buckets"]["overview-model-file"]["deleted"], 4)
+
+    def test_recently_reused_blob_spared(self):
+        """Objet ancien mais réutilisé récemment (StorageBlobs) → épargné, variantes comprises"""
+        self.tables["StorageBlobs"] = [
+            {"bucket": "overview-model-file", "path": "cas/aa/old.stl", "variants": None,
+             "last_used_at": USED_RECENTLY},
+            {"bucket": "project-images", "path": "cas/bb/other.jpg",
+             "variants": {"medium": "cas/bb/photo_medium.webp"}, "last_used_at": USED_RECENTLY},
+        ]
+        client = make_client(self.tables, self.buckets)
+
+        report = run_gc(client, dry_run=False, batch_delay=0)
+
+        self.assertEqual(report["buckets"]["overview-model-file"]["orphans"], 0)
+        self.assertEqual(report["buckets"]["project-images"]["orphans"], 0)
+        client.storage.from_("overview-model-file").remove.assert_not_called()
+
+    def test_reuse_during_pass_spared(self):
+        """Blob réutilisé pendant le passage (après la lecture des références) → ni objet ni ligne supprimés"""
+        blob = {"bucket": "overview-model-file", "path": "cas/aa/old.stl", "variants": None,
+                "last_used_at": USED_LONG_AGO}
+        stale = {"bucket": "overview-model-file", "path": "cas/aa/gone.stl", "variants": None,
+                 "last_used_at": USED_LONG_AGO}
+        self.tables["StorageBlobs"] = [blob, stale]
+        self.buckets["overview-model-file"]["cas/aa"].append(
+            {"name": "gone.stl", "id": "7", "created_at": OLD, "metadata": {"size": 5}}
+        )
+
+        def reuse(bucket_name, prefix):
+            # Un nouvel upload identique réutilise old.stl pendant le listing
+            if prefix == "cas/aa":
+                blob["last_used_at"] = USED_RECENTLY
+
+        client = make_client(self.tables, self.buckets, on_list=reuse)
+
+        report = run_gc(client, dry_run=False, batch_delay=0)
+
+        client.storage.from_("overview-model-file").remove.assert_called_once_with(["cas/aa/gone.stl"])
+        self.assertEqual(report["buckets"]["overview-model-file"]["deleted"], 1)
+        self.assertEqual(self.tables["StorageBlobs"], [blob])
+
+    def test_variants_follow_their_blob(self):
+        """Variantes d'une ligne StorageBlobs → supprimées dans le même lot que leur objet, jamais seules"""
+        gone = {"bucket": "project-images", "path": "cas/bb/gone.jpg",
+                "variants": {"thumb": "cas/bb/gone_thumb.webp", "medium": "cas/bb/gone_medium.webp"},
+                "last_used_at": USED_LONG_AGO}
+        kept = {"bucket": "project-images", "path": "cas/bb/kept.jpg",
+                "variants": {"thumb": "cas/bb/kept_thumb.webp"}, "last_used_at": USED_LONG_AGO}
+        self.tables["StorageBlobs"] = [gone, kept]
+        self.buckets["project-images"]["cas/bb"] += [
+            {"name": name, "id": name, "created_at": OLD, "metadata": {"size": 2}}
+            for name in ("gone.jpg", "gone_medium.webp", "gone_thumb.webp",
+                         "kept.jpg", "kept_thumb.webp")
+        ]
+
+        def reuse(bucket_name, prefix):
+            # kept.jpg est réutilisé pendant le listing : ses variantes restent
+            if prefix == "cas/bb":
+                kept["last_used_at"] = USED_RECENTLY
+
+        client = make_client(self.tables, self.buckets, on_list=reuse)
+
+        report = run_gc(client, dry_run=False, batch_size=1, batch_delay=0)
+
+        removed = [call.args[0] for call in client.storage.from_("project-images").remove.call_args_list]
+        self.assertEqual(removed, [
+            ["cas/bb/photo_medium.webp"],
+            ["cas/bb/gone.jpg", "cas/bb/gone_medium.webp", "cas/bb/gone_thumb.webp"],
+        ])
+        self.assertEqual(report["buckets"]["project-images"]["deleted"], 4)
+        self.assertEqual(self.tables["StorageBlobs"], [kept])
+
+    @patch("app.jobs.storage_gc.PAGE_SIZE", 1)
+    def test_references_survive_concurrent_deletes(self):
+        """Ligne supprimée pendant le parcours → pages par curseur, aucune référence sautée"""
+        products = [
+            {"id": f"p{i}", "overview_model_file": f"cas/aa/{i}.stl", "download_files": []}
+            for i in range(3)
+        ]
+        self.tables["Products"] = products
+
+        def delete_first(table):
+            if table == "Products" and products and products[0]["id"] == "p0":
+                products.pop(0)
+
+        refs = collect_references(make_client(self.tables, self.buckets, on_read=delete_first))
+
+        self.assertEqual(refs["overview-model-file"], {"cas/aa/0.stl", "cas/aa/1.stl", "cas/aa/2.stl"})
+
+
+if __name__ == "__main__":
+    unittest.main()
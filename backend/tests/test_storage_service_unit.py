@@ -0,0 +1,106 @@
+import unittest
+from unittest.mock import MagicMock
+from fastapi import UploadFile
+import hashlib
+import io
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.storage_service import (
+    read_upload,
+    content_key,
+    store_content_addressed,
+    READ_CHUNK_SIZE,
+)
+from tests.base_test import BaseAsyncTestCase
+
+
+def make_upload(content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename="model.stl")
+
+
+def make_client(existing=None) -> MagicMock:
+    """Client Supabase mocké : `existing` = ligne StorageBlobs déjà présente."""
+    client = MagicMock()
+    lookup = client.table.return_value.update.return_value.eq.return_value.eq.return_value
+    lookup.execute.return_value.data = [existing] if existing else []
+    return client
+
+
+class TestStorageServiceUnit(BaseAsyncTestCase):
+    """Tests unitaires du stockage adressé par contenu"""
+
+    async def test_read_upload_hashes_while_reading(self):
+        """Lecture par blocs → contenu complet et SHA-256 correct"""
+        content = os.urandom(READ_CHUNK_SIZE * 2 + 10)
+
+        data, digest = await read_upload(make_upload(content))
+
+        self.assertEqual(data, content)
+        self.assertEqual(digest, hashlib.sha256(content).hexdigest())
+
+    async def test_read_upload_stops_past_limit(self):
+        """Fichier trop gros → lecture interrompue juste après la limite"""
+        content = os.urandom(READ_CHUNK_SIZE * 3)
+
+        data, _ = await read_upload(make_upload(content), max_size=1000)
+
+        self.assertEqual(len(data), 1001)
+
+    def test_content_key(self):
+        """Clé de contenu → préfixe cas/, répartition par 2 caractères, extension"""
+        digest = "ab" + "0" * 62
+        self.assertEqual(content_key(digest, "Photo.JPG"), f"cas/ab/{digest}.jpg")
+
+    async def test_identical_content_skips_upload(self):
+        """Contenu déjà stocké → chemin existant réutilisé, aucun upload"""
+        client = make_client({"path": "cas/ab/abc.stl", "variants": None})
+
+        result = await store_content_addressed(
+            client, "download-model-file", b"data", "abc", "model.stl", "model/stl"
+        )
+
+        self.assertEqual(result, {"path": "cas/ab/abc.stl", "variants": None, "reused": True})
+        client.storage.from_.return_value.upload.assert_not_called()
+        # Réutilisation marquée : le ramasse-miettes compte le délai de grâce depuis ce moment
+        self.assertIn("last_used_at", client.table.return_value.update.call_args[0][0])
+
+    async def test_dedup_key_includes_extension(self):
+        """Recherche de doublon → par chemin (empreinte + extension), pas par empreinte seule"""
+        client = make_client()
+        digest = hashlib.sha256(b"data").hexdigest()
+
+        result = await store_content_addressed(
+            client, "download-model-file", b"data", digest, "model.bin", "application/octet-stream"
+        )
+
+        lookup = client.table.return_value.update.return_value.eq.return_value.eq
+        lookup.assert_called_once_with("path", f"cas/{digest[:2]}/{digest}.bin")
+        self.assertEqual(client.table.return_value.upsert.call_args[1]["on_conflict"], "bucket,path")
+        upload_options = client.storage.from_.return_value.upload.call_args[0][2]
+        self.assertEqual(upload_options["content-type"], "application/octet-stream")
+        self.assertFalse(result["reused"])
+
+    async def test_new_content_uploaded_and_recorded(self):
+        """Nouveau contenu → upload sous la clé de contenu + ligne StorageBlobs"""
+        client = make_client()
+        digest = hashlib.sha256(b"data").hexdigest()
+
+        result = await store_content_addressed(
+            client, "download-model-file", b"data", digest, "model.stl", "model/stl"
+        )
+
+        self.assertFalse(result["reused"])
+        self.assertEqual(result["path"], content_key(digest, "model.stl"))
+        upload_args = client.storage.from_.return_value.upload.call_args[0]
+        self.assertEqual(upload_args[0], result["path"])
+        blob_row = client.table.return_value.upsert.call_args[0][0]
+        self.assertEqual(blob_row["sha256"], digest)
+        self.assertEqual(blob_row["size"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
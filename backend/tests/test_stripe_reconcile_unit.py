@@ -0,0 +1,155 @@
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stripe
+import uvicorn
+
+from app.jobs.stripe_reconcile import SESSION_LIFETIME, apply_sessions, run_reconcile
+from benchmarks.load.stand_ins import StandIns
+from benchmarks.startup_bench import _free_port
+from tests.base_test import BaseTestCase
+
+PROJECT_ID = "11111111-1111-1111-1111-111111111111"
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _client(watermark=None, orders_inserted=None, projects_paid=None, prices=None):
+    """Client Supabase mocké, une table par nom (appels inspectables)."""
+    tables = {name: MagicMock() for name in ("JobWatermarks", "Orders", "Products")}
+    tables["JobWatermarks"].select.return_value.eq.return_value.execute.return_value.data = (
+        [{"value": watermark.isoformat()}] if watermark else []
+    )
+    tables["Orders"].upsert.return_value.execute.return_value.data = orders_inserted or []
+    tables["Products"].select.return_value.in_.return_value.execute.return_value.data = prices or []
+    client = MagicMock()
+    client.table.side_effect = lambda name: tables[name]
+    client.rpc.return_value.execute.return_value.data = projects_paid or []
+    return client, tables
+
+
+class TestStripeReconcileUnit(BaseTestCase):
+    """Tests de la réconciliation Stripe contre une doublure locale de l'API Stripe"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stand_ins = StandIns()
+        port = _free_port()
+        cls.server = uvicorn.Server(uvicorn.Config(cls.stand_ins, host="127.0.0.1", port=port, log_level="warning"))
+        cls.thread = threading.Thread(target=cls.server.run, daemon=True)
+        cls.thread.start()
+        deadline = time.monotonic() + 10
+        while not cls.server.started and time.monotonic() < deadline:
+            time.sleep(0.01)
+        cls.stripe_config = patch.multiple(stripe, api_base=f"http://127.0.0.1:{port}", api_key="sk_test_local")
+        cls.stripe_config.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stripe_config.stop()
+        cls.server.should_exit = True
+        cls.thread.join(5)
+
+    def setUp(self):
+        super().setUp()
+        self.stand_ins.checkout_sessions.clear()
+
+    def _paid_session(self, metadata: dict, amount_total: int = 0, created: datetime = NOW - timedelta(hours=1)):
+        session = stripe.checkout.Session.create(
+            mode="payment", success_url="https://modelify.test/ok", metadata=metadata,
+            line_items=[{"price": "price_x", "quantity": 1}],
+        )
+        return self.stand_ins.complete_checkout_session(session.id, amount_total, int(created.timestamp()))
+
+    def test_missing_orders_and_project_payment_applied_in_batches(self):
+        """Sessions payées (produit, panier, projet) → un upsert Orders, une lecture des prix, une RPC projets"""
+        product = self._paid_session({"type": "product_purchase", "product_id": "p1", "user_id": "u1"}, 1990)
+        cart = self._paid_session({"type": "cart_purchase", "product_ids": "p2,p3", "user_id": "u2"}, 3000)
+        project = self._paid_session({"type": "project_payment", "project_id": PROJECT_ID}, 15000)
+        stripe.checkout.Session.create(mode="payment", metadata={"type": "product_purchase"})  # jamais payée
+        client, tables = _client(
+            orders_inserted=[{"id": "o1"}, {"id": "o2"}],
+            projects_paid=[{"id": PROJECT_ID}],
+            prices=[{"id": "p2", "price": 10.0}, {"id": "p3", "price": 20.0}],
+        )
+
+        report = run_reconcile(client, now=NOW)
+
+        self.assertEqual(report["sessions"], 3)
+        self.assertEqual(report["orders_inserted"], 2)
+        self.assertEqual(report["projects_paid"], 1)
+        rows, = tables["Orders"].upsert.call_args[0]
+        self.assertEqual(tables["Orders"].upsert.call_count, 1)
+        self.assertEqual(tables["Orders"].upsert.call_args[1], {"on_conflict": "client_id,product_id", "ignore_duplicates": True})
+        self.assertEqual(
+            sorted((r["product_id"], r["client_id"], r["amount_paid"], r["stripe_session_id"]) for r in rows),
+            [("p1", "u1", 19.9, product["id"]), ("p2", "u2", 10.0, cart["id"]), ("p3", "u2", 20.0, cart["id"])],
+        )
+        name, params = client.rpc.call_args[0]
+        self.assertEqual(name, "reconcile_project_payments")
+        self.assertEqual(params["payments"], [{"projectId": PROJECT_ID, "payment_intent": project["payment_intent"]}])
+
+    def test_pages_through_sessions_and_advances_watermark(self):
+        """Plus d'une page → starting_after suivi jusqu'au bout, point de reprise = début du passage"""
+        for i in range(5):
+            self._paid_session({"type": "product_purchase", "product_id": f"p{i}", "user_id": "u1"}, 100)
+        client, tables = _client()
+
+        report = run_reconcile(client, page_size=2, now=NOW)
+
+        self.assertEqual(report["pages"], 3)
+        self.assertEqual(report["sessions"], 5)
+        upserted = [row["product_id"] for call in tables["Orders"].upsert.call_args_list for row in call[0][0]]
+        self.assertEqual(sorted(upserted), ["p0", "p1", "p2", "p3", "p4"])
+        saved = tables["JobWatermarks"].upsert.call_args[0][0]
+        self.assertEqual(saved["name"], "stripe_reconcile")
+        self.assertEqual(saved["value"], NOW.isoformat())
+
+    def test_window_starts_one_session_lifetime_before_watermark(self):
+        """Point de reprise existant → sessions créées avant (watermark - durée de vie) ignorées"""
+        watermark = NOW - timedelta(hours=2)
+        self._paid_session({"type": "product_purchase", "product_id": "recent", "user_id": "u1"},
+                           created=watermark - SESSION_LIFETIME + timedelta(minutes=5))
+        self._paid_session({"type": "product_purchase", "product_id": "old", "user_id": "u1"},
+                           created=watermark - SESSION_LIFETIME - timedelta(minutes=5))
+        client, tables = _client(watermark=watermark)
+
+        report = run_reconcile(client, now=NOW)
+
+        self.assertEqual(report["sessions"], 1)
+        rows, = tables["Orders"].upsert.call_args[0]
+        self.assertEqual([r["product_id"] for r in rows], ["recent"])
+
+    def test_stripe_failure_keeps_watermark(self):
+        """Stripe en erreur → exception remontée, point de reprise inchangé (relecture au passage suivant)"""
+        client, tables = _client()
+
+        with patch.object(stripe, "api_base", "http://127.0.0.1:9"), patch.object(stripe, "max_network_retries", 0):
+            with self.assertRaises(stripe.error.APIConnectionError):
+                run_reconcile(client, now=NOW)
+
+        tables["JobWatermarks"].upsert.assert_not_called()
+
+    def test_nothing_to_apply_makes_no_write(self):
+        """Sessions sans métadonnées exploitables → aucune écriture en base"""
+        client, tables = _client()
+
+        result = apply_sessions(client, [
+            {"id": "cs_1", "payment_status": "paid", "metadata": {"type": "project_payment", "project_id": "pas-un-uuid"}},
+            {"id": "cs_2", "payment_status": "paid", "metadata": {"type": "cart_purchase", "product_ids": ""}},
+        ])
+
+        self.assertEqual(result, {"orders_inserted": 0, "projects_paid": 0})
+        tables["Orders"].upsert.assert_not_called()
+        client.rpc.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
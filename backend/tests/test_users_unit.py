@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import MagicMock, patch, AsyncMock
 from fastapi import HTTPException, status
+import json
 import sys
 import os
 
@@ -96,35 +97,66 @@ class TestUsersUnit(BaseAsyncTestCase):
 
     @patch("app.routers.users.supabase_admin")
     async def test_get_users_access_control_admin(self, mock_supabase):
-        """Admin → accès liste utilisateurs autorisé"""
+        """Admin → page d'utilisateurs (colonnes projetées + projets actifs)"""
         mock_user = MagicMock()
         mock_user.id = "admin_id"
 
-        mock_admin_check = MagicMock()
-        mock_admin_check.data = {"role": "admin"}
-        mock_supabase.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value = (
-            mock_admin_check
-        )
+        mock_supabase.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value.data = {
+            "role": "admin"
+        }
+        mock_supabase.rpc.return_value.execute.return_value.data = [
+            {"id": "u1", "email": "a@example.com", "active_projects": 2},
+            {"id": "u2", "email": "b@example.com", "active_projects": 0},
+        ]
 
-        mock_users_list = MagicMock()
-        mock_users_list.data = [{"id": "u1"}, {"id": "u2"}]
+        result = await get_users(current_user=mock_user)
 
-        mock_query_builder = mock_supabase.table.return_value
+        body = json.loads(result.body)
+        self.assertEqual(len(body["users"]), 2)
+        self.assertIsNone(body["next_cursor"])
+        fn, params = mock_supabase.rpc.call_args[0]
+        self.assertEqual(fn, "admin_list_users")
+        self.assertEqual(params["page_size"], 51)
+        self.assertIsNone(params["search"])
+        self.assertIsNone(params["cursor_id"])
 
-        mock_select_builder = MagicMock()
-        mock_query_builder.select.return_value = mock_select_builder
+    @patch("app.routers.users.supabase_admin")
+    async def test_get_users_next_cursor_round_trip(self, mock_supabase):
+        """Page pleine → next_cursor ; renvoyé → position (createdAt, id) transmise à la RPC"""
+        mock_user = MagicMock()
+        mock_user.id = "admin_id"
+        mock_supabase.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value.data = {
+            "role": "admin"
+        }
+        rows = [
+            {"id": f"00000000-0000-4000-8000-00000000000{i}", "createdAt": f"2026-01-0{i}T10:00:00.123+00:00"}
+            for i in range(3, 0, -1)
+        ]
+        mock_supabase.rpc.return_value.execute.return_value.data = rows
 
-        mock_eq_builder = MagicMock()
-        mock_select_builder.eq.return_value = mock_eq_builder
-        mock_single_builder = MagicMock()
-        mock_eq_builder.single.return_value = mock_single_builder
-        mock_single_builder.execute.return_value.data = {"role": "admin"}
+        first = json.loads((await get_users(limit=2, search="  dupont ", current_user=mock_user)).body)
 
-        mock_select_builder.execute.return_value.data = [{"id": "u1"}, {"id": "u2"}]
+        self.assertEqual(len(first["users"]), 2)
+        self.assertIsNotNone(first["next_cursor"])
+        self.assertEqual(mock_supabase.rpc.call_args[0][1]["search"], "dupont")
 
-        result = await get_users(current_user=mock_user)
+        await get_users(limit=2, cursor=first["next_cursor"], current_user=mock_user)
 
-        self.assertEqual(len(result), 2)
+        params = mock_supabase.rpc.call_args[0][1]
+        self.assertEqual(params["cursor_created_at"], rows[1]["createdAt"])
+        self.assertEqual(params["cursor_id"], rows[1]["id"])
+
+    @patch("app.routers.users.supabase_admin")
+    async def test_get_users_invalid_cursor(self, mock_supabase):
+        """Curseur illisible → HTTP 400 sans requête à la base"""
+        mock_user = MagicMock()
+        mock_user.id = "admin_id"
+
+        with self.assertRaises(HTTPException) as cm:
+            await get_users(cursor="pas-un-curseur", current_user=mock_user)
+
+        self.assertEqual(cm.exception.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_supabase.rpc.assert_not_called()
 
     @patch("app.routers.users.supabase_admin")
     async def test_get_users_access_control_forbidden(self, mock_supabase):
@@ -0,0 +1,149 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi import HTTPException
+import httpx
+import io
+import sys
+import os
+import zipfile
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.zip_stream import stream_zip, archive_name, CHUNK_SIZE
+from app.routers.products import download_product_bundle, _download_name
+from app.routers.projects import download_project_deliverables
+from tests.base_test import BaseAsyncTestCase
+
+
+def make_client(files: dict) -> httpx.AsyncClient:
+    """Client httpx servant `files` ({chemin: contenu}) ; 404 sinon."""
+
+    def handler(request):
+        content = files.get(request.url.path)
+        if content is None:
+            return httpx.Response(404)
+        return httpx.Response(200, content=content)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def collect(entries, client) -> tuple:
+    chunks = [chunk async for chunk in stream_zip(entries, client=client)]
+    return chunks, zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+
+class TestZipStreamUnit(BaseAsyncTestCase):
+    """Tests unitaires de l'archive ZIP en streaming"""
+
+    def test_archive_name_strips_timestamp(self):
+        """Nom d'archive → sans préfixe d'horodatage ni encodage URL"""
+        self.assertEqual(
+            archive_name("https://x.supabase.co/storage/v1/object/public/b/1720000000.123_mon%20modele.stl"),
+            "mon modele.stl",
+        )
+        self.assertEqual(archive_name("deliverables/p1/1720000000.5_final.glb"), "final.glb")
+
+    async def test_stream_zip_contents(self):
+        """Plusieurs fichiers → archive valide, streamée en plusieurs blocs"""
+        big = os.urandom(CHUNK_SIZE * 3)
+        client = make_client({"/model.stl": big, "/notice.pdf": b"%PDF-1.4"})
+
+        chunks, archive = await collect(
+            [("model.stl", "http://storage/model.stl"), ("notice.pdf", "http://storage/notice.pdf")],
+            client,
+        )
+
+        self.assertGreater(len(chunks), 1)
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.read("model.stl"), big)
+        self.assertEqual(archive.read("notice.pdf"), b"%PDF-1.4")
+        # En-têtes ZIP64 (version 4.5) : pas de limite à 2 Go par fichier
+        self.assertTrue(all(info.extract_version >= 45 for info in archive.infolist()))
+
+    async def test_stream_zip_duplicates_and_missing(self):
+        """Noms en double suffixés, fichier introuvable ignoré"""
+        client = make_client({"/a": b"A", "/b": b"B"})
+
+        _, archive = await collect(
+            [("x.obj", "http://storage/a"), ("x.obj", "http://storage/b"), ("y.obj", "http://storage/missing")],
+            client,
+        )
+
+        self.assertEqual(archive.namelist(), ["x.obj", "x_2.obj"])
+        self.assertEqual(archive.read("x_2.obj"), b"B")
+
+    async def test_stream_zip_strips_paths_from_names(self):
+        """Noms avec chemin (../, absolu, Windows) → entrées réduites au nom de fichier"""
+        client = make_client({"/a": b"A", "/b": b"B", "/c": b"C", "/d": b"D"})
+
+        _, archive = await collect(
+            [
+                ("../../evil.stl", "http://storage/a"),
+                ("/etc/cron.d/job", "http://storage/b"),
+                ("C:\\Windows\\x.obj", "http://storage/c"),
+                ("..", "http://storage/d"),
+            ],
+            client,
+        )
+
+        self.assertEqual(archive.namelist(), ["evil.stl", "job", "x.obj", "fichier"])
+
+    def test_download_name_has_no_path(self):
+        """Nom de fichier téléchargeable enregistré → sans chemin ni caractère spécial"""
+        for filename, expected in (("../../evil.stl", "evil.stl"), ("C:\\tmp\\x.obj", "x.obj"), ("..", "fichier")):
+            self.assertEqual(_download_name(MagicMock(filename=filename)), expected)
+        self.assertEqual(_download_name(MagicMock(filename="/")), "fichier")
+
+    @patch("app.routers.products.supabase_admin")
+    async def test_product_bundle_requires_purchase(self, mock_supabase_admin):
+        """Produit non acheté → 403, aucun fichier lu"""
+        mock_user = MagicMock()
+        mock_user.id = "user123"
+        orders = mock_supabase_admin.table.return_value.select.return_value
+        orders.eq.return_value.eq.return_value.eq.return_value.execute.return_value.data = []
+
+        with self.assertRaises(HTTPException) as ctx:
+            await download_product_bundle("prod1", current_user=mock_user)
+
+        self.assertEqual(ctx.exception.status_code, 403)
+
+    @patch("app.routers.projects.supabase_admin")
+    async def test_deliverables_bundle_database_error(self, mock_supabase_admin):
+        """Erreur PostgREST à la lecture du projet → 500 logué, pas d'exception brute"""
+        mock_user = MagicMock()
+        mock_user.id = "user123"
+        mock_supabase_admin.table.return_value.select.return_value.eq.return_value.execute.side_effect = (
+            Exception("invalid input syntax for type uuid")
+        )
+
+        with self.assertRaises(HTTPException) as ctx:
+            await download_project_deliverables("pas-un-uuid", current_user=mock_user)
+
+        self.assertEqual(ctx.exception.status_code, 500)
+
+    @patch("app.routers.projects.supabase_admin")
+    async def test_deliverables_bundle_no_signed_url(self, mock_supabase_admin):
+        """Aucune URL signée obtenue → 500 au lieu d'une archive vide"""
+        mock_user = MagicMock()
+        mock_user.id = "user123"
+        tables = {"Projects": MagicMock(), "ProjectsImages": MagicMock()}
+        tables["Projects"].select.return_value.eq.return_value.execute.return_value.data = [
+            {"id": "p1", "title": "Projet", "userId": "user123"}
+        ]
+        tables["ProjectsImages"].select.return_value.eq.return_value.in_.return_value.execute.return_value.data = [
+            {"fileUrl": "deliverables/p1/final.glb", "file_name": "final.glb"}
+        ]
+        mock_supabase_admin.table.side_effect = tables.__getitem__
+        mock_supabase_admin.storage.from_.return_value.create_signed_urls.return_value = [
+            {"path": "deliverables/p1/final.glb", "error": "Object not found", "signedURL": None}
+        ]
+
+        with self.assertRaises(HTTPException) as ctx:
+            await download_project_deliverables("p1", current_user=mock_user)
+
+        self.assertEqual(ctx.exception.status_code, 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,10 +7,12 @@ import './ProjectChat.css';
 const POLL_INTERVAL_MS = 10000;
 const MAX_MESSAGE_LENGTH = 2000;
 
-const ProjectChat = ({ projectId }) => {
+// initialMessages : discussion déjà chargée par la page (vue d'ensemble du
+// projet) ; le premier chargement est alors sauté, le polling continue
+const ProjectChat = ({ projectId, initialMessages = null }) => {
   const { user, session } = useAuth();
-  const [messages, setMessages] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const [messages, setMessages] = useState(initialMessages || []);
+  const [loading, setLoading] = useState(!initialMessages);
   const [error, setError] = useState(null);
   const [newMessage, setNewMessage] = useState('');
   const [imageFile, setImageFile] = useState(null);
@@ -20,6 +22,7 @@ const ProjectChat = ({ projectId }) => {
   const messagesContainerRef = useRef(null);
   const imageInputRef = useRef(null);
   const isFirstLoad = useRef(true);
+  const skipInitialFetch = useRef(Boolean(initialMessages));
 
   const fetchMessages = useCallback(async () => {
     if (!session) return;
@@ -39,9 +42,10 @@ const ProjectChat = ({ projectId }) => {
     }
   }, [projectId, session]);
 
-  // Chargement initial + polling
+  // Chargement initial (sauf discussion fournie par la page) + polling
   useEffect(() => {
-    fetchMessages();
+    if (!skipInitialFetch.current) fetchMessages();
+    skipInitialFetch.current = false;
     const interval = setInterval(fetchMessages, POLL_INTERVAL_MS);
     return () => clearInterval(interval);
   }, [fetchMessages]);
@@ -169,7 +173,7 @@ const ProjectChat = ({ projectId }) => {
                     </div>
                     {msg.fileUrl && (
                       <a href={msg.fileUrl} target="_blank" rel="noopener noreferrer">
-                        <img src={msg.fileUrl} alt="Image jointe" className="chat-image" />
+                        <img src={msg.variants?.thumb || msg.fileUrl} alt="Image jointe" className="chat-image" loading="lazy" />
                       </a>
                     )}
                     {msg.content && <div className="chat-content">{msg.content}</div>}
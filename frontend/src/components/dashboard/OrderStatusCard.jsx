@@ -127,6 +127,11 @@ const OrderStatusCard = ({ allowedStatuses, title = "Status des commandes" }) =>
                       <span className="text-dark">
                         {project.title}
                       </span>
+                      {project.chat?.unread > 0 && (
+                        <span className="badge rounded-pill bg-primary ms-2" title="Messages non lus">
+                          <i className="bi bi-chat-dots me-1"></i>{project.chat.unread}
+                        </span>
+                      )}
                     </td>
                     <td>{formatDate(project.created_at)}</td>
                     <td className="pe-4">
@@ -33,13 +33,22 @@ const LegalDocuments = () => {
   useEffect(() => {
     const fetchDocuments = async () => {
       try {
-        const response = await apiFetch('/api/legal');
+        // Versions courantes (petit manifeste revalidé par ETag), puis un
+        // document par URL versionnée : immuable, servi par le cache du
+        // navigateur tant que sa version ne change pas
+        const response = await apiFetch('/api/legal/versions');
         if (!response.ok) throw new Error('Erreur lors du chargement des documents légaux');
-        const data = await response.json();
+        const versions = await response.json();
         // Preserve display order from SECTIONS
-        const ordered = SECTIONS
-          .map((s) => data.find((d) => d.slug === s.slug))
-          .filter(Boolean);
+        const ordered = await Promise.all(
+          SECTIONS
+            .filter((s) => versions[s.slug] !== undefined)
+            .map(async (s) => {
+              const res = await apiFetch(`/api/legal/${s.slug}?v=${versions[s.slug]}`);
+              if (!res.ok) throw new Error('Erreur lors du chargement des documents légaux');
+              return res.json();
+            })
+        );
         setDocuments(ordered);
       } catch (err) {
         setError(err.message);
@@ -5,9 +5,15 @@ import { budgetLabel, statusLabel } from '../constants/projectStatus';
 import ProjectChat from '../components/ProjectChat';
 import './ProjectDetails.css';
 
+// Suivi du paiement au retour de Stripe : 15 essais espacés de 2 s
+const MAX_VERIFY_ATTEMPTS = 15;
+const VERIFY_INTERVAL_MS = 2000;
+
 const ProjectDetails = ({ projectId, onBack, paymentSuccess, stripeSessionId }) => {
   const { user, session } = useAuth();
   const [project, setProject] = useState(null);
+  // Derniers messages chargés avec la page (null : la discussion charge l'historique)
+  const [initialMessages, setInitialMessages] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [showConfirmModal, setShowConfirmModal] = useState(false);
@@ -20,6 +26,7 @@ const ProjectDetails = ({ projectId, onBack, paymentSuccess, stripeSessionId })
   const [feedback, setFeedback] = useState(null);
   const [paymentVerified, setPaymentVerified] = useState(false);
   const [verifyingPayment, setVerifyingPayment] = useState(false);
+  const [verifyAttempts, setVerifyAttempts] = useState(0);
 
   // Livrable upload state
   const [deliverableFiles, setDeliverableFiles] = useState([]);
@@ -30,10 +37,12 @@ const ProjectDetails = ({ projectId, onBack, paymentSuccess, stripeSessionId })
   const fetchProject = async () => {
     if (!session) return;
     try {
-      const response = await apiFetch(`/api/projects/${projectId}`, { token: session.access_token });
+      // Projet, fichiers et derniers messages en un seul appel
+      const response = await apiFetch(`/api/projects/${projectId}/overview`, { token: session.access_token });
       if (!response.ok) throw new Error('Erreur lors de la récupération du projet');
       const data = await response.json();
-      setProject(data);
+      setProject(data.project);
+      setInitialMessages(data.hasMoreMessages ? null : data.messages);
     } catch (err) {
       setError(err.message);
     } finally {
@@ -45,32 +54,40 @@ const ProjectDetails = ({ projectId, onBack, paymentSuccess, stripeSessionId })
     fetchProject();
   }, [projectId, session]);
 
-  // Vérification du paiement Stripe après redirection
+  // Vérification du paiement Stripe après redirection : le statut passe à
+  // « payé » via le webhook Stripe, on interroge l'API jusqu'à confirmation
   useEffect(() => {
     if (!paymentSuccess || !stripeSessionId || !session || !project) return;
     if (project.status === 'payé' || paymentVerified) return;
+    if (verifyAttempts >= MAX_VERIFY_ATTEMPTS) {
+      setVerifyingPayment(false);
+      return;
+    }
 
-    const verifyPayment = async () => {
+    const timer = setTimeout(async () => {
       setVerifyingPayment(true);
       try {
         const response = await apiFetch(
-          `/api/projects/${projectId}/verify-payment?session_id=${stripeSessionId}`,
+          `/api/projects/${projectId}/verify-payment`,
           { token: session.access_token }
         );
         if (response.ok) {
           const data = await response.json();
           setProject(data.project);
-          setPaymentVerified(true);
+          if (!data.payment_pending) {
+            setPaymentVerified(true);
+            setVerifyingPayment(false);
+          }
         }
       } catch (err) {
         console.error('Erreur vérification paiement:', err);
       } finally {
-        setVerifyingPayment(false);
+        setVerifyAttempts((attempts) => attempts + 1);
       }
-    };
+    }, verifyAttempts === 0 ? 0 : VERIFY_INTERVAL_MS);
 
-    verifyPayment();
-  }, [paymentSuccess, stripeSessionId, session, project]);
+    return () => clearTimeout(timer);
+  }, [paymentSuccess, stripeSessionId, session, project, paymentVerified, verifyAttempts]);
 
   const handleStatusChange = (newStatus) => {
     setPendingStatus(newStatus);
@@ -395,7 +412,7 @@ const ProjectDetails = ({ projectId, onBack, paymentSuccess, stripeSessionId })
             </div>
 
             {/* Messagerie client <-> admin */}
-            <ProjectChat projectId={projectId} />
+            <ProjectChat projectId={projectId} initialMessages={initialMessages} />
           </div>
 
           <div className="col-lg-4 mb-4">
@@ -495,7 +512,7 @@ const ProjectDetails = ({ projectId, onBack, paymentSuccess, stripeSessionId })
                         <div key={index} className={isImage ? 'col-6' : 'col-12'}>
                           {isImage ? (
                             <a href={file.fileUrl} target="_blank" rel="noopener noreferrer" className="d-block">
-                              <img src={file.fileUrl} alt={`Livrable ${index + 1}`} className="project-image-thumbnail" />
+                              <img src={file.variants?.medium || file.fileUrl} alt={`Livrable ${index + 1}`} className="project-image-thumbnail" />
                             </a>
                           ) : (
                             <a href={file.fileUrl} target="_blank" rel="noopener noreferrer" className="d-flex align-items-center p-3 border rounded text-decoration-none bg-light">
@@ -530,7 +547,7 @@ const ProjectDetails = ({ projectId, onBack, paymentSuccess, stripeSessionId })
                         <div key={index} className={isImage ? 'col-6' : 'col-12'}>
                           {isImage ? (
                             <a href={file.fileUrl} target="_blank" rel="noopener noreferrer" className="d-block">
-                              <img src={file.fileUrl} alt={`Fichier ${index + 1}`} className="project-image-thumbnail" />
+                              <img src={file.variants?.medium || file.fileUrl} alt={`Fichier ${index + 1}`} className="project-image-thumbnail" />
                             </a>
                           ) : (
                             <a href={file.fileUrl} target="_blank" rel="noopener noreferrer" className="d-flex align-items-center p-3 border rounded text-decoration-none bg-light hover-bg-gray">
@@ -100,6 +100,11 @@ const AdminProjectList = ({ statusFilter, title }) => {
                 >
                   <td className="ps-4">
                     <span className="fw-bold text-dark">{project.title}</span>
+                    {project.chat?.unread > 0 && (
+                      <span className="badge rounded-pill bg-primary ms-2" title="Messages non lus">
+                        <i className="bi bi-chat-dots me-1"></i>{project.chat.unread}
+                      </span>
+                    )}
                   </td>
 
                   <td>
@@ -1,41 +1,80 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { useAuth } from '../../contexts/AuthContext';
 import UserProjectsModal from './UserProjectsModal';
 import { apiFetch } from '../../lib/api';
 
+// Taille de page de l'annuaire (curseur côté API) et délai avant recherche
+const PAGE_SIZE = 50;
+const SEARCH_DELAY_MS = 300;
+
 const AdminUserList = () => {
   const [users, setUsers] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
+  const [search, setSearch] = useState('');
+  const [debouncedSearch, setDebouncedSearch] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
   const [selectedUser, setSelectedUser] = useState(null);
   const [showProjectsModal, setShowProjectsModal] = useState(false);
   const { session } = useAuth();
 
   useEffect(() => {
-    const fetchUsers = async () => {
-      try {
-        if (!session?.access_token) return;
+    const timer = setTimeout(() => setDebouncedSearch(search.trim()), SEARCH_DELAY_MS);
+    return () => clearTimeout(timer);
+  }, [search]);
 
-        const response = await apiFetch('/api/users', { token: session.access_token });
+  const fetchPage = useCallback(async (cursor) => {
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    if (debouncedSearch) params.set('search', debouncedSearch);
+    if (cursor) params.set('cursor', cursor);
+
+    const response = await apiFetch(`/api/users?${params}`, { token: session.access_token });
+
+    if (!response.ok) {
+      if (response.status === 403) {
+        throw new Error("Accès refusé : Vous n'avez pas les droits d'administrateur.");
+      }
+      throw new Error('Erreur lors de la récupération des utilisateurs');
+    }
 
-        if (!response.ok) {
-          if (response.status === 403) {
-            throw new Error("Accès refusé : Vous n'avez pas les droits d'administrateur.");
-          }
-          throw new Error('Erreur lors de la récupération des utilisateurs');
-        }
+    return response.json();
+  }, [session, debouncedSearch]);
 
-        const data = await response.json();
-        setUsers(data);
+  // Première page (au chargement et à chaque nouvelle recherche)
+  useEffect(() => {
+    let cancelled = false;
+    const fetchUsers = async () => {
+      try {
+        if (!session?.access_token) return;
+        const data = await fetchPage(null);
+        if (cancelled) return;
+        setUsers(data.users);
+        setNextCursor(data.next_cursor);
+        setError(null);
       } catch (err) {
-        setError(err.message);
+        if (!cancelled) setError(err.message);
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
     };
 
     fetchUsers();
-  }, [session]);
+    return () => { cancelled = true; };
+  }, [session, fetchPage]);
+
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const data = await fetchPage(nextCursor);
+      setUsers((previous) => previous.concat(data.users));
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const handleShowProjects = (user) => {
     setSelectedUser(user);
@@ -68,11 +107,19 @@ const AdminUserList = () => {
   return (
     <>
       <div className="card shadow-sm border-0 rounded-3">
-        <div className="card-header bg-white border-bottom py-3">
+        <div className="card-header bg-white border-bottom py-3 d-flex flex-wrap gap-2 justify-content-between align-items-center">
           <h5 className="mb-0 fw-bold dashboard-card-title">
             <i className="bi bi-people me-2"></i>
             Gestion des utilisateurs
           </h5>
+          <input
+            type="search"
+            className="form-control form-control-sm"
+            style={{ maxWidth: '280px' }}
+            placeholder="Rechercher (nom, email)"
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+          />
         </div>
         <div className="card-body p-0">
           <div className="table-responsive">
@@ -82,6 +129,7 @@ const AdminUserList = () => {
                   <th className="border-0 py-3">Nom</th>
                   <th className="border-0 py-3">Email</th>
                   <th className="border-0 py-3">Rôle</th>
+                  <th className="border-0 py-3">Projets actifs</th>
                   <th className="border-0 py-3 pe-4">Date d'inscription</th>
                 </tr>
               </thead>
@@ -97,12 +145,13 @@ const AdminUserList = () => {
                         {u.role}
                       </span>
                     </td>
+                    <td>{u.active_projects}</td>
                     <td className="pe-4">{new Date(u.createdAt).toLocaleDateString()}</td>
                   </tr>
                 ))}
                 {users.length === 0 && (
                   <tr>
-                    <td colSpan="4" className="text-center py-5 text-muted">
+                    <td colSpan="5" className="text-center py-5 text-muted">
                       <i className="bi bi-people display-4 d-block mb-3"></i>
                       Aucun utilisateur trouvé
                     </td>
@@ -111,6 +160,13 @@ const AdminUserList = () => {
               </tbody>
             </table>
           </div>
+          {nextCursor && (
+            <div className="text-center py-3 border-top">
+              <button className="btn btn-outline-primary btn-sm" onClick={handleLoadMore} disabled={loadingMore}>
+                {loadingMore ? 'Chargement...' : 'Charger plus'}
+              </button>
+            </div>
+          )}
         </div>
       </div>
 